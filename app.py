@@ -5,17 +5,18 @@ AI Cyber Tool - Main Application Entry Point
 
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from loguru import logger
+import asyncio
 import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
 # Імпорти з нашої реорганізованої структури
 from src.core.config import get_settings
-from src.db.database import init_database
+from src.core.templates import templates, precompile_templates
+from src.db.database import init_database, close_database
 from src.routers import sessions, tech_map, message_bus
+from src.services.static_assets import PrecompressedStaticFiles
 
 # Dependency Injection для MessageBus
 async def get_message_bus():
@@ -46,9 +47,6 @@ app = FastAPI(
     version=settings.api_version
 )
 
-# Ініціалізація Jinja2 шаблонів
-templates = Jinja2Templates(directory="templates")
-
 # Налаштування статичних файлів та шаблонів
 # Створюємо папки якщо вони не існують
 Path("static").mkdir(exist_ok=True)
@@ -56,10 +54,10 @@ Path("architecture").mkdir(exist_ok=True)
 
 # Монтуємо статичні файли тільки якщо папки існують
 if Path("static").exists():
-    app.mount("/static", StaticFiles(directory="static"), name="static")
+    app.mount("/static", PrecompressedStaticFiles(tech_map.static_assets), name="static")
 
 if Path("architecture").exists():
-    app.mount("/architecture", StaticFiles(directory="architecture"), name="architecture")
+    app.mount("/architecture", PrecompressedStaticFiles(tech_map.architecture_assets), name="architecture")
 
 # Підключення роутерів
 app.include_router(sessions.router)
@@ -72,6 +70,11 @@ async def startup_event():
     """Під час запуску додатку"""
     logger.info("AI Cyber Tool is starting up...")
     await init_database()
+    await tech_map.warm_documents()
+    await tech_map.search_index.start()
+    await tech_map.diagram_manifest.start()
+    await tech_map.build_static_assets()
+    await precompile_templates()
     
     # Ініціалізація Message Bus
     try:
@@ -79,14 +82,47 @@ async def startup_event():
         message_bus_config = MessageBusConfig(
             rabbitmq_url=settings.rabbitmq_url,
             commands_exchange=settings.rabbitmq_commands_exchange,
-            events_exchange=settings.rabbitmq_events_exchange
+            events_exchange=settings.rabbitmq_events_exchange,
+            heartbeat=settings.rabbitmq_heartbeat,
+            publish_buffer_size=settings.rabbitmq_publish_buffer_size,
+            publish_spill_dir=settings.rabbitmq_publish_spill_dir
         )
         message_bus = MessageBus(message_bus_config)
+        # Publisher не падає при недоступному брокері: повідомлення буферизуються,
+        # а фоновий supervisor перепідключається самостійно
+        message_bus.get_publisher()
         app.state.message_bus = message_bus
         logger.info("Message Bus initialized successfully")
     except Exception as e:
         logger.warning(f"Message Bus initialization failed: {e}")
         app.state.message_bus = None
+    
+    # Запис логів аналізу з черги Message Bus без HTTP API
+    app.state.log_ingestion = None
+    if settings.log_ingestion_enabled and app.state.message_bus:
+        from src.services.log_ingestion import AnalysisLogIngestion
+        log_ingestion = AnalysisLogIngestion(
+            app.state.message_bus.get_consumer(),
+            asyncio.get_running_loop(),
+            batch_size=settings.log_ingestion_batch_size,
+            flush_interval=settings.log_ingestion_flush_interval_ms / 1000
+        )
+        log_ingestion.start()
+        app.state.log_ingestion = log_ingestion
+        logger.info("Analysis log ingestion consumer started")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Під час зупинки додатку"""
+    logger.info("AI Cyber Tool is shutting down...")
+    await tech_map.diagram_manifest.stop()
+    await tech_map.search_index.stop()
+    if getattr(app.state, "log_ingestion", None):
+        await app.state.log_ingestion.stop()
+    if getattr(app.state, "message_bus", None):
+        app.state.message_bus.close()
+    await close_database()
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -116,8 +152,19 @@ async def api_root():
             "message_bus_test": "/api/message-bus/test",
             "specs": "/specs",
             "specs_api": "/api/specs",
+            "specs_search": "/api/specs/search",
+            "spec_toc": "/api/specs/{spec_name}/toc",
+            "spec_section": "/api/specs/{spec_name}/sections/{anchor}",
             "sessions": "/api/sessions",
+            "sessions_cache": "/api/sessions/cache",
+            "session_logs": "/api/sessions/{session_id}/logs",
+            "session_logs_export": "/api/sessions/{session_id}/logs/export",
             "analysis_logs": "/api/analysis-logs",
+            "analysis_logs_batch": "/api/analysis-logs/batch",
+            "analysis_logs_search": "/api/analysis-logs/search",
+            "analysis_logs_stats": "/api/analysis-logs/stats",
+            "analysis_logs_partitions": "/api/analysis-logs/partitions",
+            "database_backups": "/api/database/backups",
             "config": "/api/config"
         }
     }
@@ -8,7 +8,7 @@ import asyncio
 import uuid
 from datetime import datetime
 from services.message_bus import (
-    MessageBus, MessageBusConfig, MessageStatus,
+    MessageBus, MessageBusConfig, MessageStatus, MessageType,
     create_command_message, create_event_message
 )
 
@@ -17,13 +17,9 @@ def ai_agent_command_handler(message):
     """Обробник команд для AI Agent"""
     print(f"AI Agent received command: {message}")
     
-    # Симуляція обробки команди
-    task_id = message.get('task_id')
-    tool_name = message.get('tool_name')
-    parameters = message.get('parameters', {})
-    
-    print(f"Processing task {task_id} with tool {tool_name}")
-    print(f"Parameters: {parameters}")
+    # Симуляція обробки команди (message вже провалідований CommandMessage)
+    print(f"Processing task {message.task_id} with tool {message.tool_name}")
+    print(f"Parameters: {message.parameters}")
     
     # Тут буде реальна логіка обробки
     # Наприклад, виклик інструменту через Integrations Service
@@ -34,25 +30,21 @@ def integrations_command_handler(message):
     print(f"Integrations Service received command: {message}")
     
     # Симуляція обробки команди
-    task_id = message.get('task_id')
-    tool_name = message.get('tool_name')
-    parameters = message.get('parameters', {})
-    
-    print(f"Executing {tool_name} with parameters: {parameters}")
+    print(f"Executing {message.tool_name} with parameters: {message.parameters}")
     
     # Симуляція успішного виконання
     result = {
         "status": "success",
-        "data": f"Result from {tool_name}",
+        "data": f"Result from {message.tool_name}",
         "timestamp": datetime.utcnow().isoformat()
     }
     
     # Публікація події про завершення
     event = create_event_message(
         message_id=str(uuid.uuid4()),
-        task_id=task_id,
-        step_id=message.get('step_id'),
-        tool_name=tool_name,
+        task_id=message.task_id,
+        step_id=message.step_id,
+        tool_name=message.tool_name,
         status=MessageStatus.COMPLETED,
         result=result
     )
@@ -64,13 +56,9 @@ def ai_agent_event_handler(message):
     """Обробник подій для AI Agent"""
     print(f"AI Agent received event: {message}")
     
-    task_id = message.get('task_id')
-    status = message.get('status')
-    result = message.get('result')
-    
-    print(f"Task {task_id} status: {status}")
-    if result:
-        print(f"Result: {result}")
+    print(f"Task {message.task_id} status: {message.status.value}")
+    if message.result:
+        print(f"Result: {message.result}")
 
 
 def main():
@@ -91,17 +79,20 @@ def main():
         # Реєстрація обробників
         consumer.register_callback(
             config.ai_agent_commands_queue,
-            ai_agent_command_handler
+            ai_agent_command_handler,
+            MessageType.COMMAND
         )
         
         consumer.register_callback(
             config.integrations_commands_queue,
-            integrations_command_handler
+            integrations_command_handler,
+            MessageType.COMMAND
         )
         
         consumer.register_callback(
             config.ai_agent_events_queue,
-            ai_agent_event_handler
+            ai_agent_event_handler,
+            MessageType.EVENT
         )
         
         print("Message Bus initialized successfully!")
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Analysis Log Decompression
+Заміна стиснених повідомлень логів текстом у копії бази даних SQLite
+
+Додаток стискає analysis_logs.message словниками deflate, а log_text() реєструє сам,
+тому в резервній копії повідомлення - BLOB. Скрипт розпаковує їх на місці, і копія
+читається будь-яким SQLite клієнтом (SELECT * FROM analysis_logs).
+
+    python scripts/utils/decompress_logs.py backups/app-20250101T000000000000.db
+    python scripts/utils/decompress_logs.py backups/app-20250101T000000000000.db.gz -o restored.db
+"""
+
+import argparse
+import gzip
+import shutil
+import sys
+from pathlib import Path
+
+# Додаємо кореневу директорію проекту до Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.db.compression import decompress_database
+
+
+def main():
+    """Головна функція"""
+    parser = argparse.ArgumentParser(description='Replace compressed analysis log messages with plain text')
+    parser.add_argument('database', help='SQLite database copy (.db or .db.gz backup)')
+    parser.add_argument('--output', '-o', help='Write the result to this file instead of modifying the database')
+    args = parser.parse_args()
+
+    source = Path(args.database)
+    target = Path(args.output) if args.output else source
+    if source.suffix == ".gz":
+        if not args.output:
+            parser.error("--output is required for .gz backups")
+        with gzip.open(source, "rb") as src, open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    elif target != source:
+        shutil.copyfile(source, target)
+
+    count = decompress_database(str(target))
+    print(f"Decompressed {count} analysis log messages in {target}")
+
+
+if __name__ == "__main__":
+    main()
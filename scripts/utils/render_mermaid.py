@@ -1,122 +1,454 @@
 # -*- coding: utf-8 -*-
 """
 Mermaid Diagram Renderer
-Скрипт для генерації зображень з Mermaid діаграм
+Пакетний рендеринг Mermaid діаграм у PNG та SVG з пропуском незмінених діаграм
+
+Знаходить усі .mmd файли, порівнює хеші джерел та результатів з маніфестом
+і рендерить тільки змінені діаграми в пулі процесів. Після рендерингу SVG
+мінімізується, а зменшені PNG для srcset (sizes/<name>-<width>w.png) рендеряться
+тим самим mmdc з меншою шириною сторінки.
+
+    python scripts/utils/render_mermaid.py                 # усі діаграми в architecture/
+    python scripts/utils/render_mermaid.py --force -j 8    # повний перерендеринг
+    python scripts/utils/render_mermaid.py --optimize-only # тільки оптимізація готових SVG/PNG
+    python scripts/utils/render_mermaid.py -i a.mmd -o a.png -f png
 """
 
 import argparse
-import sys
+import hashlib
+import json
 import os
-from pathlib import Path
+import re
+import shutil
+import struct
 import subprocess
-import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+MANIFEST_NAME = ".render_manifest.json"
+DEFAULT_FORMATS = ("png", "svg")
+# Ширини зменшених PNG: мініатюра картки, мініатюра для 2x екранів, перегляд
+DEFAULT_WIDTHS = (480, 960, 1600)
+SIZES_DIR = "sizes"
+
+_SVG_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+_SVG_TAG = re.compile(r"<[^!?/][^>]*>")
+_SVG_STYLE = re.compile(r"<style[^>]*>(.*?)</style>", re.DOTALL)
+_SVG_DATA_ATTRIBUTE = re.compile(r'\s(data-[\w-]+)="[^"]*"')
+_SVG_EMPTY_ATTRIBUTE = re.compile(r'\s(?:style|class)="(?:undefined|;|\s)*"')
+_SVG_LONG_NUMBER = re.compile(r"(?<![\d.#])(-?\d+\.\d{3,})")
+
 
 def info(msg):
     """Вивести інформаційне повідомлення"""
     print(f"INFO: {msg}")
 
+
 def ok(msg):
     """Вивести повідомлення про успіх"""
     print(f"OK: {msg}")
 
+
 def err(msg):
     """Вивести повідомлення про помилку"""
     print(f"ERROR: {msg}")
 
-def check_mermaid_cli():
-    """Перевірити чи встановлений Mermaid CLI"""
+
+@dataclass(frozen=True)
+class RenderOptions:
+    """Параметри mmdc; їх зміна робить усі результати застарілими"""
+    width: int = 2400
+    height: int = 1600
+    scale: int = 2
+    background: str = "white"
+
+    def key(self) -> str:
+        return hashlib.sha256(json.dumps(asdict(self), sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def arguments(self) -> List[str]:
+        return ["-w", str(self.width), "-H", str(self.height), "-b", self.background, "--scale", str(self.scale)]
+
+    def resized(self, width: int) -> "RenderOptions":
+        """Параметри зменшеної копії: сторінка заданої ширини без масштабування"""
+        return replace(self, width=width, scale=1)
+
+
+def file_hash(path) -> str:
+    """Скорочений SHA-256 вмісту файлу"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def _round_number(match) -> str:
+    value = f"{float(match.group(1)):.2f}".rstrip("0").rstrip(".")
+    return "0" if value == "-0" else value
+
+
+def minify_svg(text: str) -> str:
+    """Мінімізація SVG від mmdc без зміни вигляду
+
+    Прибираються коментарі, переноси між тегами, data-* атрибути, на які не
+    посилається CSS, порожні style/class; координати в атрибутах округлюються
+    до сотих пікселя. Текстовий вміст та CSS не змінюються.
+    """
+    text = _SVG_COMMENT.sub("", text)
+    text = re.sub(r">\s*\n\s*<", "><", text)
+    styles = " ".join(_SVG_STYLE.findall(text))
+
+    def tag(match):
+        value = _SVG_DATA_ATTRIBUTE.sub(lambda a: a.group(0) if a.group(1) in styles else "", match.group(0))
+        value = _SVG_EMPTY_ATTRIBUTE.sub("", value)
+        return _SVG_LONG_NUMBER.sub(_round_number, value)
+
+    return _SVG_TAG.sub(tag, text)
+
+
+def size_path(png: Path, width: int) -> Path:
+    """Шлях зменшеної копії PNG заданої ширини"""
+    return png.parent / SIZES_DIR / f"{png.stem}-{width}w.png"
+
+
+def png_width(path: Path) -> Optional[int]:
+    """Ширина PNG із заголовка IHDR (None, якщо файл не PNG)"""
+    with open(path, "rb") as f:
+        header = f.read(24)
+    if len(header) < 24 or header[:8] != b"\x89PNG\r\n\x1a\n" or header[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">I", header[16:20])[0]
+
+
+def run_mmdc(mmdc: List[str], source: str, output: str, fmt: str, options: RenderOptions) -> Optional[str]:
+    """Запуск Mermaid CLI; повертає текст помилки або None"""
+    cmd = mmdc + ["-i", source, "-o", output, "-e", fmt] + options.arguments()
     try:
-        # Спробувати знайти mmdc в PATH
-        result = subprocess.run(['mmdc', '--version'], 
-                              capture_output=True, text=True, check=True)
-        return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        try:
-            # Спробувати знайти mmdc.cmd в стандартному місці npm
-            result = subprocess.run(['C:\\Users\\KZ\\AppData\\Roaming\\npm\\mmdc.cmd', '--version'], 
-                                  capture_output=True, text=True, check=True)
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return False
+        completed = subprocess.run(cmd, capture_output=True, text=True)
+    except OSError as e:
+        return str(e)
+    if completed.returncode != 0 or not Path(output).exists():
+        return (completed.stderr or completed.stdout).strip() or "no output produced"
+    return None
+
+
+def render_sizes(mmdc: List[str], source: str, png: Path, options: RenderOptions,
+                 widths: Sequence[int]) -> Tuple[Dict[int, Path], List[int]]:
+    """Зменшені копії PNG, відрендерені mmdc з меншою шириною
+
+    Повертає створені копії та пропущені ширини (не менші за оригінал). Старі копії
+    видаляються до рендерингу, тому після помилки копій діаграми немає зовсім.
+    """
+    remove_sizes(png)
+    original = png_width(png)
+    sizes, skipped = {}, []
+    for width in sorted(widths):
+        if original and width >= original:
+            skipped.append(width)
+            continue
+        target = size_path(png, width)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        error = run_mmdc(mmdc, source, str(target), "png", options.resized(width))
+        if error:
+            raise RuntimeError(f"{width}w: {error}")
+        sizes[width] = target
+    return sizes, skipped
+
+
+def optimize_diagram(mmdc: Optional[List[str]], source: str, outputs: Dict[str, str], options: RenderOptions,
+                     widths: Sequence[int]) -> Dict:
+    """Оптимізація результатів рендерингу: мінімізація SVG та зменшені PNG (потрібен mmdc)"""
+    result = {"svg": None, "sizes": {}, "skipped": []}
+    if "svg" in outputs and Path(outputs["svg"]).exists():
+        path = Path(outputs["svg"])
+        original = path.read_text(encoding="utf-8")
+        minified = minify_svg(original)
+        if minified != original:
+            path.write_text(minified, encoding="utf-8")
+        result["svg"] = [len(original.encode("utf-8")), len(minified.encode("utf-8"))]
+    if mmdc and "png" in outputs and Path(outputs["png"]).exists() and widths:
+        sizes, result["skipped"] = render_sizes(mmdc, source, Path(outputs["png"]), options, widths)
+        result["sizes"] = {width: str(path) for width, path in sizes.items()}
+    return result
+
+
+def find_mmdc(explicit: Optional[str] = None) -> Optional[List[str]]:
+    """Команда Mermaid CLI: явно вказана, з PATH або з глобального npm на Windows"""
+    if explicit:
+        return [explicit]
+    for name in ("mmdc", "mmdc.cmd"):
+        found = shutil.which(name)
+        if found:
+            return [found]
+    appdata = os.environ.get("APPDATA")
+    if appdata and (Path(appdata) / "npm" / "mmdc.cmd").exists():
+        return [str(Path(appdata) / "npm" / "mmdc.cmd")]
+    return None
+
 
 def install_mermaid_cli():
     """Встановити Mermaid CLI через npm"""
     try:
         info("Installing Mermaid CLI...")
-        subprocess.run(['npm', 'install', '-g', '@mermaid-js/mermaid-cli'], 
-                      check=True)
+        subprocess.run([shutil.which("npm") or "npm", "install", "-g", "@mermaid-js/mermaid-cli"], check=True)
         ok("Mermaid CLI installed successfully")
         return True
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
         err(f"Failed to install Mermaid CLI: {e}")
         return False
 
-def render_diagram(input_file, output_file, format_type='png'):
-    """Рендерити Mermaid діаграму в зображення"""
+
+def discover(root: Path) -> List[Path]:
+    """Усі Mermaid джерела в директорії (рекурсивно)"""
+    return sorted(path for path in root.rglob("*.mmd") if path.is_file())
+
+
+def load_manifest(path: Path) -> Dict:
+    """Маніфест попереднього рендерингу (порожній, якщо файлу немає або він пошкоджений)"""
     try:
-        # Перевірити чи існує вхідний файл
-        if not os.path.exists(input_file):
-            err(f"Input file not found: {input_file}")
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_manifest(path: Path, manifest: Dict):
+    """Атомарний запис маніфесту"""
+    temp = path.with_name(path.name + ".tmp")
+    temp.write_text(json.dumps(manifest, indent=2, sort_keys=True, ensure_ascii=False) + "\n", encoding="utf-8")
+    os.replace(temp, path)
+
+
+def is_up_to_date(entry: Optional[Dict], source_hash: str, options_key: str, outputs: Dict[str, Path]) -> bool:
+    """Результати актуальні: те саме джерело, ті самі параметри, файли на місці й не змінені вручну"""
+    if not entry or entry.get("source") != source_hash or entry.get("options") != options_key:
+        return False
+    recorded = entry.get("outputs", {})
+    for fmt, path in outputs.items():
+        if fmt not in recorded or not path.exists() or file_hash(path) != recorded[fmt]:
             return False
-        
-        # Визначити команду mmdc
-        mmdc_cmd = 'mmdc'
+    return True
+
+
+def is_optimized(entry: Optional[Dict], widths: Sequence[int], png: Path) -> bool:
+    """Кожна ширина поточного набору або має зменшену копію, або пропущена як не менша за оригінал"""
+    if not entry:
+        return True
+    if entry.get("widths") != list(widths):
+        return False
+    sizes = {int(width): digest for width, digest in entry.get("sizes", {}).items()}
+    skipped = set(entry.get("skipped", []))
+    if set(sizes) | skipped != set(widths):
+        return False
+    if skipped:
+        original = png_width(png) if png.exists() else None
+        if not original or min(skipped) < original:
+            return False
+    return all(
+        size_path(png, width).exists() and file_hash(size_path(png, width)) == digest
+        for width, digest in sizes.items()
+    )
+
+
+def remove_sizes(png: Path):
+    """Видалення зменшених копій діаграми"""
+    for path in png.parent.glob(f"{SIZES_DIR}/{png.stem}-*w.png"):
+        path.unlink()
+
+
+def render_diagram(mmdc: Optional[List[str]], source: str, outputs: Dict[str, str], options: RenderOptions,
+                   widths: Optional[Sequence[int]] = None, render: bool = True) -> Dict:
+    """Рендеринг однієї діаграми в усі формати та оптимізація (виконується в процесі пулу)
+
+    render=False тільки оптимізує вже наявні файли; без mmdc зменшені PNG не створюються,
+    widths=None вимикає оптимізацію.
+    """
+    result = {"source": source, "ok": True, "stage": None, "timings": {}, "error": None, "optimized": None}
+    for fmt, output in (outputs.items() if mmdc and render else ()):
+        started = time.perf_counter()
+        error = run_mmdc(mmdc, source, output, fmt, options)
+        result["timings"][fmt] = time.perf_counter() - started
+        if error:
+            result["ok"] = False
+            result["stage"] = "render"
+            result["error"] = f"{fmt}: {error}"
+            return result
+    if widths is not None:
+        started = time.perf_counter()
         try:
-            subprocess.run(['mmdc', '--version'], capture_output=True, check=True)
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            mmdc_cmd = 'C:\\Users\\KZ\\AppData\\Roaming\\npm\\mmdc.cmd'
-        
-        # Команда для рендерингу з високою якістю
-        cmd = [
-            mmdc_cmd,
-            '-i', input_file,
-            '-o', output_file,
-            '-e', format_type,
-            '-w', '2400',      # Збільшена ширина для кращої якості
-            '-H', '1600',      # Збільшена висота для кращої якості
-            '-b', 'white',     # Білий фон
-            '--scale', '2'     # Масштаб 2x для кращої якості
-        ]
-        
-        info(f"Rendering {input_file} to {output_file} ({format_type})")
-        
-        # Виконати команду
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            ok(f"Successfully rendered {output_file}")
-            return True
+            result["optimized"] = optimize_diagram(mmdc, source, outputs, options, widths)
+        except Exception as e:
+            result["ok"] = False
+            result["stage"] = "optimize"
+            result["error"] = f"optimize: {e}"
+        result["timings"]["optimize"] = time.perf_counter() - started
+    return result
+
+
+def render_all(root: Path, mmdc: Optional[List[str]], formats=DEFAULT_FORMATS, options: RenderOptions = RenderOptions(),
+               jobs: Optional[int] = None, force: bool = False, manifest_path: Optional[Path] = None,
+               widths: Optional[Sequence[int]] = DEFAULT_WIDTHS, optimize_only: bool = False) -> Dict:
+    """Рендеринг змінених діаграм директорії; повертає підсумок з часом кожної діаграми
+
+    widths=None вимикає оптимізацію. optimize_only оптимізує наявні файли без mmdc
+    і не створює нових записів маніфесту (відповідність файлів джерелам невідома).
+    """
+    started = time.perf_counter()
+    manifest_path = manifest_path or root / MANIFEST_NAME
+    manifest = load_manifest(manifest_path)
+    options_key = options.key()
+    widths = list(widths) if widths is not None else None
+
+    pending = {}
+    skipped = []
+    current = {}
+    for source in discover(root):
+        name = source.relative_to(root).as_posix()
+        current[name] = source
+        outputs = {fmt: source.with_suffix(f".{fmt}") for fmt in formats}
+        source_hash = file_hash(source)
+        entry = manifest.get(name)
+        if optimize_only:
+            pending[name] = (source, source_hash, outputs, False)
+        elif force or not is_up_to_date(entry, source_hash, options_key, outputs):
+            pending[name] = (source, source_hash, outputs, True)
+        elif widths is not None and "png" in outputs and not is_optimized(entry, widths, outputs["png"]):
+            # Діаграма актуальна, але зменшених PNG для поточних ширин немає
+            pending[name] = (source, source_hash, outputs, False)
         else:
-            err(f"Failed to render diagram: {result.stderr}")
-            return False
-            
-    except Exception as e:
-        err(f"Error rendering diagram: {e}")
-        return False
+            skipped.append(name)
+
+    # Записи та зменшені копії видалених джерел прибираються
+    for name in set(manifest) - set(current):
+        remove_sizes((root / name).with_suffix(".png"))
+    manifest = {name: entry for name, entry in manifest.items() if name in current}
+
+    rendered, failed = [], []
+    if pending:
+        jobs = max(1, min(jobs or os.cpu_count() or 1, len(pending)))
+        info(f"Processing {len(pending)} diagrams ({len(skipped)} up to date) with {jobs} workers")
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                pool.submit(
+                    render_diagram, mmdc, str(source),
+                    {fmt: str(path) for fmt, path in outputs.items()}, options, widths, render
+                ): name
+                for name, (source, _, outputs, render) in pending.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                source, source_hash, outputs, render = pending[name]
+                result = future.result()
+                timings = ", ".join(f"{fmt} {seconds:.2f}s" for fmt, seconds in result["timings"].items())
+                # PNG та SVG готові, навіть якщо не вдалося створити зменшені копії
+                outputs_ready = result["ok"] or result["stage"] == "optimize"
+                if outputs_ready:
+                    entry = manifest.get(name)
+                    if render:
+                        entry = {"source": source_hash, "options": options_key}
+                    if entry is not None:
+                        entry["outputs"] = {fmt: file_hash(path) for fmt, path in outputs.items() if path.exists()}
+                        if result["timings"]:
+                            entry["timings"] = {fmt: round(seconds, 3) for fmt, seconds in result["timings"].items()}
+                        if result["optimized"] is not None and mmdc is not None:
+                            entry["widths"] = widths
+                            entry["sizes"] = {
+                                str(width): file_hash(path) for width, path in result["optimized"]["sizes"].items()
+                            }
+                            entry["skipped"] = result["optimized"]["skipped"]
+                        elif not result["ok"]:
+                            # Без записаних ширин діаграма не вважається оптимізованою, і наступний
+                            # запуск створить зменшені копії без перерендерингу PNG та SVG
+                            for key in ("widths", "sizes", "skipped"):
+                                entry.pop(key, None)
+                        manifest[name] = entry
+                if result["ok"]:
+                    rendered.append({"name": name, "timings": result["timings"], "optimized": result["optimized"]})
+                    svg = (result["optimized"] or {}).get("svg")
+                    details = f", svg {svg[0]} -> {svg[1]} bytes" if svg else ""
+                    sizes = (result["optimized"] or {}).get("sizes")
+                    details += f", sizes {sorted(sizes)}" if sizes else ""
+                    ok(f"{name}: {timings}{details}")
+                else:
+                    if not outputs_ready:
+                        manifest.pop(name, None)
+                    failed.append({"name": name, "error": result["error"]})
+                    err(f"{name}: {result['error']}")
+                # Маніфест зберігається після кожної діаграми, щоб перерваний запуск не повторював готові
+                save_manifest(manifest_path, manifest)
+    else:
+        save_manifest(manifest_path, manifest)
+
+    summary = {
+        "rendered": rendered,
+        "skipped": skipped,
+        "failed": failed,
+        "elapsed": time.perf_counter() - started
+    }
+    ok(
+        f"Generation complete: {len(rendered)} processed, {len(skipped)} skipped, "
+        f"{len(failed)} failed in {summary['elapsed']:.2f}s"
+    )
+    return summary
+
 
 def main():
     """Головна функція"""
     parser = argparse.ArgumentParser(description='Render Mermaid diagrams to images')
-    parser.add_argument('--input', '-i', required=True, help='Input Mermaid file (.mmd)')
-    parser.add_argument('--output', '-o', required=True, help='Output image file')
-    parser.add_argument('--format', '-f', default='png', choices=['png', 'svg', 'pdf'], 
-                       help='Output format (default: png)')
-    
+    parser.add_argument('--root', '-r', default='architecture', help='Directory with .mmd files (default: architecture)')
+    parser.add_argument('--input', '-i', help='Render a single Mermaid file (.mmd) instead of the whole directory')
+    parser.add_argument('--output', '-o', help='Output image file for --input')
+    parser.add_argument('--format', '-f', action='append', choices=['png', 'svg', 'pdf'],
+                        help='Output format, can be repeated (default: png and svg)')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='Parallel workers (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='Re-render even if outputs are up to date')
+    parser.add_argument('--mmdc', help='Path to the Mermaid CLI executable')
+    parser.add_argument('--widths', default=",".join(str(w) for w in DEFAULT_WIDTHS),
+                        help='Comma-separated widths of responsive PNG copies (default: %(default)s)')
+    parser.add_argument('--no-optimize', action='store_true', help='Skip SVG minification and responsive PNG sizes')
+    parser.add_argument('--optimize-only', action='store_true',
+                        help='Only minify existing SVG files, without running Mermaid CLI')
+    parser.add_argument('--width', type=int, default=RenderOptions.width)
+    parser.add_argument('--height', type=int, default=RenderOptions.height)
+    parser.add_argument('--scale', type=int, default=RenderOptions.scale)
+    parser.add_argument('--background', default=RenderOptions.background)
+
     args = parser.parse_args()
-    
+    options = RenderOptions(args.width, args.height, args.scale, args.background)
+    widths = None if args.no_optimize else [int(width) for width in args.widths.split(",") if width.strip()]
+
+    if args.optimize_only:
+        summary = render_all(Path(args.root), None, tuple(args.format or DEFAULT_FORMATS), options, args.jobs,
+                             widths=widths or [], optimize_only=True)
+        sys.exit(1 if summary["failed"] else 0)
+
     # Перевірити чи встановлений Mermaid CLI
-    if not check_mermaid_cli():
+    mmdc = find_mmdc(args.mmdc)
+    if mmdc is None:
         info("Mermaid CLI not found. Attempting to install...")
-        if not install_mermaid_cli():
+        if not install_mermaid_cli() or (mmdc := find_mmdc()) is None:
             err("Failed to install Mermaid CLI. Please install manually:")
             err("npm install -g @mermaid-js/mermaid-cli")
             sys.exit(1)
-    
-    # Рендерити діаграму
-    if render_diagram(args.input, args.output, args.format):
+
+    if args.input:
+        fmt = (args.format or ['png'])[0]
+        output = args.output or str(Path(args.input).with_suffix(f".{fmt}"))
+        info(f"Rendering {args.input} to {output} ({fmt})")
+        result = render_diagram(mmdc, args.input, {fmt: output}, options)
+        if not result["ok"]:
+            err(f"Failed to render diagram: {result['error']}")
+            sys.exit(1)
+        ok(f"Successfully rendered {output} in {result['timings'][fmt]:.2f}s")
         sys.exit(0)
-    else:
-        sys.exit(1)
+
+    summary = render_all(Path(args.root), mmdc, tuple(args.format or DEFAULT_FORMATS), options, args.jobs, args.force,
+                         widths=widths)
+    sys.exit(1 if summary["failed"] else 0)
+
 
 if __name__ == "__main__":
     main()
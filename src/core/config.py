@@ -5,6 +5,7 @@ AI Cyber Tool - Configuration
 
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 from urllib.parse import urlparse, urlunparse
 from pydantic import field_validator
 
@@ -43,6 +44,39 @@ class Settings(BaseSettings):
     """Централізовані налаштування додатку"""
     # База даних
     database_url: str = "app.db"
+    db_pool_readers: int = 4
+    db_cache_size_kib: int = 16384
+    db_mmap_size: int = 268435456
+    db_busy_timeout_ms: int = 5000
+    db_pg_pool_min_size: int = 2
+    db_pg_pool_max_size: int = 10
+    analysis_logs_batch_max_items: int = 50000
+    analysis_logs_batch_chunk_size: int = 500
+    analysis_logs_export_chunk_size: int = 1000
+    analysis_logs_stats_max_points: int = 1500
+    log_writer_enabled: bool = True
+    log_writer_batch_size: int = 500
+    log_writer_flush_interval_ms: int = 50
+    log_writer_max_pending: int = 10000
+    log_hot_months: int = 0
+    log_archive_dir: str = "archive"
+    log_archive_retention_months: int = 0
+    log_retention_interval_hours: float = 6
+    log_compression_enabled: bool = True
+    log_compression_train_samples: int = 2000
+    log_compression_dictionary_size: int = 16384
+    backup_enabled: bool = False
+    backup_dir: str = "backups"
+    backup_interval_hours: float = 24
+    backup_keep: int = 7
+    backup_compress: bool = True
+    backup_verify: bool = True
+    backup_pages_per_step: int = 256
+    backup_step_sleep_ms: int = 5
+    session_cache_enabled: bool = True
+    session_cache_ttl_seconds: float = 30
+    session_cache_validate_ms: int = 500
+    session_cache_max_entries: int = 1024
     
     # Середовище
     environment: str = "development"
@@ -58,11 +92,22 @@ class Settings(BaseSettings):
     rabbitmq_url: str = "amqp://localhost:5672"
     rabbitmq_commands_exchange: str = "commands.exchange"
     rabbitmq_events_exchange: str = "events.exchange"
+    rabbitmq_heartbeat: int = 60
+    rabbitmq_publish_buffer_size: int = 10000
+    rabbitmq_publish_spill_dir: Optional[str] = None
+    log_ingestion_enabled: bool = False
+    log_ingestion_batch_size: int = 500
+    log_ingestion_flush_interval_ms: int = 200
     
     # API
     api_title: str = "AI Cyber Tool"
     api_version: str = "1.0.0"
     api_description: str = "AICyberTool - це комплексна система управління цифровою трансформацією та кібербезпеки, що поєднує штучний інтелект, кібернетичне управління та автоматизоване реагування на загрози. Проект побудований на архітектурі мікросервісів з прогресивним підходом до безпеки та масштабованості."
+    docs_revalidate_ms: int = 1000
+    diagrams_refresh_interval_ms: int = 2000
+    static_cache_dir: str = ".cache/static"
+    templates_cache_dir: str = ".cache/jinja2"
+    search_refresh_interval_ms: int = 2000
     
     # Безпека
     secret_key: str = "your-secret-key-change-in-production"
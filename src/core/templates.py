@@ -0,0 +1,61 @@
+"""
+AI Cyber Tool - Templates
+Спільне Jinja2 середовище з кешем байткоду та попередньою компіляцією шаблонів
+"""
+
+import asyncio
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from loguru import logger
+
+from .config import get_settings
+
+settings = get_settings()
+
+
+def create_templates(directory: Union[str, Path] = "templates", cache_dir: Optional[Union[str, Path]] = None,
+                     auto_reload: bool = False) -> Jinja2Templates:
+    """Jinja2Templates з кешем скомпільованих шаблонів на диску
+
+    Кеш байткоду спільний для всіх воркерів і переживає перезапуск; auto_reload
+    (перевірка змін файлів шаблонів при кожному рендерингу) потрібен тільки в розробці.
+    """
+    bytecode_cache = None
+    if cache_dir:
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(str(cache_dir))
+    env = Environment(
+        loader=FileSystemLoader(str(directory)),
+        autoescape=True,
+        auto_reload=auto_reload,
+        bytecode_cache=bytecode_cache
+    )
+    return Jinja2Templates(env=env)
+
+
+def precompile(templates: Jinja2Templates) -> int:
+    """Компіляція всіх шаблонів у кеш середовища; повертає кількість шаблонів"""
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
+
+
+async def precompile_templates(target: Optional[Jinja2Templates] = None):
+    """Попередня компіляція шаблонів при старті, щоб перший запит не чекав на компіляцію"""
+    target = target or templates
+    started = time.perf_counter()
+    count = await asyncio.to_thread(precompile, target)
+    logger.info(f"Templates precompiled ({count} templates in {(time.perf_counter() - started) * 1000:.1f} ms)")
+
+
+# Єдине середовище шаблонів для додатку та роутерів
+templates = create_templates(
+    "templates",
+    cache_dir=settings.templates_cache_dir,
+    auto_reload=settings.environment == "development"
+)
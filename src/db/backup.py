@@ -0,0 +1,231 @@
+"""
+AI Cyber Tool - Database Backup
+Онлайн резервні копії SQLite через backup API: невеликі порції сторінок, ротація, перевірка цілісності
+"""
+
+import asyncio
+import re
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from .compression import connect
+from .locks import FileLock
+from .partitions import _compress
+
+
+def _copy_online(database_path: str, target: Path, pages_per_step: int, step_sleep: float,
+                 busy_timeout: float) -> Dict:
+    """Копіювання БД порціями сторінок (виконується в потоці)
+
+    Вся копія читається в одній транзакції читання: вона фіксує знімок WAL, тому
+    копія узгоджена і не перезапускається через записи інших з'єднань (без неї
+    backup(pages=N) починає спочатку після кожного запису і при постійних записах
+    може не завершитись). У WAL режимі writers не чекають на цю транзакцію, але
+    checkpoint не переносить у файл БД сторінки, новіші за знімок: до кінця копіювання
+    WAL файл тільки росте. step_sleep обмежує навантаження на диск і водночас
+    подовжує цей час, тому для великих баз даних з інтенсивним записом його варто зменшити.
+    """
+    source = sqlite3.connect(database_path, timeout=busy_timeout, isolation_level=None)
+    destination = sqlite3.connect(target)
+    progress = {"steps": 0, "pages": 0}
+
+    def on_step(status, remaining, total):
+        progress["steps"] += 1
+        progress["pages"] = total
+        if remaining:
+            time.sleep(step_sleep)
+
+    try:
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        source.backup(destination, pages=pages_per_step, progress=on_step, sleep=step_sleep)
+        source.execute("ROLLBACK")
+        return progress
+    finally:
+        destination.close()
+        source.close()
+
+
+def _check_integrity(path: Path) -> str:
+    """PRAGMA integrity_check для файлу копії (виконується в потоці)
+
+    Нові версії SQLite перевіряють і FTS5 індекси, читаючи їх content view з log_text().
+    """
+    conn = connect(str(path), read_only=True)
+    try:
+        rows = conn.execute("PRAGMA integrity_check").fetchall()
+        return "; ".join(row[0] for row in rows)
+    finally:
+        conn.close()
+
+
+class DatabaseBackup:
+    """Періодичні резервні копії SQLite бази даних з ротацією"""
+
+    def __init__(self, database_path: str, backup_dir: str, interval: float = 24 * 3600, keep: int = 7,
+                 compress: bool = True, verify: bool = True, pages_per_step: int = 256,
+                 step_sleep: float = 0.005, busy_timeout: float = 5.0):
+        self.database_path = database_path
+        self.backup_dir = Path(backup_dir)
+        self.interval = interval
+        self.keep = keep
+        self.compress = compress
+        self.verify = verify
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.busy_timeout = busy_timeout
+
+        self.stem = Path(database_path).stem
+        self._name = re.compile(rf"^{re.escape(self.stem)}-(\d{{8}}T\d{{6}}\d{{6}})\.db(\.gz)?$")
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.failures = 0
+        self.last: Optional[Dict] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Запуск періодичної задачі"""
+        if not self.is_running:
+            self._task = asyncio.create_task(self._loop(), name="database-backup")
+
+    async def stop(self):
+        """Зупинка періодичної задачі"""
+        if self.is_running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _loop(self):
+        await asyncio.sleep(self._first_delay())
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Database backup failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def _first_delay(self) -> float:
+        """Після перезапуску наступна копія робиться через interval від останньої існуючої"""
+        backups = self.backups()
+        if not backups:
+            return 0.0
+        age = time.time() - (self.backup_dir / backups[-1]["file"]).stat().st_mtime
+        return max(0.0, self.interval - age)
+
+    def backups(self) -> List[Dict]:
+        """Існуючі резервні копії від старіших до новіших"""
+        if not self.backup_dir.exists():
+            return []
+        found = []
+        for path in self.backup_dir.iterdir():
+            match = self._name.match(path.name)
+            if match:
+                found.append({
+                    "file": path.name,
+                    "created_at": datetime.strptime(match.group(1), "%Y%m%dT%H%M%S%f").isoformat(),
+                    "compressed": match.group(2) is not None,
+                    "size": path.stat().st_size
+                })
+        return sorted(found, key=lambda backup: backup["created_at"])
+
+    async def run_once(self) -> Dict:
+        """Створення однієї резервної копії; воркери серіалізуються через lock-файл"""
+        lock = FileLock(f"{self.database_path}.backup.lock")
+        await asyncio.to_thread(lock.acquire)
+        try:
+            result = await self._backup()
+            self.runs += 1
+            self.last = result
+            self.last_error = None
+            return result
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            raise
+        finally:
+            lock.release()
+
+    async def _backup(self) -> Dict:
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        created_at = datetime.utcnow()
+        name = f"{self.stem}-{created_at.strftime('%Y%m%dT%H%M%S%f')}.db"
+        raw = self.backup_dir / f"{name}.partial"
+        target = self.backup_dir / (f"{name}.gz" if self.compress else name)
+        timings = {}
+
+        try:
+            started = time.perf_counter()
+            progress = await asyncio.to_thread(
+                _copy_online, self.database_path, raw, self.pages_per_step, self.step_sleep, self.busy_timeout
+            )
+            timings["copy_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+            if self.verify:
+                started = time.perf_counter()
+                integrity = await asyncio.to_thread(_check_integrity, raw)
+                timings["verify_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                if integrity != "ok":
+                    raise sqlite3.DatabaseError(f"Backup integrity check failed: {integrity}")
+
+            size = raw.stat().st_size
+            if self.compress:
+                started = time.perf_counter()
+                await asyncio.to_thread(_compress, raw, target)
+                timings["compress_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                raw.unlink()
+            else:
+                raw.replace(target)
+        except BaseException:
+            raw.unlink(missing_ok=True)
+            raise
+
+        removed = self._rotate()
+        result = {
+            "file": target.name,
+            "created_at": created_at.isoformat(),
+            "pages": progress["pages"],
+            "steps": progress["steps"],
+            "database_size": size,
+            "backup_size": target.stat().st_size,
+            "verified": self.verify,
+            "duration_ms": round(sum(timings.values()), 1),
+            **timings,
+            "removed": removed
+        }
+        logger.info(
+            f"Database backup {target.name} created in {result['duration_ms']} ms "
+            f"({result['pages']} pages, {result['steps']} steps)"
+        )
+        return result
+
+    def _rotate(self) -> List[str]:
+        """Видалення найстаріших копій понад keep"""
+        if self.keep <= 0:
+            return []
+        removed = []
+        for backup in self.backups()[:-self.keep]:
+            (self.backup_dir / backup["file"]).unlink(missing_ok=True)
+            removed.append(backup["file"])
+        return removed
+
+    def get_stats(self) -> Dict:
+        """Метрики резервного копіювання"""
+        return {
+            "running": self.is_running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last": self.last,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,92 @@
+"""
+AI Cyber Tool - Read Cache
+Read-through кеш читань з TTL та інвалідацією між воркерами через лічильник поколінь
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+# Функція читання поточного покоління даних з бази (спільного для всіх воркерів)
+GenerationFunction = Callable[[], Awaitable[int]]
+
+
+class ReadCache:
+    """Кеш результатів читання, що скидається при зміні покоління даних
+
+    Запис у цьому воркері викликає invalidate() одразу. Записи інших воркерів
+    збільшують покоління в базі даних (тригером), яке перевіряється не частіше
+    ніж раз на validate_interval секунд, тому застарілість між воркерами обмежена
+    цим інтервалом, а в межах воркера її немає.
+    """
+
+    def __init__(self, generation: GenerationFunction, ttl: float = 30.0,
+                 validate_interval: float = 0.5, max_entries: int = 1024):
+        self.generation = generation
+        self.ttl = ttl
+        self.validate_interval = validate_interval
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._generation: Optional[int] = None
+        self._validated_at = 0.0
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def invalidate(self):
+        """Скидання всіх записів кешу"""
+        self._entries.clear()
+        self._epoch += 1
+        # Власний запис теж змінив покоління в базі: наступне читання лише запам'ятає нове
+        self._generation = None
+        self._validated_at = 0.0
+        self.invalidations += 1
+
+    async def _validate(self, now: float):
+        """Скидання кешу, якщо інший воркер змінив дані"""
+        if now - self._validated_at < self.validate_interval:
+            return
+        generation = await self.generation()
+        if generation != self._generation:
+            if self._generation is not None:
+                self.invalidate()
+            self._generation = generation
+        self._validated_at = now
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Значення з кешу або результат loader(), збережений до закінчення TTL"""
+        now = time.monotonic()
+        await self._validate(now)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        epoch = self._epoch
+        value = await loader()
+        # Результат, прочитаний до інвалідації, не зберігається
+        if epoch == self._epoch:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика кешу"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl,
+            "validate_interval_seconds": self.validate_interval
+        }
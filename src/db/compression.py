@@ -0,0 +1,194 @@
+"""
+AI Cyber Tool - Log Message Compression
+Стиснення тексту логів аналізу deflate зі спільним словником для кожного log_type
+"""
+
+import re
+import sqlite3
+import struct
+import threading
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+import aiosqlite
+
+
+_SEGMENT = re.compile(r"\S+\s*")
+
+# Заголовок стисненого значення: ID словника (0 - без словника)
+_HEADER = struct.Struct(">H")
+
+# Розмір вікна deflate: довший словник не використовується
+MAX_DICTIONARY_SIZE = 32768
+
+
+def train_dictionary(samples: Iterable[str], size: int = 16384) -> bytes:
+    """Словник deflate з фрагментів, що найчастіше повторюються у зразках
+
+    Фрагменти - послідовності з 1-4 слів; найцінніші (частота * довжина) розміщуються
+    в кінці словника, найближче до стиснених даних.
+    """
+    size = min(size, MAX_DICTIONARY_SIZE)
+    counts: Counter = Counter()
+    for sample in samples:
+        words = _SEGMENT.findall(sample)
+        for length in range(1, 5):
+            for start in range(len(words) - length + 1):
+                counts["".join(words[start:start + length])] += 1
+
+    ranked = sorted(
+        (fragment for fragment, count in counts.items() if count > 1),
+        key=lambda fragment: counts[fragment] * len(fragment.encode()),
+        reverse=True
+    )
+    chosen = []
+    total = 0
+    for fragment in ranked:
+        data = fragment.encode()
+        if total + len(data) <= size:
+            chosen.append(data)
+            total += len(data)
+    return b"".join(reversed(chosen))
+
+
+class MessageCodec:
+    """Стиснення та розпакування analysis_logs.message
+
+    Стиснене значення зберігається як BLOB (ID словника + raw deflate), короткі рядки,
+    що не стискаються, залишаються TEXT. Словники незмінні після створення, тому
+    невідомий ID (словник іншого воркера) довантажується з бази даних один раз.
+    Методи викликаються як SQL функції з потоків з'єднань aiosqlite.
+    """
+
+    def __init__(self, database_path: str, enabled: bool = True, level: int = 6):
+        self.database_path = database_path
+        self.enabled = enabled
+        self.level = level
+        self._dictionaries: Dict[int, bytes] = {}
+        self._active: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.packed = 0
+        self.stored_plain = 0
+
+    def add_dictionary(self, dictionary_id: int, log_type: str, dictionary: bytes):
+        """Реєстрація словника та використання його для нових логів цього типу"""
+        with self._lock:
+            self._dictionaries[dictionary_id] = dictionary
+            if dictionary_id > self._active.get(log_type, 0):
+                self._active[log_type] = dictionary_id
+
+    def has_dictionary(self, log_type: str) -> bool:
+        return log_type in self._active
+
+    def load(self, conn: sqlite3.Connection):
+        """Завантаження всіх словників з таблиці log_dictionaries"""
+        try:
+            rows = conn.execute("SELECT id, log_type, dictionary FROM log_dictionaries").fetchall()
+        except sqlite3.OperationalError:
+            # Схема ще без таблиці словників
+            return
+        for dictionary_id, log_type, dictionary in rows:
+            self.add_dictionary(dictionary_id, log_type, dictionary)
+
+    def _load_missing(self, dictionary_id: int) -> bytes:
+        if self.database_path != ":memory:":
+            conn = sqlite3.connect(f"file:{self.database_path}?mode=ro", uri=True)
+            try:
+                self.load(conn)
+            finally:
+                conn.close()
+        if dictionary_id not in self._dictionaries:
+            raise ValueError(f"Unknown log compression dictionary {dictionary_id}")
+        return self._dictionaries[dictionary_id]
+
+    def pack(self, log_type: str, message: str) -> Union[str, bytes]:
+        """Стиснене значення для запису (або сам текст, якщо стиснення не дає виграшу)"""
+        if not self.enabled or message is None:
+            return message
+        raw = message.encode()
+        dictionary_id = self._active.get(log_type, 0)
+        if dictionary_id:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY,
+                                          self._dictionaries[dictionary_id])
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, 9)
+        packed = _HEADER.pack(dictionary_id) + compressor.compress(raw) + compressor.flush()
+        if len(packed) >= len(raw):
+            self.stored_plain += 1
+            return message
+        self.packed += 1
+        return packed
+
+    def unpack(self, value: Union[str, bytes, None]) -> Optional[str]:
+        """Текст повідомлення зі збереженого значення"""
+        if not isinstance(value, bytes):
+            return value
+        (dictionary_id,) = _HEADER.unpack_from(value)
+        if dictionary_id:
+            dictionary = self._dictionaries.get(dictionary_id) or self._load_missing(dictionary_id)
+            decompressor = zlib.decompressobj(-15, zdict=dictionary)
+        else:
+            decompressor = zlib.decompressobj(-15)
+        return (decompressor.decompress(value[_HEADER.size:]) + decompressor.flush()).decode()
+
+    def register(self, conn: sqlite3.Connection):
+        """SQL функції log_pack(log_type, message) та log_text(message) для sqlite3 з'єднання"""
+        conn.create_function("log_pack", 2, self.pack)
+        conn.create_function("log_text", 1, self.unpack, deterministic=True)
+
+    async def register_async(self, conn: aiosqlite.Connection):
+        """SQL функції log_pack та log_text для aiosqlite з'єднання"""
+        await conn.create_function("log_pack", 2, self.pack)
+        await conn.create_function("log_text", 1, self.unpack, deterministic=True)
+
+    def get_stats(self) -> Dict:
+        """Статистика стиснення воркера"""
+        return {
+            "enabled": self.enabled,
+            "dictionaries": dict(self._active),
+            "packed": self.packed,
+            "stored_plain": self.stored_plain
+        }
+
+
+def connect(database_path: str, read_only: bool = False) -> sqlite3.Connection:
+    """sqlite3 з'єднання з SQL функціями log_pack/log_text поза додатком
+
+    log_text() реєструється додатком, а не зберігається в базі даних: без неї view
+    analysis_logs_YYYY_MM_text (content FTS5 індексів) та тригери партицій не працюють
+    у звичайному SQLite клієнті. Для резервних копій та скриптів обслуговування.
+    """
+    if read_only:
+        conn = sqlite3.connect(f"file:{Path(database_path).as_posix()}?mode=ro", uri=True)
+    else:
+        conn = sqlite3.connect(database_path)
+    codec = MessageCodec(database_path, enabled=False)
+    codec.load(conn)
+    codec.register(conn)
+    return conn
+
+
+def decompress_database(database_path: str) -> int:
+    """Заміна стиснених повідомлень текстом (для копії бази даних, наприклад з резервної)
+
+    Після цього analysis_logs читається будь-яким SQLite клієнтом. FTS індекси не
+    змінюються: тригер оновлення пропускає рядки з тим самим текстом. Повертає
+    кількість розпакованих логів.
+    """
+    from .partitions import hot_table
+
+    conn = connect(database_path)
+    try:
+        months = [row[0] for row in conn.execute("SELECT month FROM log_partitions")]
+        total = 0
+        for month in months:
+            total += conn.execute(
+                f"UPDATE {hot_table(month)} SET message = log_text(message) WHERE typeof(message) = 'blob'"
+            ).rowcount
+        conn.commit()
+        conn.execute("VACUUM")
+        return total
+    finally:
+        conn.close()
@@ -3,115 +3,409 @@ AI Cyber Tool - Database Logic
 Асинхронна логіка роботи з базою даних
 """
 
-import aiosqlite
-from datetime import datetime
+import asyncio
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
 from loguru import logger
-from ..core.config import get_settings
+from ..core.config import get_settings, get_database_type
+from .pool import DatabasePool
+from .backup import DatabaseBackup
+from .cache import ReadCache
+from .log_writer import AnalysisLogWriter
+from .pagination import decode_cursor, encode_cursor
+from .partitions import LogArchive, LogRetention
+from .repository import Repository
+from .rollups import bucket_key, choose_granularity
+from .sqlite_repository import SQLiteRepository, build_match_query
 
 
 settings = get_settings()
 
+_repository: Optional[Repository] = None
+_repository_lock = asyncio.Lock()
+_log_writer: Optional[AnalysisLogWriter] = None
+_log_retention: Optional[LogRetention] = None
+_database_backup: Optional[DatabaseBackup] = None
+
+log_archive = LogArchive(settings.log_archive_dir)
+
+
+def create_repository(database_url: str) -> Repository:
+    """Сховище для URL бази даних (вибір реалізації за схемою URL)"""
+    database_type = get_database_type(database_url)
+    if database_type == "sqlite":
+        return SQLiteRepository(
+            database_url,
+            readers=settings.db_pool_readers,
+            cache_size_kib=settings.db_cache_size_kib,
+            mmap_size=settings.db_mmap_size,
+            busy_timeout_ms=settings.db_busy_timeout_ms,
+            compression=settings.log_compression_enabled,
+            train_samples=settings.log_compression_train_samples,
+            dictionary_size=settings.log_compression_dictionary_size
+        )
+    if database_type.split("+")[0] in ("postgres", "postgresql"):
+        from .postgres_repository import PostgresRepository
+        return PostgresRepository(
+            database_url,
+            min_size=settings.db_pg_pool_min_size,
+            max_size=settings.db_pg_pool_max_size
+        )
+    raise ValueError(f"Unsupported database type: {database_type}")
+
+
+async def get_repository() -> Repository:
+    """Отримання сховища воркера (відкривається при першому зверненні)"""
+    global _repository
+    if _repository is None or not _repository.is_open:
+        async with _repository_lock:
+            if _repository is None or not _repository.is_open:
+                repository = create_repository(settings.database_url)
+                await repository.open()
+                _repository = repository
+    return _repository
+
+
+async def get_pool() -> DatabasePool:
+    """Пул з'єднань SQLite воркера (для операцій, специфічних для SQLite)"""
+    repository = await get_repository()
+    if not isinstance(repository, SQLiteRepository):
+        raise RuntimeError(f"Connection pool is only available for SQLite, not {repository.database_type}")
+    return repository.pool
+
+
+async def _sessions_generation() -> int:
+    """Поточне покоління таблиці sessions (змінюється тригерами при кожному записі)"""
+    repository = await get_repository()
+    return await repository.sessions_generation()
+
+
+session_cache = ReadCache(
+    _sessions_generation,
+    ttl=settings.session_cache_ttl_seconds,
+    validate_interval=settings.session_cache_validate_ms / 1000,
+    max_entries=settings.session_cache_max_entries
+)
+
+
+async def start_log_writer():
+    """Запуск фонового write-behind запису логів аналізу"""
+    global _log_writer
+    if not settings.log_writer_enabled or (_log_writer is not None and _log_writer.is_running):
+        return
+    _log_writer = AnalysisLogWriter(
+        lambda logs: create_analysis_logs(logs, chunk_size=settings.log_writer_batch_size),
+        batch_size=settings.log_writer_batch_size,
+        flush_interval=settings.log_writer_flush_interval_ms / 1000,
+        max_pending=settings.log_writer_max_pending
+    )
+    await _log_writer.start()
+
+
+async def start_log_retention():
+    """Запуск періодичного перенесення старих логів в архівні партиції"""
+    global _log_retention
+    if settings.log_hot_months <= 0 or settings.database_url == ":memory:":
+        return
+    if _log_retention is not None and _log_retention.is_running:
+        return
+    repository = await get_repository()
+    if not isinstance(repository, SQLiteRepository):
+        logger.warning(f"Log retention archives are only supported for SQLite, not {repository.database_type}")
+        return
+    _log_retention = LogRetention(
+        get_pool,
+        repository.database_path,
+        log_archive,
+        hot_months=settings.log_hot_months,
+        archive_retention_months=settings.log_archive_retention_months,
+        interval=settings.log_retention_interval_hours * 3600
+    )
+    await _log_retention.start()
+    logger.info(f"Log retention started ({settings.log_hot_months} hot month(s), archive in {settings.log_archive_dir})")
+
+
+async def get_database_backup() -> DatabaseBackup:
+    """Резервне копіювання бази даних воркера (тільки SQLite)"""
+    global _database_backup
+    if _database_backup is None:
+        repository = await get_repository()
+        if not isinstance(repository, SQLiteRepository) or repository.database_path == ":memory:":
+            raise RuntimeError(f"Online backups are only supported for SQLite files, not {repository.database_type}")
+        _database_backup = DatabaseBackup(
+            repository.database_path,
+            settings.backup_dir,
+            interval=settings.backup_interval_hours * 3600,
+            keep=settings.backup_keep,
+            compress=settings.backup_compress,
+            verify=settings.backup_verify,
+            pages_per_step=settings.backup_pages_per_step,
+            step_sleep=settings.backup_step_sleep_ms / 1000,
+            busy_timeout=settings.db_busy_timeout_ms / 1000
+        )
+    return _database_backup
+
+
+async def start_database_backup():
+    """Запуск періодичного онлайн резервного копіювання"""
+    if not settings.backup_enabled:
+        return
+    try:
+        backup = await get_database_backup()
+    except RuntimeError as e:
+        logger.warning(str(e))
+        return
+    await backup.start()
+    logger.info(f"Database backups started (every {settings.backup_interval_hours} h, keep {settings.backup_keep})")
+
+
+async def close_database():
+    """Запис буферизованих логів та закриття з'єднань воркера"""
+    global _repository, _log_writer, _log_retention, _database_backup
+    session_cache.invalidate()
+    if _database_backup is not None:
+        await _database_backup.stop()
+        _database_backup = None
+    if _log_retention is not None:
+        await _log_retention.stop()
+        _log_retention = None
+    if _log_writer is not None:
+        await _log_writer.stop()
+        _log_writer = None
+    if _repository is not None:
+        await _repository.close()
+        _repository = None
+
 
 async def init_database():
-    """Асинхронна ініціалізація бази даних SQLite"""
+    """Асинхронна ініціалізація бази даних (застосування міграцій схеми)"""
     try:
-        async with aiosqlite.connect(settings.database_url) as conn:
-            # Створення таблиці для зберігання інформації про сесії
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_name TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    status TEXT DEFAULT 'active'
-                )
-            """)
-            
-            # Створення таблиці для зберігання логів аналізу
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS analysis_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id INTEGER,
-                    log_type TEXT NOT NULL,
-                    message TEXT NOT NULL,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (session_id) REFERENCES sessions (id)
-                )
-            """)
-            
-            await conn.commit()
-            logger.info("Database initialized successfully")
-            
+        repository = await get_repository()
+        applied, version = await repository.migrate()
+        logger.info(
+            f"Database initialized successfully ({repository.database_type} schema v{version}, "
+            f"{applied} new migration(s))"
+        )
+        
+        await start_log_writer()
+        await start_log_retention()
+        await start_database_backup()
+    
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         raise
 
 
-async def get_sessions():
-    """Отримання списку всіх сесій"""
+async def get_sessions(limit: int = 50, cursor: Optional[str] = None, status: Optional[str] = None,
+                       created_after: Optional[str] = None, created_before: Optional[str] = None):
+    """Отримання сторінки сесій, від новіших до старіших (через кеш читань)"""
+    if not settings.session_cache_enabled:
+        return await _load_sessions(limit, cursor, status, created_after, created_before)
+    sessions = await session_cache.get_or_load(
+        ("list", limit, cursor, status, created_after, created_before),
+        lambda: _load_sessions(limit, cursor, status, created_after, created_before)
+    )
+    return [dict(session) for session in sessions]
+
+
+async def _load_sessions(limit: int, cursor: Optional[str], status: Optional[str],
+                         created_after: Optional[str], created_before: Optional[str]):
+    """Читання сторінки сесій зі сховища
+    
+    Keyset пагінація за (created_at, id): наступна сторінка починається після
+    курсору, тому глибокі сторінки коштують стільки ж, скільки перша.
+    """
+    position = decode_cursor(cursor)
     try:
-        async with aiosqlite.connect(settings.database_url) as conn:
-            conn.row_factory = aiosqlite.Row
-            cursor = await conn.execute("""
-                SELECT id, session_name, created_at, status
-                FROM sessions
-                ORDER BY created_at DESC
-                LIMIT 50
-            """)
-            sessions_data = await cursor.fetchall()
-            sessions = [dict(row) for row in sessions_data]
-            return sessions
+        repository = await get_repository()
+        return await repository.get_sessions(limit, position, status, created_after, created_before)
     except Exception as e:
         logger.error(f"Failed to get sessions: {e}")
         raise
 
 
+async def get_session(session_id: int):
+    """Отримання сесії за ID (None, якщо не існує) через кеш читань"""
+    if not settings.session_cache_enabled:
+        return await _load_session(session_id)
+    session = await session_cache.get_or_load(("session", session_id), lambda: _load_session(session_id))
+    return dict(session) if session else None
+
+
+async def _load_session(session_id: int):
+    """Читання сесії зі сховища"""
+    try:
+        repository = await get_repository()
+        return await repository.get_session(session_id)
+    except Exception as e:
+        logger.error(f"Failed to get session {session_id}: {e}")
+        raise
+
+
+async def get_session_logs(session_id: int, limit: int = 100, cursor: Optional[str] = None,
+                           log_type: Optional[str] = None, since: Optional[str] = None,
+                           until: Optional[str] = None):
+    """Отримання сторінки логів сесії в хронологічному порядку (keyset за (timestamp, id))"""
+    position = decode_cursor(cursor)
+    try:
+        repository = await get_repository()
+        return await repository.get_session_logs(session_id, limit, position, log_type, since, until)
+    except Exception as e:
+        logger.error(f"Failed to get logs for session {session_id}: {e}")
+        raise
+
+
 async def create_session(session_name: str):
-    """Створення нової сесії"""
+    """Створення нової сесії; повертає (id, session_name, created_at, status)"""
     try:
-        async with aiosqlite.connect(settings.database_url) as conn:
-            cursor = await conn.execute("""
-                INSERT INTO sessions (session_name, created_at, status)
-                VALUES (?, ?, ?)
-            """, (session_name, datetime.utcnow().isoformat(), "active"))
-            
-            await conn.commit()
-            session_id = cursor.lastrowid
-            
-            # Отримуємо створену сесію для відповіді
-            cursor = await conn.execute("""
-                SELECT id, session_name, created_at, status
-                FROM sessions
-                WHERE id = ?
-            """, (session_id,))
-            
-            session_data = await cursor.fetchone()
-            return session_data
+        repository = await get_repository()
+        session = await repository.create_session(session_name, datetime.utcnow().isoformat())
+        session_cache.invalidate()
+        return session["id"], session["session_name"], session["created_at"], session["status"]
     except Exception as e:
         logger.error(f"Failed to create session: {e}")
         raise
 
 
-async def create_analysis_log(session_id: int, log_type: str, message: str):
-    """Створення нового логу аналізу"""
+async def create_analysis_log(session_id: int, log_type: str, message: str, wait: bool = True):
+    """Створення нового логу аналізу
+    
+    Якщо запущено write-behind writer, лог записується в спільній пакетній транзакції.
+    З wait=False функція не чекає на коміт і повертає None.
+    """
+    if _log_writer is not None and _log_writer.is_running:
+        return await _log_writer.submit(session_id, log_type, message, wait=wait)
+    
+    log_id = (await create_analysis_logs([(session_id, log_type, message)]))[0]
+    if log_id is None:
+        raise ValueError("Session not found")
+    return log_id
+
+
+async def create_analysis_logs(logs: Sequence[Tuple[int, str, str]], chunk_size: int = 500,
+                               existing_sessions: Optional[Dict[int, bool]] = None,
+                               before_commit: Optional[Callable[[], bool]] = None) -> List[Optional[int]]:
+    """Пакетне створення логів аналізу
+    
+    Приймає кортежі (session_id, log_type, message) і повертає список ID у тому ж порядку,
+    з None для логів, сесія яких не існує. Існування кожної сесії перевіряється один раз
+    (результат запам'ятовується в existing_sessions), вставка виконується однією
+    транзакцією на кожні chunk_size рядків. before_commit викликається перед комітом
+    кожної транзакції (див. Repository.insert_analysis_logs).
+    """
+    if existing_sessions is None:
+        existing_sessions = {}
+    
     try:
-        async with aiosqlite.connect(settings.database_url) as conn:
-            # Перевіряємо чи існує сесія
-            cursor = await conn.execute("""
-                SELECT id FROM sessions WHERE id = ?
-            """, (session_id,))
-            
-            if not await cursor.fetchone():
-                raise ValueError("Session not found")
-            
-            # Створюємо лог
-            cursor = await conn.execute("""
-                INSERT INTO analysis_logs (session_id, log_type, message, timestamp)
-                VALUES (?, ?, ?, ?)
-            """, (session_id, log_type, message, datetime.utcnow().isoformat()))
-            
-            await conn.commit()
-            log_id = cursor.lastrowid
-            return log_id
+        repository = await get_repository()
+        unknown = list({session_id for session_id, _, _ in logs} - existing_sessions.keys())
+        if unknown:
+            found = await repository.existing_sessions(unknown)
+            for session_id in unknown:
+                existing_sessions[session_id] = session_id in found
+        
+        results: List[Optional[int]] = [None] * len(logs)
+        positions = [i for i, log in enumerate(logs) if existing_sessions[log[0]]]
+        timestamp = datetime.utcnow().isoformat()
+        
+        for start in range(0, len(positions), chunk_size):
+            chunk = positions[start:start + chunk_size]
+            ids = await repository.insert_analysis_logs([logs[i] for i in chunk], timestamp, before_commit)
+            for i, log_id in zip(chunk, ids):
+                results[i] = log_id
+        
+        return results
+    except Exception as e:
+        logger.error(f"Failed to create analysis logs batch: {e}")
+        raise
+
+
+async def iter_session_logs(session_id: int, chunk_size: int = 1000, log_type: Optional[str] = None,
+                            since: Optional[str] = None, until: Optional[str] = None) -> AsyncIterator[List[dict]]:
+    """Послідовні порції логів сесії для потокового експорту
+    
+    Кожна порція - окремий keyset запит, тому пам'ять не залежить від кількості логів,
+    а з'єднання повертається в пул між порціями.
+    """
+    cursor = None
+    while True:
+        logs = await get_session_logs(
+            session_id, limit=chunk_size, cursor=cursor, log_type=log_type, since=since, until=until
+        )
+        if not logs:
+            return
+        yield logs
+        if len(logs) < chunk_size:
+            return
+        cursor = encode_cursor(logs[-1]["timestamp"], logs[-1]["id"])
+
+
+async def iter_all_session_logs(session_id: int, chunk_size: int = 1000, log_type: Optional[str] = None,
+                                since: Optional[str] = None, until: Optional[str] = None) -> AsyncIterator[List[dict]]:
+    """Порції логів сесії з архівних партицій, а потім з гарячої таблиці"""
+    async for logs in log_archive.iter_session_logs(session_id, chunk_size, log_type, since, until):
+        yield logs
+    async for logs in iter_session_logs(session_id, chunk_size, log_type, since, until):
+        yield logs
+
+
+async def get_log_partitions() -> Dict:
+    """Діапазон логів у гарячій таблиці та список архівних партицій"""
+    try:
+        repository = await get_repository()
+        oldest, newest = await repository.get_log_range()
+        return {
+            "hot": {"oldest": oldest, "newest": newest, "months": settings.log_hot_months},
+            "archived": log_archive.describe()
+        }
+    except Exception as e:
+        logger.error(f"Failed to get log partitions: {e}")
+        raise
+
+
+async def get_analysis_log_stats(since: datetime, until: datetime, granularity: Optional[str] = None,
+                                 session_id: Optional[int] = None, log_type: Optional[str] = None,
+                                 max_points: int = 1500) -> Dict:
+    """Кількість логів по часових інтервалах і типах з попередньо агрегованих rollup таблиць
+    
+    Гранулярність обирається автоматично (або укрупнюється запитана), щоб діапазон
+    [since, until) вмістився в max_points інтервалів.
+    """
+    granularity = choose_granularity(since, until, max_points, granularity)
+    try:
+        repository = await get_repository()
+        rows = await repository.get_log_stats(
+            granularity,
+            bucket_key(since, granularity),
+            bucket_key(until - timedelta(microseconds=1), granularity),
+            session_id,
+            log_type
+        )
+    except Exception as e:
+        logger.error(f"Failed to get analysis log stats: {e}")
+        raise
+    
+    buckets: List[Dict] = []
+    for row in rows:
+        if not buckets or buckets[-1]["bucket"] != row["bucket"]:
+            buckets.append({"bucket": row["bucket"], "total": 0, "by_type": {}})
+        buckets[-1]["by_type"][row["log_type"]] = row["count"]
+        buckets[-1]["total"] += row["count"]
+    return {"granularity": granularity, "buckets": buckets}
+
+
+async def search_analysis_logs(query: str, session_id: Optional[int] = None, limit: int = 20,
+                               raw_syntax: bool = False):
+    """Повнотекстовий пошук по повідомленнях логів аналізу, найрелевантніші першими
+    
+    При raw_syntax=True query передається в синтаксисі пошуку СУБД як є
+    (FTS5 для SQLite, tsquery для PostgreSQL).
+    """
+    try:
+        repository = await get_repository()
+        return await repository.search_analysis_logs(query, session_id, limit, raw_syntax)
+    except ValueError:
+        raise
     except Exception as e:
-        logger.error(f"Failed to create analysis log: {e}")
+        logger.error(f"Failed to search analysis logs: {e}")
         raise
@@ -0,0 +1,40 @@
+"""
+AI Cyber Tool - File Locks
+Міжпроцесні блокування для задач, які мають виконуватись одним воркером
+"""
+
+import os
+
+
+class FileLock:
+    """Міжпроцесне блокування через lock-файл (fcntl на POSIX, msvcrt на Windows)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        self._file = open(self.path, "a+")
+        self._file.seek(0)
+        if os.name == "nt":
+            import msvcrt
+            while True:
+                try:
+                    # LK_LOCK сам повторює спробу протягом ~10 секунд
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        else:
+            import fcntl
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+
+    def release(self):
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
@@ -0,0 +1,124 @@
+"""
+AI Cyber Tool - Analysis Log Writer
+Фоновий write-behind запис логів аналізу пакетними транзакціями
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+
+# Функція пакетного запису: кортежі (session_id, log_type, message) -> ID або None
+FlushFunction = Callable[[Sequence[Tuple[int, str, str]]], Awaitable[List[Optional[int]]]]
+
+
+@dataclass
+class PendingLog:
+    """Лог, що очікує запису"""
+    session_id: int
+    log_type: str
+    message: str
+    future: Optional[asyncio.Future] = None
+
+
+class AnalysisLogWriter:
+    """Групує логи з окремих запитів у транзакції за розміром або часом"""
+
+    def __init__(self, flush: FlushFunction, batch_size: int = 500,
+                 flush_interval: float = 0.05, max_pending: int = 10000):
+        self.flush = flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.written = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Запуск фонового завдання"""
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.create_task(self._run(), name="analysis-log-writer")
+        logger.info(f"Analysis log writer started (batch {self.batch_size}, {self.flush_interval * 1000:.0f} ms)")
+
+    async def stop(self):
+        """Зупинка із записом усіх логів, що залишились у буфері"""
+        if not self.is_running:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logger.info(f"Analysis log writer stopped ({self.written} logs in {self.batches} batches)")
+
+    async def submit(self, session_id: int, log_type: str, message: str, wait: bool = True) -> Optional[int]:
+        """Поставити лог у чергу запису
+
+        Якщо буфер заповнений, чекає на вільне місце (backpressure). При wait=True
+        повертає ID після коміту транзакції, інакше повертає None одразу після постановки в чергу.
+        """
+        if not self.is_running:
+            raise RuntimeError("Analysis log writer is not running")
+        future = asyncio.get_running_loop().create_future() if wait else None
+        await self._queue.put(PendingLog(session_id, log_type, message, future))
+        if future is None:
+            return None
+        return await future
+
+    async def _run(self):
+        """Цикл збору пакетів та їх запису"""
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._write_batch(batch)
+
+    async def _write_batch(self, batch: List[PendingLog]):
+        """Запис пакету однією транзакцією та повідомлення очікувачів"""
+        try:
+            ids = await self.flush([(log.session_id, log.log_type, log.message) for log in batch])
+        except Exception as e:
+            logger.error(f"Failed to write analysis log batch of {len(batch)}: {e}")
+            for log in batch:
+                if log.future is not None and not log.future.done():
+                    log.future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.written += sum(1 for log_id in ids if log_id is not None)
+        for log, log_id in zip(batch, ids):
+            if log.future is None:
+                if log_id is None:
+                    logger.warning(f"Dropped analysis log for missing session {log.session_id}")
+                continue
+            if log.future.done():
+                continue
+            if log_id is None:
+                log.future.set_exception(ValueError("Session not found"))
+            else:
+                log.future.set_result(log_id)
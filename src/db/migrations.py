@@ -0,0 +1,318 @@
+"""
+AI Cyber Tool - Database Migrations
+Версіоновані міграції схеми SQLite з блокуванням між воркерами
+"""
+
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional, Sequence
+
+import aiosqlite
+from loguru import logger
+
+from .compression import MessageCodec
+from .locks import FileLock
+from .partitions import partition_existing_logs
+
+
+@dataclass(frozen=True)
+class Migration:
+    """Одна міграція схеми
+
+    upgrade виконується після statements в тій самій транзакції - для змін,
+    що залежать від даних (наприклад, набору місяців логів).
+    """
+    version: int
+    name: str
+    statements: Sequence[str]
+    upgrade: Optional[Callable[[aiosqlite.Connection], Awaitable[None]]] = None
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "initial schema", (
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_name TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT DEFAULT 'active'
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS analysis_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER,
+            log_type TEXT NOT NULL,
+            message TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES sessions (id)
+        )
+        """,
+    )),
+    Migration(2, "indexes for sessions and analysis logs", (
+        # get_sessions: ORDER BY created_at DESC LIMIT N без сортування всієї таблиці
+        "CREATE INDEX IF NOT EXISTS idx_sessions_created_at ON sessions (created_at)",
+        # Логи сесії в хронологічному порядку та підрахунки по сесії
+        "CREATE INDEX IF NOT EXISTS idx_analysis_logs_session_timestamp ON analysis_logs (session_id, timestamp)",
+        # Вибірки за часовим діапазоном по всіх сесіях
+        "CREATE INDEX IF NOT EXISTS idx_analysis_logs_timestamp ON analysis_logs (timestamp)",
+    )),
+    Migration(3, "indexes for filtered keyset pagination", (
+        # /api/sessions?status=...: рівність по status + keyset по (created_at, id)
+        "CREATE INDEX IF NOT EXISTS idx_sessions_status_created_at ON sessions (status, created_at)",
+        # /api/sessions/{id}/logs?log_type=...: рівність по сесії та типу + keyset по (timestamp, id)
+        "CREATE INDEX IF NOT EXISTS idx_analysis_logs_session_type_timestamp "
+        "ON analysis_logs (session_id, log_type, timestamp)",
+    )),
+    Migration(4, "full-text search over analysis log messages", (
+        # External content FTS5: текст не дублюється, індексується message та session_id,
+        # щоб обмеження по сесії виконувалось всередині FTS, а не фільтром після збігу
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS analysis_logs_fts USING fts5(
+            message, session_id,
+            content='analysis_logs', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        # Ранжування тільки за message
+        "INSERT INTO analysis_logs_fts (analysis_logs_fts, rank) VALUES ('rank', 'bm25(1.0, 0.0)')",
+        """
+        CREATE TRIGGER IF NOT EXISTS analysis_logs_fts_insert AFTER INSERT ON analysis_logs BEGIN
+            INSERT INTO analysis_logs_fts (rowid, message, session_id)
+            VALUES (new.id, new.message, new.session_id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS analysis_logs_fts_delete AFTER DELETE ON analysis_logs BEGIN
+            INSERT INTO analysis_logs_fts (analysis_logs_fts, rowid, message, session_id)
+            VALUES ('delete', old.id, old.message, old.session_id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS analysis_logs_fts_update AFTER UPDATE ON analysis_logs BEGIN
+            INSERT INTO analysis_logs_fts (analysis_logs_fts, rowid, message, session_id)
+            VALUES ('delete', old.id, old.message, old.session_id);
+            INSERT INTO analysis_logs_fts (rowid, message, session_id)
+            VALUES (new.id, new.message, new.session_id);
+        END
+        """,
+        # Індексація логів, записаних до цієї міграції
+        "INSERT INTO analysis_logs_fts (analysis_logs_fts) VALUES ('rebuild')",
+    )),
+    Migration(5, "generation counters for read cache invalidation", (
+        # Покоління змінюється в тій самій транзакції, що й дані, тому воркери
+        # бачать зміну разом з комітом і скидають свій кеш читань
+        """
+        CREATE TABLE IF NOT EXISTS cache_generations (
+            name TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT OR IGNORE INTO cache_generations (name, generation) VALUES ('sessions', 0)",
+        """
+        CREATE TRIGGER IF NOT EXISTS sessions_generation_insert AFTER INSERT ON sessions BEGIN
+            UPDATE cache_generations SET generation = generation + 1 WHERE name = 'sessions';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS sessions_generation_update AFTER UPDATE ON sessions BEGIN
+            UPDATE cache_generations SET generation = generation + 1 WHERE name = 'sessions';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS sessions_generation_delete AFTER DELETE ON sessions BEGIN
+            UPDATE cache_generations SET generation = generation + 1 WHERE name = 'sessions';
+        END
+        """,
+    )),
+    Migration(6, "time-bucket rollups of analysis logs", (
+        # Лічильники логів по (сесія, тип, часовий інтервал) для хвилин, годин та днів.
+        # Рядки не зменшуються при видаленні, тому статистика охоплює й архівовані місяці
+        """
+        CREATE TABLE IF NOT EXISTS analysis_log_rollups (
+            granularity TEXT NOT NULL,
+            session_id INTEGER NOT NULL,
+            log_type TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (granularity, session_id, log_type, bucket)
+        ) WITHOUT ROWID
+        """,
+        # Статистика по всіх сесіях за часовим діапазоном
+        "CREATE INDEX IF NOT EXISTS idx_analysis_log_rollups_bucket ON analysis_log_rollups (granularity, bucket)",
+        """
+        CREATE TRIGGER IF NOT EXISTS analysis_log_rollups_insert AFTER INSERT ON analysis_logs
+        WHEN new.session_id IS NOT NULL BEGIN
+            INSERT INTO analysis_log_rollups (granularity, session_id, log_type, bucket, count)
+            VALUES ('minute', new.session_id, new.log_type, substr(replace(new.timestamp, ' ', 'T'), 1, 16), 1)
+            ON CONFLICT DO UPDATE SET count = count + 1;
+            INSERT INTO analysis_log_rollups (granularity, session_id, log_type, bucket, count)
+            VALUES ('hour', new.session_id, new.log_type, substr(replace(new.timestamp, ' ', 'T'), 1, 13), 1)
+            ON CONFLICT DO UPDATE SET count = count + 1;
+            INSERT INTO analysis_log_rollups (granularity, session_id, log_type, bucket, count)
+            VALUES ('day', new.session_id, new.log_type, substr(new.timestamp, 1, 10), 1)
+            ON CONFLICT DO UPDATE SET count = count + 1;
+        END
+        """,
+        # Заповнення з логів, записаних до цієї міграції
+        """
+        INSERT INTO analysis_log_rollups (granularity, session_id, log_type, bucket, count)
+        SELECT 'minute', session_id, log_type, substr(replace(timestamp, ' ', 'T'), 1, 16), COUNT(*)
+        FROM analysis_logs WHERE session_id IS NOT NULL GROUP BY 2, 3, 4
+        """,
+        """
+        INSERT INTO analysis_log_rollups (granularity, session_id, log_type, bucket, count)
+        SELECT 'hour', session_id, log_type, substr(replace(timestamp, ' ', 'T'), 1, 13), COUNT(*)
+        FROM analysis_logs WHERE session_id IS NOT NULL GROUP BY 2, 3, 4
+        """,
+        """
+        INSERT INTO analysis_log_rollups (granularity, session_id, log_type, bucket, count)
+        SELECT 'day', session_id, log_type, substr(timestamp, 1, 10), COUNT(*)
+        FROM analysis_logs WHERE session_id IS NOT NULL GROUP BY 2, 3, 4
+        """,
+    )),
+    Migration(7, "compressed analysis log messages", (
+        # Словники стиснення message для кожного log_type (незмінні після створення)
+        """
+        CREATE TABLE IF NOT EXISTS log_dictionaries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            log_type TEXT NOT NULL,
+            dictionary BLOB NOT NULL,
+            samples INTEGER NOT NULL,
+            created_at TIMESTAMP NOT NULL
+        )
+        """,
+        # message зберігається як TEXT або стиснений BLOB; log_text() повертає текст.
+        # FTS5 читає content таблицю для highlight() та rebuild, тому content - це view з текстом.
+        # log_text() реєструється додатком: поза ним (резервні копії, sqlite3 CLI) потрібні
+        # compression.connect() або decompress_database()
+        """
+        CREATE VIEW IF NOT EXISTS analysis_logs_text AS
+        SELECT id, session_id, log_type, log_text(message) AS message, timestamp FROM analysis_logs
+        """,
+        "DROP TRIGGER IF EXISTS analysis_logs_fts_insert",
+        "DROP TRIGGER IF EXISTS analysis_logs_fts_delete",
+        "DROP TRIGGER IF EXISTS analysis_logs_fts_update",
+        "DROP TABLE IF EXISTS analysis_logs_fts",
+        """
+        CREATE VIRTUAL TABLE analysis_logs_fts USING fts5(
+            message, session_id,
+            content='analysis_logs_text', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        "INSERT INTO analysis_logs_fts (analysis_logs_fts, rank) VALUES ('rank', 'bm25(1.0, 0.0)')",
+        """
+        CREATE TRIGGER analysis_logs_fts_insert AFTER INSERT ON analysis_logs BEGIN
+            INSERT INTO analysis_logs_fts (rowid, message, session_id)
+            VALUES (new.id, log_text(new.message), new.session_id);
+        END
+        """,
+        """
+        CREATE TRIGGER analysis_logs_fts_delete AFTER DELETE ON analysis_logs BEGIN
+            INSERT INTO analysis_logs_fts (analysis_logs_fts, rowid, message, session_id)
+            VALUES ('delete', old.id, log_text(old.message), old.session_id);
+        END
+        """,
+        # Перестиснення тим самим текстом (новий словник) не змінює індекс
+        """
+        CREATE TRIGGER analysis_logs_fts_update AFTER UPDATE ON analysis_logs
+        WHEN old.session_id IS NOT new.session_id OR log_text(old.message) IS NOT log_text(new.message) BEGIN
+            INSERT INTO analysis_logs_fts (analysis_logs_fts, rowid, message, session_id)
+            VALUES ('delete', old.id, log_text(old.message), old.session_id);
+            INSERT INTO analysis_logs_fts (rowid, message, session_id)
+            VALUES (new.id, log_text(new.message), new.session_id);
+        END
+        """,
+        "INSERT INTO analysis_logs_fts (analysis_logs_fts) VALUES ('rebuild')",
+    )),
+    Migration(8, "monthly partitions of hot analysis logs", (
+        # Логи кожного місяця - окрема таблиця з власним FTS індексом і тригерами,
+        # analysis_logs - view над усіма партиціями. Retention видаляє місяць через
+        # DROP TABLE замість DELETE кожного рядка (з тригерами FTS і log_text)
+        "DROP TRIGGER IF EXISTS analysis_logs_fts_insert",
+        "DROP TRIGGER IF EXISTS analysis_logs_fts_delete",
+        "DROP TRIGGER IF EXISTS analysis_logs_fts_update",
+        "DROP TRIGGER IF EXISTS analysis_log_rollups_insert",
+        "DROP TABLE IF EXISTS analysis_logs_fts",
+        "DROP VIEW IF EXISTS analysis_logs_text",
+        "ALTER TABLE analysis_logs RENAME TO analysis_logs_unpartitioned",
+        """
+        CREATE TABLE IF NOT EXISTS log_partitions (
+            month TEXT PRIMARY KEY,
+            created_at TIMESTAMP NOT NULL
+        )
+        """,
+        # Глобальний лічильник ID логів: ID не повторюються між партиціями і
+        # після видалення місяця (як AUTOINCREMENT єдиної таблиці)
+        """
+        CREATE TABLE IF NOT EXISTS analysis_log_sequence (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_id INTEGER NOT NULL
+        )
+        """,
+        """
+        INSERT INTO analysis_log_sequence (id, last_id)
+        SELECT 1, MAX(
+            COALESCE((SELECT MAX(id) FROM analysis_logs_unpartitioned), 0),
+            COALESCE((SELECT MAX(seq) FROM sqlite_sequence
+                      WHERE name IN ('analysis_logs', 'analysis_logs_unpartitioned')), 0)
+        )
+        """,
+    ), upgrade=partition_existing_logs),
+]
+
+
+async def get_schema_version(conn: aiosqlite.Connection) -> int:
+    """Поточна версія схеми (0 для нової бази даних)"""
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    """)
+    cursor = await conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+    return (await cursor.fetchone())[0]
+
+
+async def run_migrations(conn: aiosqlite.Connection, database_path: str,
+                         migrations: Sequence[Migration] = MIGRATIONS,
+                         codec: Optional[MessageCodec] = None) -> int:
+    """Застосування нових міграцій; повертає кількість застосованих
+
+    Воркери серіалізуються через lock-файл поруч з базою даних, тому кожна
+    міграція виконується рівно один раз, а решта воркерів бачить актуальну версію.
+    Схема використовує SQL функції стиснення логів, тому вони реєструються на з'єднанні,
+    якщо codec не вказано.
+    """
+    if codec is None:
+        await MessageCodec(database_path).register_async(conn)
+    lock = FileLock(f"{database_path}.migrate.lock") if database_path != ":memory:" else None
+    if lock:
+        await asyncio.to_thread(lock.acquire)
+    try:
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = await get_schema_version(conn)
+            pending = [m for m in sorted(migrations, key=lambda m: m.version) if m.version > current]
+            for migration in pending:
+                for statement in migration.statements:
+                    await conn.execute(statement)
+                if migration.upgrade is not None:
+                    await migration.upgrade(conn)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                    (migration.version, migration.name, datetime.utcnow().isoformat())
+                )
+                logger.info(f"Applied migration {migration.version}: {migration.name}")
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+    finally:
+        if lock:
+            lock.release()
+
+    return len(pending)
@@ -0,0 +1,28 @@
+"""
+AI Cyber Tool - Keyset Pagination
+Непрозорі курсори для keyset пагінації за (час, id)
+"""
+
+import base64
+import json
+from typing import Optional, Tuple
+
+
+def encode_cursor(timestamp: str, row_id: int) -> str:
+    """Курсор на позицію після рядка (timestamp, row_id)"""
+    raw = json.dumps([timestamp, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Розбір курсору; ValueError для некоректного значення"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(timestamp, str) or not isinstance(row_id, int):
+        raise ValueError("Invalid cursor")
+    return timestamp, row_id
@@ -0,0 +1,482 @@
+"""
+AI Cyber Tool - Log Partitions
+Місячні партиції логів аналізу: гаряче вікно в основній БД та стиснені архівні файли
+"""
+
+import asyncio
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiosqlite
+from loguru import logger
+
+from .compression import MessageCodec
+from .locks import FileLock
+from .pool import DatabasePool
+
+
+_ARCHIVE_NAME = re.compile(r"^analysis_logs_(\d{4})_(\d{2})\.db\.gz$")
+
+ARCHIVE_COLUMNS = "id, session_id, log_type, message, timestamp"
+
+
+def month_key(timestamp: str) -> str:
+    """Ключ партиції 'YYYY-MM' для ISO timestamp"""
+    return timestamp[:7]
+
+
+def add_months(key: str, months: int) -> str:
+    """Зсув ключа партиції на вказану кількість місяців"""
+    year, month = int(key[:4]), int(key[5:7])
+    index = year * 12 + (month - 1) + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def month_bounds(key: str) -> tuple:
+    """Межі партиції [start, end) у форматі, що порівнюється з ISO timestamp"""
+    return f"{key}-01", f"{add_months(key, 1)}-01"
+
+
+def hot_table(key: str) -> str:
+    """Таблиця гарячої партиції місяця ('2025-01' -> analysis_logs_2025_01)"""
+    if not re.fullmatch(r"\d{4}-\d{2}", key):
+        raise ValueError(f"Invalid log partition key: {key}")
+    return f"analysis_logs_{key.replace('-', '_')}"
+
+
+def _hot_table_statements(table: str) -> List[str]:
+    """Таблиця партиції та індекси гарячих запитів
+
+    ID логів глобальні (таблиця analysis_log_sequence), тому партиції не мають
+    AUTOINCREMENT, а ID не повторюються між місяцями та в архіві.
+    """
+    return [
+        f"""
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY,
+            session_id INTEGER,
+            log_type TEXT NOT NULL,
+            message TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES sessions (id)
+        )
+        """,
+        f"CREATE INDEX idx_{table}_session_timestamp ON {table} (session_id, timestamp)",
+        f"CREATE INDEX idx_{table}_timestamp ON {table} (timestamp)",
+        f"CREATE INDEX idx_{table}_session_type_timestamp ON {table} (session_id, log_type, timestamp)",
+    ]
+
+
+def _hot_trigger_statements(table: str) -> List[str]:
+    """FTS5 індекс партиції та тригери FTS і rollup лічильників
+
+    FTS індекс окремий для кожного місяця: видалення партиції - це DROP TABLE,
+    без 'delete' команд FTS для кожного рядка. View _text та тригери викликають
+    log_text(), яку реєструє додаток (див. compression.connect).
+    """
+    return [
+        f"""
+        CREATE VIEW {table}_text AS
+        SELECT id, session_id, log_type, log_text(message) AS message, timestamp FROM {table}
+        """,
+        f"""
+        CREATE VIRTUAL TABLE {table}_fts USING fts5(
+            message, session_id,
+            content='{table}_text', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        f"INSERT INTO {table}_fts ({table}_fts, rank) VALUES ('rank', 'bm25(1.0, 0.0)')",
+        f"""
+        CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {table}_fts (rowid, message, session_id)
+            VALUES (new.id, log_text(new.message), new.session_id);
+        END
+        """,
+        f"""
+        CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {table}_fts ({table}_fts, rowid, message, session_id)
+            VALUES ('delete', old.id, log_text(old.message), old.session_id);
+        END
+        """,
+        # Перестиснення тим самим текстом (новий словник) не змінює індекс
+        f"""
+        CREATE TRIGGER {table}_fts_update AFTER UPDATE ON {table}
+        WHEN old.session_id IS NOT new.session_id OR log_text(old.message) IS NOT log_text(new.message) BEGIN
+            INSERT INTO {table}_fts ({table}_fts, rowid, message, session_id)
+            VALUES ('delete', old.id, log_text(old.message), old.session_id);
+            INSERT INTO {table}_fts (rowid, message, session_id)
+            VALUES (new.id, log_text(new.message), new.session_id);
+        END
+        """,
+        f"""
+        CREATE TRIGGER {table}_rollups_insert AFTER INSERT ON {table}
+        WHEN new.session_id IS NOT NULL BEGIN
+            INSERT INTO analysis_log_rollups (granularity, session_id, log_type, bucket, count)
+            VALUES ('minute', new.session_id, new.log_type, substr(replace(new.timestamp, ' ', 'T'), 1, 16), 1)
+            ON CONFLICT DO UPDATE SET count = count + 1;
+            INSERT INTO analysis_log_rollups (granularity, session_id, log_type, bucket, count)
+            VALUES ('hour', new.session_id, new.log_type, substr(replace(new.timestamp, ' ', 'T'), 1, 13), 1)
+            ON CONFLICT DO UPDATE SET count = count + 1;
+            INSERT INTO analysis_log_rollups (granularity, session_id, log_type, bucket, count)
+            VALUES ('day', new.session_id, new.log_type, substr(new.timestamp, 1, 10), 1)
+            ON CONFLICT DO UPDATE SET count = count + 1;
+        END
+        """,
+    ]
+
+
+async def hot_partitions(conn: aiosqlite.Connection) -> List[str]:
+    """Ключі гарячих партицій у хронологічному порядку"""
+    cursor = await conn.execute("SELECT month FROM log_partitions ORDER BY month")
+    return [row[0] for row in await cursor.fetchall()]
+
+
+async def refresh_logs_view(conn: aiosqlite.Connection):
+    """Перебудова view analysis_logs як UNION ALL всіх гарячих партицій
+
+    Умови запитів до view переносяться в кожну партицію, тому читання
+    використовують індекси партицій (MERGE UNION ALL без сортування).
+    """
+    keys = await hot_partitions(conn)
+    if keys:
+        body = "\nUNION ALL\n".join(
+            f"SELECT id, session_id, log_type, message, timestamp FROM {hot_table(key)}" for key in keys
+        )
+    else:
+        body = ("SELECT NULL AS id, NULL AS session_id, NULL AS log_type, NULL AS message, "
+                "NULL AS timestamp WHERE 0")
+    await conn.execute("DROP VIEW IF EXISTS analysis_logs")
+    await conn.execute(f"CREATE VIEW analysis_logs AS {body}")
+
+
+async def create_hot_partition(conn: aiosqlite.Connection, key: str, fill_from: Optional[str] = None) -> bool:
+    """Створення партиції місяця в поточній транзакції; False, якщо вона вже існує
+
+    fill_from - таблиця, з якої копіюються логи місяця до створення тригерів
+    (rollup лічильники вже містять ці логи), після чого FTS індекс перебудовується.
+    """
+    cursor = await conn.execute(
+        "INSERT OR IGNORE INTO log_partitions (month, created_at) VALUES (?, ?)",
+        (key, datetime.utcnow().isoformat())
+    )
+    if cursor.rowcount == 0:
+        return False
+    table = hot_table(key)
+    for statement in _hot_table_statements(table):
+        await conn.execute(statement)
+    if fill_from is not None:
+        await conn.execute(f"""
+            INSERT INTO {table} (id, session_id, log_type, message, timestamp)
+            SELECT id, session_id, log_type, message, timestamp FROM {fill_from}
+            WHERE substr(COALESCE(timestamp, CURRENT_TIMESTAMP), 1, 7) = ?
+        """, (key,))
+    for statement in _hot_trigger_statements(table):
+        await conn.execute(statement)
+    if fill_from is not None:
+        await conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+    await refresh_logs_view(conn)
+    return True
+
+
+async def drop_hot_partition(conn: aiosqlite.Connection, key: str):
+    """Видалення партиції місяця цілком (таблиця, FTS індекс, тригери) в поточній транзакції"""
+    table = hot_table(key)
+    await conn.execute(f"DROP TABLE IF EXISTS {table}_fts")
+    await conn.execute(f"DROP VIEW IF EXISTS {table}_text")
+    await conn.execute(f"DROP TABLE IF EXISTS {table}")
+    await conn.execute("DELETE FROM log_partitions WHERE month = ?", (key,))
+    await refresh_logs_view(conn)
+
+
+async def partition_existing_logs(conn: aiosqlite.Connection, source: str = "analysis_logs_unpartitioned"):
+    """Розподіл логів з єдиної таблиці по місячних партиціях (міграція схеми)"""
+    cursor = await conn.execute(
+        f"SELECT DISTINCT substr(COALESCE(timestamp, CURRENT_TIMESTAMP), 1, 7) FROM {source}"
+    )
+    for (key,) in await cursor.fetchall():
+        await create_hot_partition(conn, key, fill_from=source)
+    await conn.execute(f"DROP TABLE {source}")
+    await refresh_logs_view(conn)
+
+
+def _build_archive(database_path: str, archive_path: Path, key: str) -> int:
+    """Копіювання логів місяця в окремий SQLite файл (виконується в потоці)
+
+    Архів зберігає розпакований текст: файл стискається цілком, а словники
+    стиснення залишаються в основній БД.
+    """
+    conn = sqlite3.connect(archive_path)
+    try:
+        MessageCodec(database_path).register(conn)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_logs (
+                id INTEGER PRIMARY KEY,
+                session_id INTEGER,
+                log_type TEXT NOT NULL,
+                message TEXT NOT NULL,
+                timestamp TIMESTAMP
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_logs_session_timestamp "
+            "ON analysis_logs (session_id, timestamp)"
+        )
+        conn.execute("ATTACH DATABASE ? AS hot", (database_path,))
+        cursor = conn.execute(f"""
+            INSERT OR IGNORE INTO analysis_logs ({ARCHIVE_COLUMNS})
+            SELECT id, session_id, log_type, log_text(message), timestamp FROM hot.{hot_table(key)}
+        """)
+        copied = cursor.rowcount
+        conn.commit()
+        conn.execute("DETACH DATABASE hot")
+        conn.execute("VACUUM")
+        return copied
+    finally:
+        conn.close()
+
+
+def _write_atomic(target: Path, write):
+    """Запис у тимчасовий файл з унікальним ім'ям поруч з target та атомарна заміна
+
+    Паралельні запити (або воркери), що розпаковують ту саму партицію,
+    не пишуть в один файл, а читачі бачать тільки повний файл.
+    """
+    with tempfile.NamedTemporaryFile(dir=target.parent, prefix=f"{target.name}.", suffix=".tmp",
+                                     delete=False) as temp:
+        temp_path = Path(temp.name)
+        try:
+            write(temp)
+        except BaseException:
+            temp.close()
+            temp_path.unlink(missing_ok=True)
+            raise
+    try:
+        os.replace(temp_path, target)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def _compress(source: Path, target: Path):
+    """Атомарне стиснення файлу gzip"""
+    def write(temp):
+        with open(source, "rb") as src, gzip.GzipFile(fileobj=temp, mode="wb", compresslevel=9) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    _write_atomic(target, write)
+
+
+def _decompress(source: Path, target: Path):
+    """Атомарне розпакування gzip файлу"""
+    def write(temp):
+        with gzip.open(source, "rb") as src:
+            shutil.copyfileobj(src, temp, 1024 * 1024)
+    _write_atomic(target, write)
+
+
+class LogArchive:
+    """Стиснені місячні партиції логів, доступні для запитів на вимогу"""
+
+    def __init__(self, archive_dir: str):
+        self.archive_dir = Path(archive_dir)
+        self.cache_dir = self.archive_dir / ".cache"
+
+    def archive_path(self, key: str) -> Path:
+        return self.archive_dir / f"analysis_logs_{key.replace('-', '_')}.db.gz"
+
+    def partitions(self) -> List[str]:
+        """Ключі архівних партицій у хронологічному порядку"""
+        if not self.archive_dir.exists():
+            return []
+        keys = []
+        for path in self.archive_dir.iterdir():
+            match = _ARCHIVE_NAME.match(path.name)
+            if match:
+                keys.append(f"{match.group(1)}-{match.group(2)}")
+        return sorted(keys)
+
+    def prune(self, since: Optional[str] = None, until: Optional[str] = None) -> List[str]:
+        """Партиції, що перетинаються з діапазоном [since, until)"""
+        return [
+            key for key in self.partitions()
+            if (since is None or month_bounds(key)[1] > since)
+            and (until is None or month_bounds(key)[0] < until)
+        ]
+
+    def describe(self) -> List[Dict]:
+        """Опис архівних партицій"""
+        return [
+            {"month": key, "file": self.archive_path(key).name, "size": self.archive_path(key).stat().st_size}
+            for key in self.partitions()
+        ]
+
+    async def archive_month(self, database_path: str, key: str) -> int:
+        """Копіювання місяця з гарячої БД у стиснений архів; повертає кількість нових рядків"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        target = self.archive_path(key)
+        raw = self.archive_dir / f"{target.name[:-3]}.building"
+
+        # Пізні логи за вже архівований місяць дописуються в існуючий архів
+        if target.exists():
+            await asyncio.to_thread(_decompress, target, raw)
+        copied = await asyncio.to_thread(_build_archive, database_path, raw, key)
+        await asyncio.to_thread(_compress, raw, target)
+        raw.unlink()
+        self._invalidate_cache(key)
+        return copied
+
+    def drop(self, key: str):
+        """Видалення архівної партиції"""
+        self.archive_path(key).unlink(missing_ok=True)
+        self._invalidate_cache(key)
+        logger.info(f"Dropped archived log partition {key}")
+
+    def _cache_path(self, key: str) -> Path:
+        return self.cache_dir / f"analysis_logs_{key.replace('-', '_')}.db"
+
+    def _invalidate_cache(self, key: str):
+        self._cache_path(key).unlink(missing_ok=True)
+
+    async def _open(self, key: str) -> aiosqlite.Connection:
+        """Відкриття розпакованої копії партиції тільки для читання"""
+        cached = self._cache_path(key)
+        if not cached.exists() or cached.stat().st_mtime < self.archive_path(key).stat().st_mtime:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(_decompress, self.archive_path(key), cached)
+        conn = await aiosqlite.connect(f"file:{cached.as_posix()}?mode=ro", uri=True)
+        conn.row_factory = aiosqlite.Row
+        return conn
+
+    async def iter_session_logs(self, session_id: int, chunk_size: int = 1000,
+                                log_type: Optional[str] = None, since: Optional[str] = None,
+                                until: Optional[str] = None) -> AsyncIterator[List[dict]]:
+        """Порції архівних логів сесії в хронологічному порядку, лише з потрібних партицій"""
+        conditions = ["session_id = ?"]
+        params: List = [session_id]
+        if log_type is not None:
+            conditions.append("log_type = ?")
+            params.append(log_type)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until)
+
+        for key in self.prune(since, until):
+            conn = await self._open(key)
+            try:
+                cursor = await conn.execute(f"""
+                    SELECT {ARCHIVE_COLUMNS} FROM analysis_logs
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY timestamp, id
+                """, params)
+                while True:
+                    rows = await cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield [dict(row) for row in rows]
+            finally:
+                await conn.close()
+
+
+class LogRetention:
+    """Фонова задача: перенесення старих місяців в архів та видалення простроченого архіву"""
+
+    def __init__(self, pool_factory, database_path: str, archive: LogArchive, hot_months: int,
+                 archive_retention_months: int = 0, interval: float = 6 * 3600):
+        self.pool_factory = pool_factory
+        self.database_path = database_path
+        self.archive = archive
+        self.hot_months = hot_months
+        self.archive_retention_months = archive_retention_months
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Запуск періодичної задачі"""
+        if not self.is_running:
+            self._task = asyncio.create_task(self._loop(), name="log-retention")
+
+    async def stop(self):
+        """Зупинка періодичної задачі"""
+        if self.is_running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Log retention run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self, now: Optional[datetime] = None) -> Dict[str, List[str]]:
+        """Один прохід retention; воркери серіалізуються через lock-файл"""
+        lock = FileLock(f"{self.database_path}.retention.lock")
+        await asyncio.to_thread(lock.acquire)
+        try:
+            current = month_key((now or datetime.utcnow()).isoformat())
+            archived = await self._archive_expired(add_months(current, -(self.hot_months - 1)))
+            dropped = []
+            if self.archive_retention_months:
+                cutoff = add_months(current, -self.archive_retention_months)
+                for key in self.archive.partitions():
+                    if key < cutoff:
+                        self.archive.drop(key)
+                        dropped.append(key)
+            return {"archived": archived, "dropped": dropped}
+        finally:
+            lock.release()
+
+    async def _archive_expired(self, cutoff: str) -> List[str]:
+        """Архівування всіх гарячих партицій, старших за cutoff"""
+        pool: DatabasePool = await self.pool_factory()
+        async with pool.reader() as conn:
+            keys = [key for key in await hot_partitions(conn) if key < cutoff]
+
+        archived = []
+        for key in keys:
+            copied = 0
+            while True:
+                async with pool.reader() as conn:
+                    cursor = await conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {hot_table(key)}")
+                    last_id = (await cursor.fetchone())[0]
+                copied += await self.archive.archive_month(self.database_path, key)
+                if await self._drop(pool, key, last_id):
+                    break
+            archived.append(key)
+            logger.info(f"Archived log partition {key}: {copied} copied, hot partition dropped")
+        return archived
+
+    async def _drop(self, pool: DatabasePool, key: str, last_id: int) -> bool:
+        """Видалення партиції цілком; False, якщо після копіювання в неї записано нові логи
+
+        ID глобально зростають, тому логи, записані після початку копіювання,
+        мають ID більший за last_id і будуть дописані в архів наступною спробою.
+        """
+        async with pool.writer() as conn:
+            await conn.execute("BEGIN IMMEDIATE")
+            cursor = await conn.execute(f"SELECT EXISTS (SELECT 1 FROM {hot_table(key)} WHERE id > ?)", (last_id,))
+            if (await cursor.fetchone())[0]:
+                await conn.rollback()
+                return False
+            await drop_hot_partition(conn, key)
+            await conn.commit()
+            return True
@@ -0,0 +1,108 @@
+"""
+AI Cyber Tool - Database Connection Pool
+Постійний пул з'єднань SQLite на воркер: один writer та N readers
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+
+import aiosqlite
+from loguru import logger
+
+from .compression import MessageCodec
+
+
+class DatabasePool:
+    """Пул з'єднань aiosqlite з WAL та налаштованими pragma"""
+
+    def __init__(self, database_path: str, readers: int = 4,
+                 cache_size_kib: int = 16384,
+                 mmap_size: int = 268435456,
+                 busy_timeout_ms: int = 5000,
+                 codec: Optional[MessageCodec] = None):
+        self.database_path = database_path
+        self.codec = codec or MessageCodec(database_path)
+        self.readers_count = max(1, readers)
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.busy_timeout_ms = busy_timeout_ms
+
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._writer_lock = asyncio.Lock()
+        self._readers: List[aiosqlite.Connection] = []
+        self._idle_readers: Optional[asyncio.Queue] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def _connect(self, read_only: bool) -> aiosqlite.Connection:
+        """Відкрити з'єднання та застосувати pragma"""
+        conn = await aiosqlite.connect(self.database_path)
+        conn.row_factory = aiosqlite.Row
+        await conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        await conn.execute("PRAGMA synchronous = NORMAL")
+        # Від'ємне значення - розмір кешу в KiB, а не в сторінках
+        await conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kib)}")
+        await conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        await conn.execute("PRAGMA temp_store = MEMORY")
+        if read_only:
+            await conn.execute("PRAGMA query_only = ON")
+        # log_text() використовується схемою (тригери FTS, view), тому потрібна кожному з'єднанню
+        await self.codec.register_async(conn)
+        return conn
+
+    async def open(self):
+        """Відкриття writer та reader з'єднань"""
+        if self.is_open:
+            return
+
+        writer = await self._connect(read_only=False)
+        # WAL зберігається у файлі БД, тому достатньо ввімкнути його один раз через writer
+        cursor = await writer.execute("PRAGMA journal_mode = WAL")
+        journal_mode = (await cursor.fetchone())[0]
+        if journal_mode.lower() != "wal":
+            logger.warning(f"SQLite journal_mode is '{journal_mode}', WAL is not available")
+
+        self._idle_readers = asyncio.Queue()
+        for _ in range(self.readers_count):
+            reader = await self._connect(read_only=True)
+            self._readers.append(reader)
+            self._idle_readers.put_nowait(reader)
+
+        self._writer = writer
+        logger.info(f"Database pool opened: 1 writer, {self.readers_count} readers ({journal_mode})")
+
+    async def close(self):
+        """Закриття всіх з'єднань пулу"""
+        if not self.is_open:
+            return
+
+        async with self._writer_lock:
+            await self._writer.close()
+            self._writer = None
+        for reader in self._readers:
+            await reader.close()
+        self._readers = []
+        self._idle_readers = None
+        logger.info("Database pool closed")
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """З'єднання для читання; у WAL режимі читання не чекає на запис"""
+        conn = await self._idle_readers.get()
+        try:
+            yield conn
+        finally:
+            self._idle_readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Єдине з'єднання для запису; транзакція відкочується при помилці"""
+        async with self._writer_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
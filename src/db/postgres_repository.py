@@ -0,0 +1,337 @@
+"""
+AI Cyber Tool - PostgreSQL Repository
+Сховище сесій та логів аналізу на PostgreSQL (asyncpg пул, COPY для пакетної вставки)
+"""
+
+import asyncio
+import re
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from .migrations import Migration
+from .repository import Repository, parse_timestamp
+
+try:
+    import asyncpg
+except ImportError:  # pragma: no cover - asyncpg потрібен лише для PostgreSQL
+    asyncpg = None
+
+
+# Ключ advisory lock, що серіалізує міграції між воркерами
+MIGRATION_LOCK_KEY = 0x41435431
+
+POSTGRES_MIGRATIONS: List[Migration] = [
+    Migration(1, "initial schema", (
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id BIGSERIAL PRIMARY KEY,
+            session_name TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            status TEXT NOT NULL DEFAULT 'active'
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS analysis_logs (
+            id BIGSERIAL PRIMARY KEY,
+            session_id BIGINT REFERENCES sessions (id),
+            log_type TEXT NOT NULL,
+            message TEXT NOT NULL,
+            timestamp TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+        )
+        """,
+    )),
+    Migration(2, "indexes for keyset pagination", (
+        "CREATE INDEX IF NOT EXISTS idx_sessions_created_at ON sessions (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_status_created_at ON sessions (status, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_analysis_logs_session_timestamp ON analysis_logs (session_id, timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS idx_analysis_logs_session_type_timestamp "
+        "ON analysis_logs (session_id, log_type, timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS idx_analysis_logs_timestamp ON analysis_logs (timestamp)",
+    )),
+    Migration(3, "full-text search over analysis log messages", (
+        "CREATE INDEX IF NOT EXISTS idx_analysis_logs_message_fts "
+        "ON analysis_logs USING GIN (to_tsvector('simple', message))",
+    )),
+    Migration(4, "generation counters for read cache invalidation", (
+        """
+        CREATE TABLE IF NOT EXISTS cache_generations (
+            name TEXT PRIMARY KEY,
+            generation BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT INTO cache_generations (name, generation) VALUES ('sessions', 0) ON CONFLICT DO NOTHING",
+        """
+        CREATE OR REPLACE FUNCTION bump_sessions_generation() RETURNS trigger AS $$
+        BEGIN
+            UPDATE cache_generations SET generation = generation + 1 WHERE name = 'sessions';
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER sessions_generation AFTER INSERT OR UPDATE OR DELETE ON sessions
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_sessions_generation()
+        """,
+    )),
+    Migration(5, "time-bucket rollups of analysis logs", (
+        # Оновлюється в insert_analysis_logs агрегованим upsert на пакет, а не тригером на рядок
+        """
+        CREATE TABLE IF NOT EXISTS analysis_log_rollups (
+            granularity TEXT NOT NULL,
+            session_id BIGINT NOT NULL,
+            log_type TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            count BIGINT NOT NULL,
+            PRIMARY KEY (granularity, session_id, log_type, bucket)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_analysis_log_rollups_bucket ON analysis_log_rollups (granularity, bucket)",
+    )),
+]
+
+# Довжина префіксу ISO timestamp для кожної гранулярності (як substr у SQLite тригері)
+_BUCKET_LENGTHS = {"minute": 16, "hour": 13, "day": 10}
+
+_SEARCH_TOKEN = re.compile(r'"[^"]*"\*?|\S+')
+
+
+def _lexeme(word: str) -> str:
+    return "'" + word.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def build_tsquery(query: str) -> str:
+    """Перетворення простого пошукового запиту в tsquery ("фраза", префікс*, решта через AND)"""
+    terms = []
+    for token in _SEARCH_TOKEN.findall(query):
+        prefix = token.endswith("*")
+        text = token.rstrip("*")
+        if text.startswith('"') and text.endswith('"') and len(text) >= 2:
+            text = text[1:-1]
+        words = text.split()
+        if not words:
+            continue
+        term = " <-> ".join(_lexeme(word) for word in words)
+        terms.append(f"({term}:*)" if prefix else f"({term})")
+    if not terms:
+        raise ValueError("Empty search query")
+    return " & ".join(terms)
+
+
+def _isoformat_row(record) -> dict:
+    """Запис asyncpg у dict з ISO рядками замість datetime"""
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in record.items()}
+
+
+class _Params:
+    """Нумеровані параметри $1, $2, ... для динамічних умов"""
+
+    def __init__(self):
+        self.values: List = []
+
+    def add(self, value) -> str:
+        self.values.append(value)
+        return f"${len(self.values)}"
+
+
+class PostgresRepository(Repository):
+    """Сховище на PostgreSQL: записи з усіх воркерів паралельно через пул asyncpg"""
+
+    database_type = "postgresql"
+
+    def __init__(self, database_url: str, min_size: int = 2, max_size: int = 10):
+        self.database_url = database_url
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.pool is not None
+
+    async def open(self):
+        if asyncpg is None:
+            raise RuntimeError("PostgreSQL backend requires the 'asyncpg' package")
+        if self.pool is None:
+            # Драйвер asyncpg не розуміє суфікс діалекту SQLAlchemy (postgresql+asyncpg://)
+            dsn = re.sub(r"^postgres(ql)?\+\w+://", "postgresql://", self.database_url)
+            self.pool = await asyncpg.create_pool(dsn, min_size=self.min_size, max_size=self.max_size)
+            logger.info(f"PostgreSQL pool opened ({self.min_size}-{self.max_size} connections)")
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+            logger.info("PostgreSQL pool closed")
+
+    async def migrate(self) -> Tuple[int, int]:
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", MIGRATION_LOCK_KEY)
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        version INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL,
+                        applied_at TIMESTAMP NOT NULL
+                    )
+                """)
+                current = await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+                pending = [m for m in sorted(POSTGRES_MIGRATIONS, key=lambda m: m.version) if m.version > current]
+                for migration in pending:
+                    for statement in migration.statements:
+                        await conn.execute(statement)
+                    await conn.execute(
+                        "INSERT INTO schema_migrations (version, name, applied_at) VALUES ($1, $2, $3)",
+                        migration.version, migration.name, datetime.utcnow()
+                    )
+                    logger.info(f"Applied PostgreSQL migration {migration.version}: {migration.name}")
+                version = pending[-1].version if pending else current
+        return len(pending), version
+
+    async def sessions_generation(self) -> int:
+        value = await self.pool.fetchval("SELECT generation FROM cache_generations WHERE name = 'sessions'")
+        return value or 0
+
+    async def get_sessions(self, limit, position, status, created_after, created_before):
+        params = _Params()
+        conditions = []
+        if status is not None:
+            conditions.append(f"status = {params.add(status)}")
+        if created_after is not None:
+            conditions.append(f"created_at >= {params.add(parse_timestamp(created_after))}")
+        if created_before is not None:
+            conditions.append(f"created_at < {params.add(parse_timestamp(created_before))}")
+        if position is not None:
+            conditions.append(
+                f"(created_at, id) < ({params.add(parse_timestamp(position[0]))}, {params.add(position[1])})"
+            )
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        rows = await self.pool.fetch(f"""
+            SELECT id, session_name, created_at, status
+            FROM sessions
+            {where}
+            ORDER BY created_at DESC, id DESC
+            LIMIT {params.add(limit)}
+        """, *params.values)
+        return [_isoformat_row(row) for row in rows]
+
+    async def get_session(self, session_id):
+        row = await self.pool.fetchrow(
+            "SELECT id, session_name, created_at, status FROM sessions WHERE id = $1", session_id
+        )
+        return _isoformat_row(row) if row else None
+
+    async def create_session(self, session_name, created_at):
+        row = await self.pool.fetchrow("""
+            INSERT INTO sessions (session_name, created_at, status)
+            VALUES ($1, $2, 'active')
+            RETURNING id, session_name, created_at, status
+        """, session_name, parse_timestamp(created_at))
+        return _isoformat_row(row)
+
+    async def get_session_logs(self, session_id, limit, position, log_type, since, until):
+        params = _Params()
+        conditions = [f"session_id = {params.add(session_id)}"]
+        if log_type is not None:
+            conditions.append(f"log_type = {params.add(log_type)}")
+        if since is not None:
+            conditions.append(f"timestamp >= {params.add(parse_timestamp(since))}")
+        if until is not None:
+            conditions.append(f"timestamp < {params.add(parse_timestamp(until))}")
+        if position is not None:
+            conditions.append(
+                f"(timestamp, id) > ({params.add(parse_timestamp(position[0]))}, {params.add(position[1])})"
+            )
+
+        rows = await self.pool.fetch(f"""
+            SELECT id, session_id, log_type, message, timestamp
+            FROM analysis_logs
+            WHERE {' AND '.join(conditions)}
+            ORDER BY timestamp, id
+            LIMIT {params.add(limit)}
+        """, *params.values)
+        return [_isoformat_row(row) for row in rows]
+
+    async def existing_sessions(self, session_ids: Sequence[int]) -> set:
+        rows = await self.pool.fetch("SELECT id FROM sessions WHERE id = ANY($1::bigint[])", list(session_ids))
+        return {row["id"] for row in rows}
+
+    async def insert_analysis_logs(self, logs, timestamp, before_commit=None):
+        moment = parse_timestamp(timestamp)
+        rollups = Counter((session_id, log_type) for session_id, log_type, _ in logs)
+
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                # COPY не повертає ID, тому вони резервуються з послідовності заздалегідь
+                ids = [row[0] for row in await conn.fetch(
+                    "SELECT nextval(pg_get_serial_sequence('analysis_logs', 'id')) FROM generate_series(1, $1)",
+                    len(logs)
+                )]
+                await conn.copy_records_to_table(
+                    "analysis_logs",
+                    records=[(log_id, *log, moment) for log_id, log in zip(ids, logs)],
+                    columns=["id", "session_id", "log_type", "message", "timestamp"]
+                )
+                await conn.executemany("""
+                    INSERT INTO analysis_log_rollups (granularity, session_id, log_type, bucket, count)
+                    VALUES ($1, $2, $3, $4, $5)
+                    ON CONFLICT (granularity, session_id, log_type, bucket)
+                    DO UPDATE SET count = analysis_log_rollups.count + EXCLUDED.count
+                """, [
+                    (granularity, session_id, log_type, timestamp[:length], count)
+                    for (session_id, log_type), count in rollups.items()
+                    for granularity, length in _BUCKET_LENGTHS.items()
+                ])
+                if before_commit is not None and not before_commit():
+                    # Виняток у блоці transaction() відкочує транзакцію
+                    raise asyncio.CancelledError("Analysis logs write abandoned before commit")
+        return ids
+
+    async def search_analysis_logs(self, query, session_id, limit, raw_syntax):
+        params = _Params()
+        tsquery = f"to_tsquery('simple', {params.add(query if raw_syntax else build_tsquery(query))})"
+        scope = f"AND session_id = {params.add(session_id)}" if session_id is not None else ""
+
+        try:
+            rows = await self.pool.fetch(f"""
+                SELECT id, session_id, log_type, timestamp,
+                       ts_headline('simple', message, q, 'StartSel=<mark>, StopSel=</mark>, HighlightAll=true')
+                           AS highlight,
+                       -ts_rank(to_tsvector('simple', message), q) AS rank
+                FROM analysis_logs, {tsquery} AS q
+                WHERE to_tsvector('simple', message) @@ q {scope}
+                ORDER BY rank
+                LIMIT {params.add(limit)}
+            """, *params.values)
+        except asyncpg.PostgresSyntaxError as e:
+            raise ValueError(f"Invalid search query: {e}")
+        return [_isoformat_row(row) for row in rows]
+
+    async def get_log_stats(self, granularity, first_bucket, last_bucket, session_id, log_type):
+        params = _Params()
+        conditions = [
+            f"granularity = {params.add(granularity)}",
+            f"bucket >= {params.add(first_bucket)}",
+            f"bucket <= {params.add(last_bucket)}",
+        ]
+        if session_id is not None:
+            conditions.append(f"session_id = {params.add(session_id)}")
+        if log_type is not None:
+            conditions.append(f"log_type = {params.add(log_type)}")
+
+        rows = await self.pool.fetch(f"""
+            SELECT bucket, log_type, SUM(count)::bigint AS count
+            FROM analysis_log_rollups
+            WHERE {' AND '.join(conditions)}
+            GROUP BY bucket, log_type
+            ORDER BY bucket, log_type
+        """, *params.values)
+        return [dict(row) for row in rows]
+
+    async def get_log_range(self) -> Tuple[Optional[str], Optional[str]]:
+        row = await self.pool.fetchrow("SELECT MIN(timestamp) AS oldest, MAX(timestamp) AS newest FROM analysis_logs")
+        row = _isoformat_row(row)
+        return row["oldest"], row["newest"]
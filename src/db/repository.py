@@ -0,0 +1,90 @@
+"""
+AI Cyber Tool - Storage Repository
+Інтерфейс сховища сесій та логів аналізу, незалежний від СУБД
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class Repository(ABC):
+    """Сховище сесій та логів аналізу
+
+    Курсори пагінації та часові мітки в результатах - ISO рядки незалежно від СУБД.
+    """
+
+    # Тип бази даних з URL (get_database_type)
+    database_type: str = ""
+
+    @abstractmethod
+    async def open(self):
+        """Відкриття з'єднань"""
+
+    @abstractmethod
+    async def close(self):
+        """Закриття з'єднань"""
+
+    @property
+    @abstractmethod
+    def is_open(self) -> bool:
+        """Чи відкрите сховище"""
+
+    @abstractmethod
+    async def migrate(self) -> Tuple[int, int]:
+        """Застосування міграцій схеми; повертає (кількість нових, поточна версія)"""
+
+    @abstractmethod
+    async def sessions_generation(self) -> int:
+        """Покоління таблиці сесій, що змінюється при кожному записі (для кешу читань)"""
+
+    @abstractmethod
+    async def get_sessions(self, limit: int, position: Optional[Tuple[str, int]], status: Optional[str],
+                           created_after: Optional[str], created_before: Optional[str]) -> List[dict]:
+        """Сторінка сесій від новіших до старіших (keyset після position)"""
+
+    @abstractmethod
+    async def get_session(self, session_id: int) -> Optional[dict]:
+        """Сесія за ID"""
+
+    @abstractmethod
+    async def create_session(self, session_name: str, created_at: str) -> dict:
+        """Створення сесії"""
+
+    @abstractmethod
+    async def get_session_logs(self, session_id: int, limit: int, position: Optional[Tuple[str, int]],
+                               log_type: Optional[str], since: Optional[str],
+                               until: Optional[str]) -> List[dict]:
+        """Сторінка логів сесії в хронологічному порядку (keyset після position)"""
+
+    @abstractmethod
+    async def existing_sessions(self, session_ids: Sequence[int]) -> set:
+        """Підмножина ID, для яких існують сесії"""
+
+    @abstractmethod
+    async def insert_analysis_logs(self, logs: Sequence[Tuple[int, str, str]], timestamp: str,
+                                   before_commit: Optional[Callable[[], bool]] = None) -> List[int]:
+        """Вставка логів однією транзакцією; повертає ID у тому ж порядку
+
+        before_commit викликається безпосередньо перед комітом; якщо він повертає False,
+        транзакція відкочується і кидається asyncio.CancelledError.
+        """
+
+    @abstractmethod
+    async def search_analysis_logs(self, query: str, session_id: Optional[int], limit: int,
+                                   raw_syntax: bool) -> List[dict]:
+        """Повнотекстовий пошук; ValueError для некоректного запиту"""
+
+    @abstractmethod
+    async def get_log_stats(self, granularity: str, first_bucket: str, last_bucket: str,
+                            session_id: Optional[int], log_type: Optional[str]) -> List[dict]:
+        """Рядки (bucket, log_type, count) з rollup таблиці за діапазоном інтервалів"""
+
+    @abstractmethod
+    async def get_log_range(self) -> Tuple[Optional[str], Optional[str]]:
+        """Найстаріша та найновіша мітка часу логів"""
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """ISO рядок у datetime для драйверів, що вимагають типізованих параметрів"""
+    return datetime.fromisoformat(value) if value is not None else None
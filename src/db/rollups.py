@@ -0,0 +1,42 @@
+"""
+AI Cyber Tool - Log Rollups
+Часові інтервали попередньо агрегованої статистики логів аналізу
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+
+# Формат ключа інтервалу збігається з префіксом ISO timestamp (substr у тригері)
+BUCKET_FORMATS: Dict[str, str] = {
+    "minute": "%Y-%m-%dT%H:%M",
+    "hour": "%Y-%m-%dT%H",
+    "day": "%Y-%m-%d",
+}
+
+BUCKET_SIZES: Dict[str, timedelta] = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+
+def bucket_key(value: datetime, granularity: str) -> str:
+    """Ключ інтервалу, що містить момент часу"""
+    return value.strftime(BUCKET_FORMATS[granularity])
+
+
+def choose_granularity(since: datetime, until: datetime, max_points: int,
+                       requested: Optional[str] = None) -> str:
+    """Найдрібніша гранулярність, за якої діапазон вміщується в max_points інтервалів
+
+    Явно запитана гранулярність укрупнюється, якщо з нею точок було б більше за max_points.
+    """
+    granularities = list(BUCKET_SIZES)
+    if requested is not None:
+        granularities = granularities[granularities.index(requested):]
+    span = until - since
+    for granularity in granularities:
+        if span / BUCKET_SIZES[granularity] <= max_points:
+            return granularity
+    return granularities[-1]
@@ -0,0 +1,384 @@
+"""
+AI Cyber Tool - SQLite Repository
+Сховище сесій та логів аналізу на SQLite (WAL, пул з'єднань, FTS5)
+"""
+
+import asyncio
+import re
+import sqlite3
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional, Sequence, Set, Tuple
+
+from loguru import logger
+
+from .compression import MessageCodec, train_dictionary
+from .migrations import get_schema_version, run_migrations
+from .partitions import create_hot_partition, hot_partitions, hot_table, month_key
+from .pool import DatabasePool
+from .repository import Repository
+
+
+def sqlite_path(database_url: str) -> str:
+    """Шлях до файлу бази даних з URL ('sqlite:///app.db' або просто 'app.db')"""
+    if database_url.startswith("sqlite:///"):
+        return database_url[len("sqlite:///"):]
+    return database_url
+
+
+_SEARCH_TOKEN = re.compile(r'"[^"]*"\*?|\S+')
+
+
+def build_match_query(query: str) -> str:
+    """Перетворення простого пошукового запиту в FTS5 вираз
+
+    "фраза в лапках" шукається як фраза, слово* - як префікс, решта слів
+    екрануються і поєднуються через AND, тому спецсимволи (IP, шляхи) не ламають синтаксис.
+    """
+    terms = []
+    for token in _SEARCH_TOKEN.findall(query):
+        prefix = token.endswith("*")
+        text = token.rstrip("*")
+        if text.startswith('"') and text.endswith('"') and len(text) >= 2:
+            text = text[1:-1]
+        text = text.replace('"', '""')
+        if not text.strip():
+            continue
+        terms.append(f'"{text}"*' if prefix else f'"{text}"')
+    if not terms:
+        raise ValueError("Empty search query")
+    return " AND ".join(terms)
+
+
+class SQLiteRepository(Repository):
+    """Сховище на SQLite: один writer та N readers на воркер"""
+
+    database_type = "sqlite"
+
+    def __init__(self, database_url: str, readers: int = 4, cache_size_kib: int = 16384,
+                 mmap_size: int = 268435456, busy_timeout_ms: int = 5000,
+                 compression: bool = True, train_samples: int = 2000, dictionary_size: int = 16384):
+        self.database_path = sqlite_path(database_url)
+        self.codec = MessageCodec(self.database_path, enabled=compression)
+        self.pool = DatabasePool(
+            self.database_path,
+            readers=readers,
+            cache_size_kib=cache_size_kib,
+            mmap_size=mmap_size,
+            busy_timeout_ms=busy_timeout_ms,
+            codec=self.codec
+        )
+        self.train_samples = train_samples
+        self.dictionary_size = dictionary_size
+        self._untrained: Counter = Counter()
+        self._training: Set[asyncio.Task] = set()
+
+    @property
+    def is_open(self) -> bool:
+        return self.pool.is_open
+
+    async def open(self):
+        await self.pool.open()
+
+    async def close(self):
+        for task in list(self._training):
+            task.cancel()
+        await asyncio.gather(*self._training, return_exceptions=True)
+        await self.pool.close()
+
+    async def migrate(self) -> Tuple[int, int]:
+        async with self.pool.writer() as conn:
+            applied = await run_migrations(conn, self.database_path, codec=self.codec)
+            # Партиція поточного місяця існує до першого запису (пошук перевіряє синтаксис FTS)
+            await create_hot_partition(conn, month_key(datetime.utcnow().isoformat()))
+            await conn.commit()
+            cursor = await conn.execute("SELECT id, log_type, dictionary FROM log_dictionaries")
+            for dictionary_id, log_type, dictionary in await cursor.fetchall():
+                self.codec.add_dictionary(dictionary_id, log_type, dictionary)
+            return applied, await get_schema_version(conn)
+
+    async def sessions_generation(self) -> int:
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute("SELECT generation FROM cache_generations WHERE name = 'sessions'")
+            row = await cursor.fetchone()
+            return row[0] if row else 0
+
+    async def get_sessions(self, limit, position, status, created_after, created_before):
+        conditions = []
+        params: List = []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if created_after is not None:
+            conditions.append("created_at >= ?")
+            params.append(created_after)
+        if created_before is not None:
+            conditions.append("created_at < ?")
+            params.append(created_before)
+        if position is not None:
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend(position)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute(f"""
+                SELECT id, session_name, created_at, status
+                FROM sessions
+                {where}
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            """, (*params, limit))
+            return [dict(row) for row in await cursor.fetchall()]
+
+    async def get_session(self, session_id):
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute("""
+                SELECT id, session_name, created_at, status
+                FROM sessions
+                WHERE id = ?
+            """, (session_id,))
+            row = await cursor.fetchone()
+            return dict(row) if row else None
+
+    async def create_session(self, session_name, created_at):
+        async with self.pool.writer() as conn:
+            cursor = await conn.execute("""
+                INSERT INTO sessions (session_name, created_at, status)
+                VALUES (?, ?, ?)
+            """, (session_name, created_at, "active"))
+            await conn.commit()
+
+            cursor = await conn.execute("""
+                SELECT id, session_name, created_at, status
+                FROM sessions
+                WHERE id = ?
+            """, (cursor.lastrowid,))
+            return dict(await cursor.fetchone())
+
+    async def get_session_logs(self, session_id, limit, position, log_type, since, until):
+        conditions = ["session_id = ?"]
+        params: List = [session_id]
+        if log_type is not None:
+            conditions.append("log_type = ?")
+            params.append(log_type)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        if position is not None:
+            conditions.append("(timestamp, id) > (?, ?)")
+            params.extend(position)
+
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute(f"""
+                SELECT id, session_id, log_type, log_text(message) AS message, timestamp
+                FROM analysis_logs
+                WHERE {' AND '.join(conditions)}
+                ORDER BY timestamp, id
+                LIMIT ?
+            """, (*params, limit))
+            return [dict(row) for row in await cursor.fetchall()]
+
+    async def existing_sessions(self, session_ids: Sequence[int]) -> set:
+        found = set()
+        async with self.pool.reader() as conn:
+            # Не більше 500 параметрів на запит (ліміт SQLITE_MAX_VARIABLE_NUMBER у старих збірках)
+            for start in range(0, len(session_ids), 500):
+                batch = list(session_ids[start:start + 500])
+                placeholders = ", ".join("?" * len(batch))
+                cursor = await conn.execute(f"SELECT id FROM sessions WHERE id IN ({placeholders})", batch)
+                found.update(row[0] for row in await cursor.fetchall())
+        return found
+
+    async def insert_analysis_logs(self, logs, timestamp, before_commit=None):
+        key = month_key(timestamp)
+        async with self.pool.writer() as conn:
+            # Партиція місяця створюється першим записом у ньому (в тій самій транзакції)
+            await create_hot_partition(conn, key)
+
+            # ID резервуються одним UPDATE, що бере блокування запису, тому вони
+            # йдуть підряд і не перетинаються з іншими воркерами
+            cursor = await conn.execute(
+                "UPDATE analysis_log_sequence SET last_id = last_id + ? RETURNING last_id", (len(logs),)
+            )
+            first_id = (await cursor.fetchone())[0] - len(logs) + 1
+
+            # Стиснення виконується SQL функцією в потоці з'єднання, а не в event loop
+            await conn.executemany(f"""
+                INSERT INTO {hot_table(key)} (id, session_id, log_type, message, timestamp)
+                VALUES (?1, ?2, ?3, log_pack(?3, ?4), ?5)
+            """, [(first_id + offset, *log, timestamp) for offset, log in enumerate(logs)])
+            if before_commit is not None and not before_commit():
+                # Writer відкочує транзакцію при винятку
+                raise asyncio.CancelledError("Analysis logs write abandoned before commit")
+            await conn.commit()
+
+        if self.codec.enabled:
+            self._schedule_training(logs)
+        return [first_id + offset for offset in range(len(logs))]
+
+    def _schedule_training(self, logs):
+        """Навчання словника для типу логів, коли накопичилось достатньо зразків"""
+        for _, log_type, _ in logs:
+            if not self.codec.has_dictionary(log_type):
+                self._untrained[log_type] += 1
+        for log_type, count in list(self._untrained.items()):
+            if count >= self.train_samples:
+                del self._untrained[log_type]
+                task = asyncio.create_task(self.train_dictionary(log_type), name=f"train-dictionary-{log_type}")
+                self._training.add(task)
+                task.add_done_callback(self._training.discard)
+
+    async def train_dictionary(self, log_type: str, recompress_chunk_size: int = 1000) -> Optional[int]:
+        """Навчання словника стиснення для log_type та перестиснення вже записаних логів"""
+        try:
+            async with self.pool.reader() as conn:
+                # Словник міг бути навчений іншим воркером
+                cursor = await conn.execute(
+                    "SELECT id, dictionary FROM log_dictionaries WHERE log_type = ? ORDER BY id DESC LIMIT 1",
+                    (log_type,)
+                )
+                row = await cursor.fetchone()
+                if row is None:
+                    cursor = await conn.execute("""
+                        SELECT log_text(message) FROM analysis_logs
+                        WHERE log_type = ? ORDER BY id DESC LIMIT ?
+                    """, (log_type, self.train_samples))
+                    samples = [sample for (sample,) in await cursor.fetchall()]
+
+            if row is not None:
+                self.codec.add_dictionary(row[0], log_type, row[1])
+                return row[0]
+
+            dictionary = await asyncio.to_thread(train_dictionary, samples, self.dictionary_size)
+            if not dictionary:
+                return None
+            async with self.pool.writer() as conn:
+                cursor = await conn.execute("""
+                    INSERT INTO log_dictionaries (log_type, dictionary, samples, created_at)
+                    VALUES (?, ?, ?, ?)
+                """, (log_type, dictionary, len(samples), datetime.utcnow().isoformat()))
+                await conn.commit()
+            dictionary_id = cursor.lastrowid
+            self.codec.add_dictionary(dictionary_id, log_type, dictionary)
+
+            recompressed = await self._recompress(log_type, recompress_chunk_size)
+            logger.info(
+                f"Trained compression dictionary {dictionary_id} for '{log_type}' logs "
+                f"({len(dictionary)} bytes from {len(samples)} samples, {recompressed} logs recompressed)"
+            )
+            return dictionary_id
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to train compression dictionary for '{log_type}' logs: {e}")
+            return None
+
+    async def _recompress(self, log_type: str, chunk_size: int) -> int:
+        """Перестиснення логів типу новим словником короткими транзакціями (по партиціях)"""
+        async with self.pool.reader() as conn:
+            keys = await hot_partitions(conn)
+        total = 0
+        for key in keys:
+            table = hot_table(key)
+            last_id = 0
+            while True:
+                try:
+                    async with self.pool.writer() as conn:
+                        cursor = await conn.execute(f"""
+                            UPDATE {table} SET message = log_pack(log_type, log_text(message))
+                            WHERE id IN (
+                                SELECT id FROM {table}
+                                WHERE id > ? AND log_type = ?
+                                ORDER BY id
+                                LIMIT ?
+                            )
+                            RETURNING id
+                        """, (last_id, log_type, chunk_size))
+                        ids = [row[0] for row in await cursor.fetchall()]
+                        await conn.commit()
+                except sqlite3.OperationalError as e:
+                    # Партицію видалив retention під час перестиснення
+                    if "no such table" not in str(e):
+                        raise
+                    break
+                if not ids:
+                    break
+                total += len(ids)
+                last_id = max(ids)
+                await asyncio.sleep(0)
+        return total
+
+    async def search_analysis_logs(self, query, session_id, limit, raw_syntax):
+        expression = query if raw_syntax else build_match_query(query)
+        match = f"message : ({expression})"
+        if session_id is not None:
+            match = f'session_id : "{int(session_id)}" AND {match}'
+
+        try:
+            async with self.pool.reader() as conn:
+                keys = await hot_partitions(conn)
+                if not keys:
+                    return []
+                # Кожен місяць має власний FTS індекс; ранги (bm25) рахуються в межах
+                # партиції, а найкращі збіги всіх партицій об'єднуються
+                selects = []
+                for key in keys:
+                    table = hot_table(key)
+                    selects.append(f"""
+                        SELECT * FROM (
+                            SELECT l.id, l.session_id, l.log_type, l.timestamp,
+                                   highlight({table}_fts, 0, '<mark>', '</mark>') AS highlight,
+                                   {table}_fts.rank AS rank
+                            FROM {table}_fts
+                            JOIN {table} l ON l.id = {table}_fts.rowid
+                            WHERE {table}_fts MATCH :match
+                            ORDER BY {table}_fts.rank
+                            LIMIT :limit
+                        )
+                    """)
+                cursor = await conn.execute(
+                    f"{' UNION ALL '.join(selects)} ORDER BY rank LIMIT :limit",
+                    {"match": match, "limit": limit}
+                )
+                return [dict(row) for row in await cursor.fetchall()]
+        except sqlite3.OperationalError as e:
+            if "fts5" in str(e) or "no such column" in str(e):
+                raise ValueError(f"Invalid search query: {e}")
+            logger.error(f"SQLite search failed: {e}")
+            raise
+
+    async def get_log_stats(self, granularity, first_bucket, last_bucket, session_id, log_type):
+        conditions = ["granularity = ?", "bucket >= ?", "bucket <= ?"]
+        params: List = [granularity, first_bucket, last_bucket]
+        if session_id is not None:
+            conditions.append("session_id = ?")
+            params.append(session_id)
+        if log_type is not None:
+            conditions.append("log_type = ?")
+            params.append(log_type)
+
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute(f"""
+                SELECT bucket, log_type, SUM(count) AS count
+                FROM analysis_log_rollups
+                WHERE {' AND '.join(conditions)}
+                GROUP BY bucket, log_type
+                ORDER BY bucket, log_type
+            """, params)
+            return [dict(row) for row in await cursor.fetchall()]
+
+    async def get_log_range(self) -> Tuple[Optional[str], Optional[str]]:
+        async with self.pool.reader() as conn:
+            keys = await hot_partitions(conn)
+            if not keys:
+                return None, None
+            # Межі з найстарішої та найновішої партиції за індексом timestamp
+            cursor = await conn.execute(f"""
+                SELECT (SELECT MIN(timestamp) FROM {hot_table(keys[0])}),
+                       (SELECT MAX(timestamp) FROM {hot_table(keys[-1])})
+            """)
+            oldest, newest = await cursor.fetchone()
+            return oldest, newest
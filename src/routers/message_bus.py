@@ -3,41 +3,43 @@ AI Cyber Tool - Message Bus Router
 API ендпоінти для роботи з Message Bus (RabbitMQ)
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from loguru import logger
 import uuid
 from datetime import datetime
 from ..core.config import get_settings
-from ..services.message_bus import MessageBus, MessageBusConfig, create_command_message
+from ..services.message_bus import MessageBus, create_command_message
 
 router = APIRouter()
 settings = get_settings()
 
 
 # Dependency для отримання MessageBus
-async def get_message_bus_dependency() -> MessageBus:
+async def get_message_bus_dependency(request: Request) -> MessageBus:
     """Отримання MessageBus через Dependency Injection"""
-    # Це буде імплементовано в основному app.py
-    # Тут ми просто створюємо новий екземпляр для тестування
-    message_bus_config = MessageBusConfig(
-        rabbitmq_url=settings.rabbitmq_url,
-        commands_exchange=settings.rabbitmq_commands_exchange,
-        events_exchange=settings.rabbitmq_events_exchange
-    )
-    return MessageBus(message_bus_config)
+    # Використовується тільки спільний екземпляр додатку (створюється при старті та закривається при зупинці).
+    # Новий MessageBus на кожен запит запускав би publisher з фоновим потоком, який ніхто не закриває.
+    message_bus = getattr(request.app.state, "message_bus", None)
+    if message_bus is None:
+        raise HTTPException(status_code=503, detail="Message Bus is not configured")
+    return message_bus
 
 
 @router.get("/api/message-bus/status")
-async def get_message_bus_status(message_bus: MessageBus = Depends(get_message_bus_dependency)):
+async def get_message_bus_status(request: Request, message_bus: MessageBus = Depends(get_message_bus_dependency)):
     """Отримати статус Message Bus"""
+    log_ingestion = getattr(request.app.state, "log_ingestion", None)
     try:
         # Перевіряємо з'єднання з RabbitMQ
         publisher = message_bus.get_publisher()
-        consumer = message_bus.get_consumer()
+        stats = publisher.get_stats()
         
         return {
-            "status": "connected",
-            "message": "Message Bus is operational",
+            "status": "connected" if stats["connected"] else "buffering",
+            "message": "Message Bus is operational" if stats["connected"] else "Broker unavailable, messages are buffered",
+            "publisher": stats,
+            "consumer": message_bus.consumer.get_stats() if message_bus.consumer else None,
+            "log_ingestion": log_ingestion.get_stats() if log_ingestion else None,
             "config": {
                 "rabbitmq_url": settings.rabbitmq_url,
                 "commands_exchange": settings.rabbitmq_commands_exchange,
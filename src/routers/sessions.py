@@ -3,23 +3,112 @@ AI Cyber Tool - Sessions Router
 API ендпоінти для роботи з сесіями
 """
 
-from fastapi import APIRouter, HTTPException
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from loguru import logger
+from pydantic import ValidationError
+from ..core.config import get_settings
 from ..models.session import SessionCreate, SessionResponse, AnalysisLogCreate
-from ..db.database import get_sessions, create_session, create_analysis_log
+from ..db.database import (
+    get_sessions, get_session, get_session_logs, create_session, create_analysis_log, create_analysis_logs,
+    search_analysis_logs, iter_session_logs, iter_all_session_logs, get_log_partitions, session_cache,
+    get_analysis_log_stats, get_database_backup
+)
+from ..db.pagination import encode_cursor
 
 router = APIRouter()
+settings = get_settings()
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Час в UTC без часового поясу - у такому вигляді зберігаються мітки часу"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    value = _naive_utc(value)
+    return value.isoformat() if value else None
 
 
 @router.get("/api/sessions")
-async def get_sessions_endpoint():
-    """Отримання списку всіх сесій (асинхронно)"""
+async def get_sessions_endpoint(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None
+):
+    """Отримання сторінки сесій з фільтрами (keyset пагінація через cursor)"""
     try:
-        sessions = await get_sessions()
-        return {"payload": sessions, "count": len(sessions)}
+        sessions = await get_sessions(
+            limit=limit,
+            cursor=cursor,
+            status=status,
+            created_after=_isoformat(created_after),
+            created_before=_isoformat(created_before)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to get sessions: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve sessions")
+    
+    next_cursor = None
+    if len(sessions) == limit:
+        last = sessions[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return {"payload": sessions, "count": len(sessions), "next_cursor": next_cursor}
+
+
+@router.get("/api/sessions/cache")
+async def get_sessions_cache_endpoint():
+    """Статистика кешу читань сесій цього воркера"""
+    return {"enabled": settings.session_cache_enabled, **session_cache.get_stats()}
+
+
+@router.get("/api/sessions/{session_id}/logs")
+async def get_session_logs_endpoint(
+    session_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    log_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Отримання сторінки логів аналізу сесії з фільтрами (keyset пагінація через cursor)"""
+    try:
+        if await get_session(session_id) is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        logs = await get_session_logs(
+            session_id,
+            limit=limit,
+            cursor=cursor,
+            log_type=log_type,
+            since=_isoformat(since),
+            until=_isoformat(until)
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to get logs for session {session_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve analysis logs")
+    
+    next_cursor = None
+    if len(logs) == limit:
+        last = logs[-1]
+        next_cursor = encode_cursor(last["timestamp"], last["id"])
+    return {"payload": logs, "count": len(logs), "next_cursor": next_cursor}
 
 
 @router.post("/api/sessions", response_model=SessionResponse)
@@ -41,10 +130,10 @@ async def create_session_endpoint(session: SessionCreate):
 
 
 @router.post("/api/analysis-logs")
-async def create_analysis_log_endpoint(log: AnalysisLogCreate):
-    """Створення нового логу аналізу з валідацією"""
+async def create_analysis_log_endpoint(log: AnalysisLogCreate, wait: bool = True):
+    """Створення нового логу аналізу з валідацією (wait=false - без очікування коміту)"""
     try:
-        log_id = await create_analysis_log(log.session_id, log.log_type, log.message)
+        log_id = await create_analysis_log(log.session_id, log.log_type, log.message, wait=wait)
         logger.info(f"Created analysis log for session {log.session_id}: {log.log_type}")
         
         return {
@@ -59,3 +148,256 @@ async def create_analysis_log_endpoint(log: AnalysisLogCreate):
     except Exception as e:
         logger.error(f"Failed to create analysis log: {e}")
         raise HTTPException(status_code=500, detail="Failed to create analysis log")
+
+
+async def _iter_batch_items(request: Request) -> AsyncIterator[Any]:
+    """Елементи пакету з JSON масиву або NDJSON потоку"""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" not in content_type:
+        try:
+            items = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Request body must be a JSON array")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Request body must be a JSON array")
+        for item in items:
+            yield item
+        return
+    
+    # NDJSON читаємо потоково, рядок за рядком
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+
+def _validate_batch_item(item: Any) -> AnalysisLogCreate:
+    """Валідація одного елемента пакету"""
+    if isinstance(item, bytes):
+        return AnalysisLogCreate.model_validate_json(item)
+    return AnalysisLogCreate.model_validate(item)
+
+
+@router.post("/api/analysis-logs/batch")
+async def create_analysis_logs_batch_endpoint(request: Request):
+    """Пакетне створення логів аналізу (JSON масив або application/x-ndjson)"""
+    chunk_size = settings.analysis_logs_batch_chunk_size
+    results: List[Dict[str, Any]] = []
+    pending: List[Tuple[int, AnalysisLogCreate]] = []
+    existing_sessions: Dict[int, bool] = {}
+    
+    async def flush():
+        created = await create_analysis_logs(
+            [(log.session_id, log.log_type, log.message) for _, log in pending],
+            chunk_size=chunk_size,
+            existing_sessions=existing_sessions
+        )
+        for (index, log), log_id in zip(pending, created):
+            if log_id is None:
+                results[index] = {"index": index, "status": "error", "error": "Session not found"}
+            else:
+                results[index] = {"index": index, "status": "created", "id": log_id, "session_id": log.session_id}
+        pending.clear()
+    
+    try:
+        async for item in _iter_batch_items(request):
+            index = len(results)
+            if index >= settings.analysis_logs_batch_max_items:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Batch exceeds {settings.analysis_logs_batch_max_items} items"
+                )
+            try:
+                log = _validate_batch_item(item)
+            except ValidationError as e:
+                results.append({
+                    "index": index,
+                    "status": "error",
+                    "error": e.errors(include_url=False, include_context=False, include_input=False)
+                })
+                continue
+            
+            results.append(None)
+            pending.append((index, log))
+            if len(pending) >= chunk_size:
+                await flush()
+        
+        if pending:
+            await flush()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to create analysis logs batch: {e}")
+        raise HTTPException(status_code=500, detail="Failed to create analysis logs batch")
+    
+    created_count = sum(1 for result in results if result["status"] == "created")
+    logger.info(f"Created {created_count}/{len(results)} analysis logs in batch")
+    
+    return {
+        "results": results,
+        "count": len(results),
+        "created": created_count,
+        "failed": len(results) - created_count
+    }
+
+
+EXPORT_COLUMNS = ["id", "session_id", "log_type", "message", "timestamp"]
+
+
+async def _encode_export(chunks: AsyncIterator[List[dict]], export_format: str) -> AsyncIterator[bytes]:
+    """Серіалізація порцій логів у NDJSON або CSV"""
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        async for logs in chunks:
+            writer.writerows(logs)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+    else:
+        async for logs in chunks:
+            yield "".join(json.dumps(log, ensure_ascii=False) + "\n" for log in logs).encode("utf-8")
+
+
+async def _gzip_stream(data: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Стиснення потоку gzip на льоту"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in data:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+@router.get("/api/sessions/{session_id}/logs/export")
+async def export_session_logs_endpoint(
+    session_id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    log_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_archived: bool = False
+):
+    """Потоковий експорт логів аналізу сесії в NDJSON або CSV (опційно gzip та архівні партиції)"""
+    try:
+        if await get_session(session_id) is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to export logs for session {session_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to export analysis logs")
+    
+    chunks = (iter_all_session_logs if include_archived else iter_session_logs)(
+        session_id,
+        chunk_size=settings.analysis_logs_export_chunk_size,
+        log_type=log_type,
+        since=_isoformat(since),
+        until=_isoformat(until)
+    )
+    body = _encode_export(chunks, format)
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    filename = f"session-{session_id}-logs.{format}"
+    if gzip:
+        body = _gzip_stream(body)
+        media_type = "application/gzip"
+        filename += ".gz"
+    
+    logger.info(f"Exporting analysis logs for session {session_id} as {filename}")
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/api/analysis-logs/partitions")
+async def get_log_partitions_endpoint():
+    """Гаряче вікно логів аналізу та архівні місячні партиції"""
+    try:
+        return await get_log_partitions()
+    except Exception as e:
+        logger.error(f"Failed to get log partitions: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get log partitions")
+
+
+@router.get("/api/database/backups")
+async def get_database_backups_endpoint():
+    """Резервні копії бази даних та метрики останнього копіювання"""
+    try:
+        backup = await get_database_backup()
+        return {"backups": backup.backups(), "stats": backup.get_stats()}
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to get database backups: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get database backups")
+
+
+@router.post("/api/database/backups", status_code=201)
+async def create_database_backup_endpoint():
+    """Позачергова онлайн резервна копія бази даних"""
+    try:
+        backup = await get_database_backup()
+        return await backup.run_once()
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to create database backup: {e}")
+        raise HTTPException(status_code=500, detail="Failed to create database backup")
+
+
+@router.get("/api/analysis-logs/stats")
+async def get_analysis_log_stats_endpoint(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    granularity: Optional[str] = Query(None, pattern="^(minute|hour|day)$"),
+    session_id: Optional[int] = None,
+    log_type: Optional[str] = None,
+    max_points: int = Query(settings.analysis_logs_stats_max_points, ge=1, le=10000)
+):
+    """Кількість логів аналізу по часових інтервалах (за замовчуванням останні 24 години)"""
+    # Логи зберігаються з UTC часом без зони
+    until = _naive_utc(until) or datetime.utcnow()
+    since = _naive_utc(since) or until - timedelta(days=1)
+    if since >= until:
+        raise HTTPException(status_code=400, detail="'since' must be earlier than 'until'")
+    
+    try:
+        stats = await get_analysis_log_stats(
+            since, until, granularity=granularity, session_id=session_id, log_type=log_type,
+            max_points=max_points
+        )
+    except Exception as e:
+        logger.error(f"Failed to get analysis log stats: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get analysis log stats")
+    
+    return {"since": since.isoformat(), "until": until.isoformat(), **stats}
+
+
+@router.get("/api/analysis-logs/search")
+async def search_analysis_logs_endpoint(
+    q: str = Query(..., min_length=1, max_length=500),
+    session_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=200),
+    syntax: str = Query("simple", pattern="^(simple|fts)$")
+):
+    """Повнотекстовий пошук по логах аналізу ("фраза", префікс*, syntax=fts для повного FTS5)"""
+    try:
+        results = await search_analysis_logs(q, session_id=session_id, limit=limit, raw_syntax=syntax == "fts")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to search analysis logs: {e}")
+        raise HTTPException(status_code=500, detail="Failed to search analysis logs")
+    
+    return {"payload": results, "count": len(results), "query": q}
@@ -3,49 +3,92 @@ AI Cyber Tool - Tech Map Router
 API ендпоінти для технічної карти та специфікацій
 """
 
-from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Request, HTTPException, Query
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from pathlib import Path
+from typing import Optional
 from loguru import logger
 from ..core.config import get_settings
+from ..core.templates import templates
+from ..services.diagrams import DiagramManifest
+from ..services.documents import DocumentCache, SpecsIndex, spec_title
+from ..services.markdown_renderer import MarkdownCache, OutlineCache
+from ..services.search import SearchIndex
+from ..services.static_assets import AssetStore
 
 router = APIRouter()
 settings = get_settings()
-templates = Jinja2Templates(directory="templates")
+
+documents = DocumentCache(revalidate_interval=settings.docs_revalidate_ms / 1000)
+specs_index = SpecsIndex("specs", revalidate_interval=settings.docs_revalidate_ms / 1000)
+diagram_manifest = DiagramManifest("architecture", refresh_interval=settings.diagrams_refresh_interval_ms / 1000)
+
+markdown_cache = MarkdownCache()
+outline_cache = OutlineCache()
+search_index = SearchIndex(documents, refresh_interval=settings.search_refresh_interval_ms / 1000)
+
+# Статичні файли з хешами вмісту та стисненими варіантами (монтуються в app.py / main.py)
+static_assets = AssetStore("static", "/static", cache_dir=Path(settings.static_cache_dir) / "static")
+architecture_assets = AssetStore(
+    "architecture", "/architecture", cache_dir=Path(settings.static_cache_dir) / "architecture"
+)
+
+DEFAULT_SPECS_CONTENT = "# Специфікації сервісів\n\nСпецифікації будуть доступні після створення."
+
+
+async def warm_documents():
+    """Попереднє завантаження технічної карти, специфікацій та навігації при старті"""
+    await specs_index.refresh()
+    for lang in ("uk", "en"):
+        await documents.get(f"architecture/{lang}/technical_map.md")
+    # Сторінки специфікацій віддаються відрендереними, тому HTML готується заздалегідь
+    paths = ["specs/README.md"] + [f"specs/{spec['name']}.md" for spec in await specs_index.specs()]
+    for path in paths:
+        document = await documents.get(path)
+        if document is not None:
+            await markdown_cache.render(document.text)
+    logger.info(
+        f"Document cache warmed ({documents.get_stats()['documents']} documents, "
+        f"{markdown_cache.get_stats()['entries']} rendered)"
+    )
+
+
+async def build_static_assets():
+    """Хешування статичних файлів та створення gzip/brotli варіантів при старті"""
+    await static_assets.build()
+    await architecture_assets.build()
+
+
+async def load_spec(spec_name: str):
+    """Документ специфікації (ім'я з або без .md)"""
+    if spec_name.endswith(".md"):
+        spec_name = spec_name[:-3]
+    spec = await documents.get(Path("specs") / f"{spec_name}.md")
+    if spec is None:
+        raise HTTPException(status_code=404, detail="Specification not found")
+    return spec
+
+
+def conditional_response(request: Request, etag: str, content, media_type: Optional[str] = None) -> Response:
+    """Відповідь з ETag; 304 без тіла, якщо клієнт вже має цю версію"""
+    headers = {"etag": etag, "cache-control": "no-cache"}
+    tags = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers=headers)
+    if media_type is None:
+        return JSONResponse(content, headers=headers)
+    return Response(content, media_type=media_type, headers=headers)
 
 
 @router.get("/tech-map", response_class=HTMLResponse)
 async def tech_map_page(request: Request, lang: str = "uk"):
     """Сторінка технічної карти"""
     try:
-        # Читаємо технічну карту
-        tech_map_path = Path(f"architecture/{lang}/technical_map.md")
-        if not tech_map_path.exists():
-            tech_map_path = Path("architecture/uk/technical_map.md")
-        
-        with open(tech_map_path, "r", encoding="utf-8") as f:
-            tech_map_content = f.read()
-        
-        # Отримуємо список діаграм
-        diagrams = []
-        architecture_dir = Path("architecture")
-        
-        # Знайти всі PNG файли
-        for png_file in architecture_dir.glob("*.png"):
-            svg_file = png_file.with_suffix('.svg')
-            mmd_file = png_file.with_suffix('.mmd')
-            
-            diagrams.append({
-                "name": png_file.stem,
-                "png_path": f"/architecture/{png_file.name}",
-                "svg_path": f"/architecture/{svg_file.name}" if svg_file.exists() else None,
-                "mmd_path": f"/architecture/{mmd_file.name}" if mmd_file.exists() else None
-            })
+        # Діаграми з маніфесту в пам'яті
+        diagrams = await diagram_manifest.diagrams()
         
         return templates.TemplateResponse("tech_map.html", {
             "request": request,
-            "tech_map_content": tech_map_content,
             "diagrams": diagrams,
             "lang": lang
         })
@@ -59,22 +102,7 @@ async def tech_map_page(request: Request, lang: str = "uk"):
 async def tech_map_api():
     """API для отримання інформації про технічну карту"""
     try:
-        diagrams = []
-        architecture_dir = Path("architecture")
-        
-        # Знайти всі PNG файли
-        for png_file in architecture_dir.glob("*.png"):
-            svg_file = png_file.with_suffix('.svg')
-            mmd_file = png_file.with_suffix('.mmd')
-            
-            diagrams.append({
-                "name": png_file.stem,
-                "png_path": f"/architecture/{png_file.name}",
-                "svg_path": f"/architecture/{svg_file.name}" if svg_file.exists() else None,
-                "mmd_path": f"/architecture/{mmd_file.name}" if mmd_file.exists() else None,
-                "size": png_file.stat().st_size,
-                "modified": png_file.stat().st_mtime
-            })
+        diagrams = await diagram_manifest.diagrams()
         
         return {
             "diagrams": diagrams,
@@ -91,29 +119,17 @@ async def specs_page(request: Request, lang: str = "uk"):
     """Сторінка специфікацій сервісів"""
     try:
         # Читаємо README з папки specs
-        specs_readme_path = Path("specs/README.md")
-        if specs_readme_path.exists():
-            with open(specs_readme_path, "r", encoding="utf-8") as f:
-                specs_content = f.read()
-        else:
-            specs_content = "# Специфікації сервісів\n\nСпецифікації будуть доступні після створення."
+        readme = await documents.get("specs/README.md")
+        specs_content = readme.text if readme is not None else DEFAULT_SPECS_CONTENT
+        rendered = await markdown_cache.render(specs_content)
         
-        # Отримуємо список специфікацій
-        specs_files = []
-        specs_dir = Path("specs")
-        if specs_dir.exists():
-            for file_path in specs_dir.glob("*.md"):
-                if file_path.name != "README.md":
-                    specs_files.append({
-                        "name": file_path.stem,
-                        "title": file_path.stem.replace("_", " ").title(),
-                        "path": f"/specs/{file_path.name}"
-                    })
+        # Попередньо обчислений список специфікацій
+        specs_files = await specs_index.navigation()
         
         return templates.TemplateResponse("specs.html", {
             "request": request,
             "lang": lang,
-            "specs_content": specs_content,
+            "specs_html": rendered.html,
             "specs_files": specs_files,
             "version": settings.api_version,
             "status": "running"
@@ -127,32 +143,21 @@ async def specs_page(request: Request, lang: str = "uk"):
 async def spec_detail(request: Request, spec_name: str, lang: str = "uk"):
     """Детальна сторінка специфікації"""
     try:
-        spec_path = Path(f"specs/{spec_name}.md")
-        if not spec_path.exists():
-            raise HTTPException(status_code=404, detail="Specification not found")
-        
-        with open(spec_path, "r", encoding="utf-8") as f:
-            spec_content = f.read()
+        # Навігація посилається на /specs/<name>.md
+        spec = await load_spec(spec_name)
+        spec_name = spec.path.stem
+        rendered = await markdown_cache.render(spec.text)
         
-        # Отримуємо список всіх специфікацій для навігації
-        specs_files = []
-        specs_dir = Path("specs")
-        if specs_dir.exists():
-            for file_path in specs_dir.glob("*.md"):
-                if file_path.name != "README.md":
-                    specs_files.append({
-                        "name": file_path.stem,
-                        "title": file_path.stem.replace("_", " ").title(),
-                        "path": f"/specs/{file_path.name}",
-                        "active": file_path.stem == spec_name
-                    })
+        # Список всіх специфікацій для навігації
+        specs_files = await specs_index.navigation(active=spec_name)
         
         return templates.TemplateResponse("spec_detail.html", {
             "request": request,
             "lang": lang,
             "spec_name": spec_name,
-            "spec_title": spec_name.replace("_", " ").title(),
-            "spec_content": spec_content,
+            "spec_title": spec_title(spec_name),
+            "spec_html": rendered.html,
+            "spec_toc": rendered.toc,
             "specs_files": specs_files,
             "version": settings.api_version,
             "status": "running"
@@ -168,17 +173,7 @@ async def spec_detail(request: Request, spec_name: str, lang: str = "uk"):
 async def get_specs_list():
     """API для отримання списку специфікацій"""
     try:
-        specs_files = []
-        specs_dir = Path("specs")
-        if specs_dir.exists():
-            for file_path in specs_dir.glob("*.md"):
-                specs_files.append({
-                    "name": file_path.stem,
-                    "title": file_path.stem.replace("_", " ").title(),
-                    "path": f"/specs/{file_path.name}",
-                    "size": file_path.stat().st_size,
-                    "modified": file_path.stat().st_mtime
-                })
+        specs_files = await specs_index.specs()
         
         return {
             "specs": specs_files,
@@ -188,3 +183,84 @@ async def get_specs_list():
     except Exception as e:
         logger.error(f"Error getting specs list: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get specs list: {str(e)}")
+
+
+@router.get("/api/specs/{spec_name}/toc")
+async def get_spec_toc(request: Request, spec_name: str):
+    """Дерево заголовків специфікації з байтовими зсувами розділів"""
+    try:
+        spec = await load_spec(spec_name)
+        outline = await outline_cache.outline(spec.text)
+        
+        return conditional_response(request, f'"{outline.content_hash}"', {
+            "spec": spec.path.stem,
+            "title": spec_title(spec.path.stem),
+            "size": len(outline.data),
+            "sections": [node.to_dict() for node in outline.nodes],
+            "status": "success"
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting spec toc {spec_name}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get specification toc: {str(e)}")
+
+
+@router.get("/api/specs/{spec_name}/sections/{anchor}")
+async def get_spec_section(
+    request: Request,
+    spec_name: str,
+    anchor: str,
+    subsections: bool = True,
+    format: str = Query("json", pattern="^(json|markdown)$")
+):
+    """Один розділ специфікації за якорем заголовка"""
+    try:
+        spec = await load_spec(spec_name)
+        outline = await outline_cache.outline(spec.text)
+        text = outline.section(anchor, subsections=subsections)
+        if text is None:
+            raise HTTPException(status_code=404, detail="Section not found")
+        
+        # ETag розділу залежить тільки від його байтів: зміни в інших розділах його не інвалідують
+        node = outline.anchors[anchor]
+        etag = f'"{node.hash}-{format}{"" if subsections else "-own"}"'
+        if format == "markdown":
+            return conditional_response(request, etag, text, media_type="text/markdown; charset=utf-8")
+        return conditional_response(request, etag, {
+            "spec": spec.path.stem,
+            "anchor": node.anchor,
+            "title": node.title,
+            "level": node.level,
+            "start": node.start,
+            "end": node.end,
+            "markdown": text,
+            "subsections": [child.anchor for child in node.children],
+            "status": "success"
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting spec section {spec_name}#{anchor}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get specification section: {str(e)}")
+
+
+@router.get("/api/specs/search")
+async def search_specs(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=50),
+    lang: Optional[str] = Query(None, pattern="^(uk|en)$")
+):
+    """Повнотекстовий пошук по розділах специфікацій та технічних карт"""
+    try:
+        hits = await search_index.search(q, limit=limit, lang=lang)
+        
+        return {
+            "query": q,
+            "hits": hits,
+            "count": len(hits),
+            "status": "success"
+        }
+    except Exception as e:
+        logger.error(f"Error searching specs: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to search specs: {str(e)}")
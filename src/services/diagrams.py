@@ -0,0 +1,205 @@
+"""
+AI Cyber Tool - Diagram Manifest
+Маніфест діаграм архітектури в пам'яті з інкрементальним оновленням
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from loguru import logger
+
+
+DIAGRAM_FORMATS = ("png", "svg", "mmd")
+# Зменшені копії PNG від scripts/utils/render_mermaid.py: sizes/<name>-<width>w.png
+SIZES_DIR = "sizes"
+_SIZE_NAME = re.compile(r"^(?P<stem>.+)-(?P<width>\d+)w\.png$")
+
+
+@dataclass(frozen=True)
+class DiagramFile:
+    """Один файл діаграми та ознаки його версії"""
+    name: str
+    size: int
+    mtime_ns: int
+    hash: str
+    width: Optional[int] = None
+
+
+def png_width(path: Union[str, Path]) -> Optional[int]:
+    """Ширина PNG із заголовка IHDR (без декодування зображення)"""
+    with open(path, "rb") as f:
+        header = f.read(24)
+    if len(header) < 24 or header[:8] != b"\x89PNG\r\n\x1a\n" or header[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">I", header[16:20])[0]
+
+
+def file_hash(path: Union[str, Path]) -> str:
+    """Скорочений SHA-256 вмісту файлу"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def hashed_name(relative_path: str, digest: str) -> str:
+    """Ім'я файлу з хешем вмісту перед розширенням: flow.svg -> flow.<hash>.svg"""
+    stem, dot, suffix = relative_path.rpartition(".")
+    if not dot or "/" in suffix:
+        return f"{relative_path}.{digest}"
+    return f"{stem}.{digest}.{suffix}"
+
+
+def _scan(directory: Path, previous: Dict[str, DiagramFile]) -> Dict[str, DiagramFile]:
+    """Файли діаграм директорії та зменшені копії PNG; хеш рахується лише для нових та змінених (виконується в потоці)"""
+    files = {}
+    for folder, prefix in ((directory, ""), (directory / SIZES_DIR, f"{SIZES_DIR}/")):
+        if not folder.is_dir():
+            continue
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                suffix = entry.name.rsplit(".", 1)[-1]
+                if suffix not in DIAGRAM_FORMATS or not entry.is_file() or (prefix and suffix != "png"):
+                    continue
+                name = prefix + entry.name
+                stat = entry.stat()
+                known = previous.get(name)
+                if known is not None and (known.size, known.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                    files[name] = known
+                else:
+                    width = png_width(entry.path) if suffix == "png" else None
+                    files[name] = DiagramFile(name, stat.st_size, stat.st_mtime_ns, file_hash(entry.path), width)
+    return files
+
+
+class DiagramManifest:
+    """Маніфест діаграм для сторінки технічної карти та /tech-map/api
+
+    Маніфест будується при старті та оновлюється фоновою задачею: директорія
+    переглядається раз на refresh_interval секунд, хеші рахуються тільки для
+    змінених файлів. Запити обслуговуються з готових структур без звернень
+    до файлової системи.
+    """
+
+    def __init__(self, directory: Union[str, Path] = "architecture", url_prefix: str = "/architecture",
+                 refresh_interval: float = 2.0):
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix
+        self.refresh_interval = refresh_interval
+        self._files: Dict[str, DiagramFile] = {}
+        self._diagrams: List[Dict] = []
+        self._loaded = False
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Побудова маніфесту та запуск фонового оновлення"""
+        await self.refresh()
+        if not self.is_running:
+            self._task = asyncio.create_task(self._loop(), name="diagram-manifest")
+
+    async def stop(self):
+        """Зупинка фонового оновлення"""
+        if self.is_running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Diagram manifest refresh failed: {e}")
+
+    async def refresh(self) -> bool:
+        """Оновлення маніфесту; повертає True, якщо діаграми змінились"""
+        files = await asyncio.to_thread(_scan, self.directory, self._files)
+        changed = files != self._files or not self._loaded
+        if changed:
+            self._files = files
+            self._diagrams = self._build(files)
+            self.refreshes += 1
+            if self._loaded:
+                logger.info(f"Diagram manifest updated ({len(self._diagrams)} diagrams)")
+        self._loaded = True
+        return changed
+
+    def _url(self, file: DiagramFile) -> str:
+        # URL з хешем вмісту кешується браузером назавжди (immutable)
+        return f"{self.url_prefix}/{hashed_name(file.name, file.hash)}"
+
+    def _build(self, files: Dict[str, DiagramFile]) -> List[Dict]:
+        """Опис діаграм: кожна діаграма має PNG, SVG та джерело Mermaid - за наявності"""
+        stems = sorted({name.rsplit(".", 1)[0] for name in files if name.endswith(".png") and "/" not in name})
+        sizes: Dict[str, List[DiagramFile]] = {}
+        for name, file in files.items():
+            match = _SIZE_NAME.match(name[len(SIZES_DIR) + 1:]) if name.startswith(f"{SIZES_DIR}/") else None
+            if match and file.width:
+                sizes.setdefault(match.group("stem"), []).append(file)
+        diagrams = []
+        for stem in stems:
+            formats = {
+                fmt: {
+                    "path": f"{self.url_prefix}/{stem}.{fmt}",
+                    "url": self._url(files[f"{stem}.{fmt}"]),
+                    "size": files[f"{stem}.{fmt}"].size,
+                    "modified": files[f"{stem}.{fmt}"].mtime_ns / 1e9,
+                    "hash": files[f"{stem}.{fmt}"].hash
+                }
+                for fmt in DIAGRAM_FORMATS if f"{stem}.{fmt}" in files
+            }
+            png = files[f"{stem}.png"]
+            responsive = [
+                {"width": file.width, "path": f"{self.url_prefix}/{file.name}", "url": self._url(file), "size": file.size}
+                for file in sorted(sizes.get(stem, []), key=lambda f: f.width) if not png.width or file.width < png.width
+            ]
+            # srcset: зменшені копії та оригінал; мініатюра - найменша копія (або оригінал)
+            candidates = [(item["url"], item["width"]) for item in responsive]
+            if png.width:
+                candidates.append((formats["png"]["url"], png.width))
+            diagrams.append({
+                "name": stem,
+                "file": stem,
+                "png_path": formats["png"]["path"],
+                "svg_path": formats["svg"]["path"] if "svg" in formats else None,
+                "mmd_path": formats["mmd"]["path"] if "mmd" in formats else None,
+                "size": formats["png"]["size"],
+                "modified": formats["png"]["modified"],
+                "width": png.width,
+                "formats": formats,
+                "sizes": responsive,
+                "thumbnail": responsive[0]["url"] if responsive else formats["png"]["url"],
+                "srcset": ", ".join(f"{url} {width}w" for url, width in candidates) if responsive else None
+            })
+        return diagrams
+
+    async def diagrams(self) -> List[Dict]:
+        """Діаграми з маніфесту (при першому зверненні без start() маніфест будується)"""
+        if not self._loaded:
+            await self.refresh()
+        return self._diagrams
+
+    def get_stats(self) -> Dict:
+        """Стан маніфесту"""
+        return {
+            "running": self.is_running,
+            "diagrams": len(self._diagrams),
+            "files": len(self._files),
+            "refreshes": self.refreshes
+        }
@@ -0,0 +1,152 @@
+"""
+AI Cyber Tool - Document Cache
+Кеш markdown документів (технічна карта, специфікації) з перевіркою mtime/розміру
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+
+@dataclass(frozen=True)
+class Document:
+    """Прочитаний документ та ознаки його версії"""
+    path: Path
+    text: str
+    size: int
+    mtime_ns: int
+
+
+@dataclass
+class _Entry:
+    document: Document
+    checked_at: float
+
+
+def _stat(path: Path) -> Optional[os.stat_result]:
+    try:
+        return path.stat()
+    except FileNotFoundError:
+        return None
+
+
+def _read(path: Path) -> Optional[Document]:
+    """Читання документа разом з stat (виконується в потоці)"""
+    try:
+        stat = path.stat()
+        text = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+    return Document(path, text, stat.st_size, stat.st_mtime_ns)
+
+
+class DocumentCache:
+    """Кеш документів за шляхом
+
+    Протягом revalidate_interval секунд документ віддається з пам'яті без звернень
+    до файлової системи; після цього перевіряються mtime та розмір, і файл
+    перечитується тільки якщо він змінився. Читання виконується поза event loop.
+    """
+
+    def __init__(self, revalidate_interval: float = 1.0):
+        self.revalidate_interval = revalidate_interval
+        self._entries: Dict[Path, _Entry] = {}
+        self.hits = 0
+        self.reads = 0
+
+    async def get(self, path: Union[str, Path]) -> Optional[Document]:
+        """Документ або None, якщо файл не існує"""
+        path = Path(path)
+        now = time.monotonic()
+        entry = self._entries.get(path)
+        if entry is not None and now - entry.checked_at < self.revalidate_interval:
+            self.hits += 1
+            return entry.document
+
+        if entry is not None:
+            stat = await asyncio.to_thread(_stat, path)
+            if stat is not None and (stat.st_mtime_ns, stat.st_size) == (entry.document.mtime_ns, entry.document.size):
+                entry.checked_at = now
+                self.hits += 1
+                return entry.document
+
+        self.reads += 1
+        document = await asyncio.to_thread(_read, path)
+        if document is None:
+            # Відсутні файли не кешуються, щоб довільні шляхи із запитів не займали пам'ять
+            self._entries.pop(path, None)
+        else:
+            self._entries[path] = _Entry(document, now)
+        return document
+
+    def invalidate(self, path: Optional[Union[str, Path]] = None):
+        """Скидання одного документа або всього кешу"""
+        if path is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(Path(path), None)
+
+    def get_stats(self) -> Dict:
+        """Статистика кешу"""
+        return {"documents": len(self._entries), "hits": self.hits, "reads": self.reads}
+
+
+def spec_title(name: str) -> str:
+    """Заголовок специфікації з імені файлу"""
+    return name.replace("_", " ").title()
+
+
+def _scan_specs(specs_dir: Path) -> List[Dict]:
+    """Опис markdown файлів специфікацій (виконується в потоці)"""
+    if not specs_dir.exists():
+        return []
+    specs = []
+    for file_path in sorted(specs_dir.glob("*.md")):
+        stat = file_path.stat()
+        specs.append({
+            "name": file_path.stem,
+            "title": spec_title(file_path.stem),
+            "path": f"/specs/{file_path.name}",
+            "size": stat.st_size,
+            "modified": stat.st_mtime
+        })
+    return specs
+
+
+class SpecsIndex:
+    """Попередньо обчислений список специфікацій для навігації та /api/specs"""
+
+    def __init__(self, specs_dir: Union[str, Path] = "specs", revalidate_interval: float = 1.0):
+        self.specs_dir = Path(specs_dir)
+        self.revalidate_interval = revalidate_interval
+        self._specs: List[Dict] = []
+        self._navigation: List[Dict] = []
+        self._checked_at: Optional[float] = None
+
+    async def refresh(self):
+        """Пересканування директорії специфікацій"""
+        self._specs = await asyncio.to_thread(_scan_specs, self.specs_dir)
+        self._navigation = [
+            {"name": spec["name"], "title": spec["title"], "path": spec["path"]}
+            for spec in self._specs if spec["name"] != "README"
+        ]
+        self._checked_at = time.monotonic()
+
+    async def _ensure_fresh(self):
+        if self._checked_at is None or time.monotonic() - self._checked_at >= self.revalidate_interval:
+            await self.refresh()
+
+    async def specs(self) -> List[Dict]:
+        """Усі markdown файли специфікацій з розміром та часом зміни"""
+        await self._ensure_fresh()
+        return self._specs
+
+    async def navigation(self, active: Optional[str] = None) -> List[Dict]:
+        """Список специфікацій для навігації (без README), з позначкою активної"""
+        await self._ensure_fresh()
+        if active is None:
+            return self._navigation
+        return [{**spec, "active": spec["name"] == active} for spec in self._navigation]
@@ -0,0 +1,176 @@
+"""
+AI Cyber Tool - Analysis Log Ingestion
+Запис логів аналізу з Message Bus пакетними транзакціями, ack після коміту
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import List, Optional, Set
+
+from loguru import logger
+from pydantic import ValidationError
+
+from ..db.database import create_analysis_logs
+from ..models.session import AnalysisLogCreate
+from .message_bus import AnalysisLogMessage, MessageBusConsumer, MessageType
+
+
+class _WriteGuard:
+    """Стан запису пакету, спільний для потоку consumer-а та event loop
+
+    Запис або встигає почати коміт (тоді його результат очікується до кінця),
+    або скасовується до першого коміту - і тоді в базі даних немає жодного логу пакету.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.committing = False
+        self.abandoned = False
+
+    def before_commit(self) -> bool:
+        """Дозвіл на коміт (викликається в event loop перед кожним комітом)"""
+        with self._lock:
+            if not self.abandoned:
+                self.committing = True
+            return self.committing
+
+    def abandon(self) -> bool:
+        """Скасування запису; False, якщо частина пакету вже закомічена"""
+        with self._lock:
+            if not self.committing:
+                self.abandoned = True
+            return self.abandoned
+
+
+class AnalysisLogIngestion:
+    """Consumer черги логів аналізу
+
+    pika працює синхронно, тому споживання виконується в окремому потоці, а запис
+    у базу даних - в event loop додатку. Повідомлення підтверджуються тільки після
+    коміту транзакції; повідомлення з неіснуючою сесією або некоректними логами
+    відправляються в dead-letter.
+    """
+
+    def __init__(self, consumer: MessageBusConsumer, loop: asyncio.AbstractEventLoop,
+                 batch_size: int = 500, flush_interval: float = 0.2, write_timeout: float = 30.0):
+        self.consumer = consumer
+        self.loop = loop
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.write_timeout = write_timeout
+
+        self._known_sessions: Set[int] = set()
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.written = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Запуск споживання у фоновому потоці"""
+        if self.is_running:
+            return
+        self._thread = threading.Thread(target=self._run, name="analysis-log-ingestion", daemon=True)
+        self._thread.start()
+
+    async def stop(self, timeout: float = 5.0):
+        """Зупинка споживання (поточний пакет дописується та підтверджується)
+
+        Очікування потоку виконується поза event loop, бо останній пакет записується саме в ньому.
+        """
+        self.consumer.stop_consuming()
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join, timeout)
+            self._thread = None
+        logger.info(f"Analysis log ingestion stopped ({self.written} logs in {self.batches} batches)")
+
+    def _run(self):
+        try:
+            self.consumer.consume_batches(
+                self.consumer.config.analysis_logs_queue,
+                self.handle_batch,
+                message_type=MessageType.ANALYSIS_LOG,
+                batch_size=self.batch_size,
+                flush_interval=self.flush_interval
+            )
+        except Exception as e:
+            logger.error(f"Analysis log ingestion stopped with error: {e}")
+
+    def handle_batch(self, messages: List[AnalysisLogMessage]) -> List[bool]:
+        """Запис логів усіх повідомлень пакету; повертає ack/dead-letter для кожного"""
+        valid = [self._is_valid(message) for message in messages]
+        logs = [
+            (message.session_id, entry.log_type, entry.message)
+            for message, ok in zip(messages, valid) if ok
+            for entry in message.entries
+        ]
+
+        ids = []
+        if logs:
+            # Відомі сесії не перевіряються повторно; відсутні - перевіряються кожного разу,
+            # бо сесія може бути створена пізніше за перші логи
+            existing_sessions = dict.fromkeys(self._known_sessions, True)
+            guard = _WriteGuard()
+            # Весь пакет - одна транзакція: при будь-якій помилці нічого не закомічено,
+            # і повернення пакету в чергу не дублює логи
+            future = asyncio.run_coroutine_threadsafe(
+                create_analysis_logs(logs, chunk_size=len(logs), existing_sessions=existing_sessions,
+                                     before_commit=guard.before_commit),
+                self.loop
+            )
+            try:
+                ids = future.result(self.write_timeout)
+            except concurrent.futures.TimeoutError:
+                # Пакет повертається в чергу, тільки якщо запис гарантовано нічого не закомітить,
+                # інакше повторна доставка дублювала б логи
+                self.timeouts += 1
+                if guard.abandon():
+                    future.cancel()
+                    logger.warning(f"Analysis log batch not written in {self.write_timeout}s, returning it to queue")
+                    raise
+                logger.warning(f"Analysis log batch commit exceeded {self.write_timeout}s, waiting for it to finish")
+                ids = future.result()
+            self._known_sessions.update(session_id for session_id, found in existing_sessions.items() if found)
+
+        results = []
+        position = 0
+        for message, ok in zip(messages, valid):
+            if ok:
+                written = ids[position:position + len(message.entries)]
+                position += len(message.entries)
+                ok = all(log_id is not None for log_id in written)
+            if not ok:
+                self.rejected += 1
+                logger.warning(f"Dead-lettering analysis log message for session {message.session_id}")
+            results.append(ok)
+
+        self.batches += 1
+        self.written += sum(1 for log_id in ids if log_id is not None)
+        return results
+
+    @staticmethod
+    def _is_valid(message: AnalysisLogMessage) -> bool:
+        """Ті самі обмеження, що й для POST /api/analysis-logs"""
+        if not message.entries:
+            return False
+        try:
+            for entry in message.entries:
+                AnalysisLogCreate(session_id=message.session_id, log_type=entry.log_type, message=entry.message)
+        except ValidationError:
+            return False
+        return True
+
+    def get_stats(self):
+        """Статистика запису"""
+        return {
+            "running": self.is_running,
+            "batches": self.batches,
+            "written": self.written,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts
+        }
@@ -0,0 +1,289 @@
+"""
+AI Cyber Tool - Markdown Renderer
+Серверний рендеринг markdown у HTML з якорями заголовків, змістом та кешем за хешем вмісту
+"""
+
+import asyncio
+import hashlib
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from markdown_it import MarkdownIt
+from markdown_it.renderer import RendererHTML
+from markdown_it.token import Token
+
+
+_MARKUP = re.compile(r"[*_`]|!?\[([^\]]*)\]\([^)]*\)")
+_SLUG_STRIP = re.compile(r"[^\w\s-]", re.UNICODE)
+_UNSAFE_URL = re.compile(r"^\s*(javascript|vbscript|data):", re.IGNORECASE)
+_ABSOLUTE_URL = re.compile(r"^([a-z][a-z0-9+.-]*:|/|#)", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Heading:
+    """Заголовок документа для змісту"""
+    level: int
+    anchor: str
+    title: str
+
+
+@dataclass(frozen=True)
+class Section:
+    """Розділ документа: заголовок та markdown текст до наступного заголовка"""
+    level: int
+    anchor: str
+    title: str
+    body: str
+
+
+@dataclass(frozen=True)
+class RenderedMarkdown:
+    """Результат рендерингу: HTML, зміст та хеш вихідного тексту"""
+    html: str
+    toc: Tuple[Heading, ...]
+    content_hash: str
+
+
+def content_hash(text: str) -> str:
+    """Скорочений SHA-256 тексту документа"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def plain_text(markdown: str) -> str:
+    """Текст заголовка без inline розмітки"""
+    return _MARKUP.sub(lambda m: m.group(1) or "", markdown).strip()
+
+
+def slugify(title: str) -> str:
+    """Якір заголовка в стилі GitHub (літери будь-якої мови, цифри, дефіси)"""
+    slug = _SLUG_STRIP.sub("", plain_text(title).lower())
+    return re.sub(r"\s+", "-", slug.strip()) or "section"
+
+
+def unique_anchor(anchors: Dict[str, int], title: str) -> str:
+    """Якір заголовка; повторні заголовки отримують суфікс -1, -2, ..."""
+    slug = slugify(title)
+    count = anchors.get(slug, 0)
+    anchors[slug] = count + 1
+    return slug if count == 0 else f"{slug}-{count}"
+
+
+def _resolve_url(url: str, base_url: str) -> str:
+    """Відносні посилання розв'язуються від base_url"""
+    if base_url and not _ABSOLUTE_URL.match(url):
+        return base_url + url
+    return url
+
+
+def _render_link_open(self, tokens, idx, options, env):
+    token = tokens[idx]
+    token.attrSet("href", _resolve_url(token.attrGet("href"), env.get("base_url", "")))
+    return self.renderToken(tokens, idx, options, env)
+
+
+def _render_image(self, tokens, idx, options, env):
+    token = tokens[idx]
+    token.attrSet("src", _resolve_url(token.attrGet("src"), env.get("base_url", "")))
+    token.attrSet("loading", "lazy")
+    return RendererHTML.image(self, tokens, idx, options, env)
+
+
+def _render_heading_close(self, tokens, idx, options, env):
+    anchor = tokens[idx].meta.get("anchor")
+    if anchor is None:
+        return self.renderToken(tokens, idx, options, env)
+    return f'<a class="anchor" href="#{anchor}" aria-hidden="true">#</a></{tokens[idx].tag}>\n'
+
+
+def _create_parser() -> MarkdownIt:
+    """CommonMark з таблицями; сирий HTML екранується, небезпечні схеми посилань відкидаються"""
+    md = MarkdownIt("commonmark", {"html": False}).enable("table")
+    md.validateLink = lambda url: not _UNSAFE_URL.match(url)
+    md.add_render_rule("link_open", _render_link_open)
+    md.add_render_rule("image", _render_image)
+    md.add_render_rule("heading_close", _render_heading_close)
+    return md
+
+
+_markdown = _create_parser()
+
+
+def _headings(tokens: List[Token]) -> Iterator[Tuple[Token, Token, Token]]:
+    """Заголовки верхнього рівня документа (не в цитатах та списках): open, inline, close"""
+    for index, token in enumerate(tokens):
+        if token.type == "heading_open" and token.level == 0:
+            yield token, tokens[index + 1], tokens[index + 2]
+
+
+def render_markdown(text: str, base_url: str = "") -> RenderedMarkdown:
+    """HTML документа з якорями заголовків та змістом"""
+    env = {"base_url": base_url}
+    tokens = _markdown.parse(text, env)
+    anchors: Dict[str, int] = {}
+    toc: List[Heading] = []
+    for opening, inline, closing in _headings(tokens):
+        anchor = unique_anchor(anchors, inline.content)
+        opening.attrSet("id", anchor)
+        closing.meta["anchor"] = anchor
+        toc.append(Heading(int(opening.tag[1]), anchor, plain_text(inline.content)))
+    html = _markdown.renderer.render(tokens, _markdown.options, env)
+    return RenderedMarkdown(html, tuple(toc), content_hash(text))
+
+
+def _scan_headings(text: str) -> Iterator[Tuple[int, int, int, str]]:
+    """Заголовки, як їх бачить рендерер: (байтовий зсув першого рядка, зсув після заголовка, рівень, заголовок)"""
+    offsets = [0]
+    for line in text.split("\n"):
+        offsets.append(offsets[-1] + len(line.encode("utf-8")) + 1)
+    for opening, inline, _ in _headings(_markdown.parse(text)):
+        first, last = opening.map
+        yield offsets[first], offsets[last], int(opening.tag[1]), inline.content
+
+
+def split_sections(text: str) -> List[Section]:
+    """Розбиття документа на розділи за заголовками (якорі збігаються з HTML рендерингом)
+
+    Текст до першого заголовка стає розділом рівня 0 без якоря.
+    Заголовки всередині блоків коду ігноруються.
+    """
+    data = text.encode("utf-8")
+    headings = list(_scan_headings(text))
+    anchors: Dict[str, int] = {}
+    sections: List[Section] = []
+    preamble = data[:headings[0][0] if headings else len(data)].decode("utf-8").strip()
+    if preamble:
+        sections.append(Section(0, "", "", preamble))
+    for index, (_, body_start, level, title) in enumerate(headings):
+        body_end = headings[index + 1][0] if index + 1 < len(headings) else len(data)
+        body = data[body_start:body_end].decode("utf-8").strip()
+        sections.append(Section(level, unique_anchor(anchors, title), plain_text(title), body))
+    return sections
+
+
+@dataclass
+class OutlineNode:
+    """Вузол дерева заголовків; [start, end) - байтові межі розділу разом з підрозділами"""
+    level: int
+    anchor: str
+    title: str
+    start: int
+    body_start: int
+    end: int
+    hash: str
+    children: List["OutlineNode"] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return {
+            "level": self.level,
+            "anchor": self.anchor,
+            "title": self.title,
+            "start": self.start,
+            "end": self.end,
+            "hash": self.hash,
+            "children": [child.to_dict() for child in self.children]
+        }
+
+
+@dataclass(frozen=True)
+class Outline:
+    """Дерево заголовків документа з байтовими зсувами в UTF-8 тексті"""
+    data: bytes
+    content_hash: str
+    nodes: Tuple[OutlineNode, ...]
+    anchors: Dict[str, OutlineNode]
+
+    def section(self, anchor: str, subsections: bool = True) -> Optional[str]:
+        """Markdown розділу за якорем (з підрозділами або тільки до першого підзаголовка)"""
+        node = self.anchors.get(anchor)
+        if node is None:
+            return None
+        end = node.end if subsections or not node.children else node.children[0].start
+        return self.data[node.start:end].decode("utf-8")
+
+
+def parse_outline(text: str) -> Outline:
+    """Дерево заголовків документа; розділ триває до наступного заголовка того ж або вищого рівня"""
+    data = text.encode("utf-8")
+    headings = list(_scan_headings(text))
+    anchors: Dict[str, OutlineNode] = {}
+    used: Dict[str, int] = {}
+    roots: List[OutlineNode] = []
+    stack: List[OutlineNode] = []
+    for index, (start, body_start, level, title) in enumerate(headings):
+        end = next((h[0] for h in headings[index + 1:] if h[2] <= level), len(data))
+        node = OutlineNode(
+            level, unique_anchor(used, title), plain_text(title), start, min(body_start, len(data)), end,
+            hashlib.sha256(data[start:end]).hexdigest()[:16]
+        )
+        anchors[node.anchor] = node
+        while stack and stack[-1].level >= level:
+            stack.pop()
+        (stack[-1].children if stack else roots).append(node)
+        stack.append(node)
+    return Outline(data, content_hash(text), tuple(roots), anchors)
+
+
+class MarkdownCache:
+    """Кеш відрендерених документів за (хеш вмісту, base_url)
+
+    Змінений файл має новий хеш, тому застарілий HTML ніколи не віддається;
+    старі записи витісняються за LRU. Рендеринг виконується поза event loop.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, RenderedMarkdown]" = OrderedDict()
+        self.hits = 0
+        self.renders = 0
+
+    async def render(self, text: str, base_url: str = "") -> RenderedMarkdown:
+        """Відрендерений документ з кешу або новий рендеринг"""
+        key = (content_hash(text), base_url)
+        rendered = self._entries.get(key)
+        if rendered is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return rendered
+
+        self.renders += 1
+        rendered = await asyncio.to_thread(render_markdown, text, base_url)
+        self._entries[key] = rendered
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return rendered
+
+    def get_stats(self) -> Dict:
+        """Статистика кешу"""
+        return {"entries": len(self._entries), "hits": self.hits, "renders": self.renders}
+
+
+class OutlineCache:
+    """Кеш дерев заголовків за хешем вмісту документа (LRU)"""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Outline]" = OrderedDict()
+        self.hits = 0
+        self.parses = 0
+
+    async def outline(self, text: str) -> Outline:
+        """Дерево заголовків з кешу або новий розбір поза event loop"""
+        key = content_hash(text)
+        outline = self._entries.get(key)
+        if outline is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return outline
+
+        self.parses += 1
+        outline = await asyncio.to_thread(parse_outline, text)
+        self._entries[key] = outline
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return outline
+
+    def get_stats(self) -> Dict:
+        """Статистика кешу"""
+        return {"entries": len(self._entries), "hits": self.hits, "parses": self.parses}
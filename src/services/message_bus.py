@@ -7,13 +7,22 @@ Message Bus Service - RabbitMQ Integration
 import json
 import asyncio
 import logging
+import os
+import random
+import threading
+import time
+from collections import Counter, deque
 from datetime import datetime
-from typing import Dict, Any, Optional, Callable
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable, Deque, List, Sequence, Tuple, Union
 from dataclasses import dataclass, asdict
 from enum import Enum
 
 import pika
+import pika.exceptions
 from pika.exchange_type import ExchangeType
+from pydantic import TypeAdapter
 from loguru import logger
 
 
@@ -21,6 +30,7 @@ class MessageType(Enum):
     """Типи повідомлень"""
     COMMAND = "command"
     EVENT = "event"
+    ANALYSIS_LOG = "analysis_log"
 
 
 class MessageStatus(Enum):
@@ -118,12 +128,69 @@ class EventMessage:
         self.routing_key = f"{self.tool_name}.{self.status.value}"
 
 
+@dataclass
+class AnalysisLogEntry:
+    """Один рядок логу аналізу"""
+    log_type: str
+    message: str
+
+
+@dataclass
+class AnalysisLogMessage:
+    """Пакет логів аналізу сесії для запису без HTTP API"""
+    session_id: int
+    entries: List[AnalysisLogEntry]
+
+
+# Версія схеми повідомлень, що публікуються цим модулем
+SCHEMA_VERSION = 1
+
+# Схеми повідомлень за типом та версією
+MESSAGE_SCHEMAS = {
+    (MessageType.COMMAND, 1): CommandMessage,
+    (MessageType.EVENT, 1): EventMessage,
+    (MessageType.ANALYSIS_LOG, 1): AnalysisLogMessage,
+}
+
+
+def _json_default(value: Any) -> Any:
+    """Серіалізація значень, які json не підтримує"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_message(message: Union[CommandMessage, EventMessage, AnalysisLogMessage]) -> str:
+    """Серіалізація повідомлення в JSON"""
+    return json.dumps(asdict(message), default=_json_default)
+
+
+@lru_cache(maxsize=None)
+def get_message_validator(message_type: MessageType, schema_version: int = SCHEMA_VERSION) -> TypeAdapter:
+    """Скомпільований валідатор для типу повідомлення та версії схеми"""
+    schema = MESSAGE_SCHEMAS.get((message_type, schema_version))
+    if schema is None:
+        raise ValueError(f"Unsupported message schema: {message_type.value} v{schema_version}")
+    return TypeAdapter(schema)
+
+
+def decode_message(body: Union[str, bytes], message_type: MessageType,
+                   schema_version: int = SCHEMA_VERSION) -> Union[CommandMessage, EventMessage, AnalysisLogMessage]:
+    """Розбір та валідація повідомлення за один прохід"""
+    return get_message_validator(message_type, schema_version).validate_json(body)
+
+
 class MessageBusConfig:
     """Конфігурація Message Bus"""
     
     def __init__(self, rabbitmq_url: str = "amqp://localhost:5672/", 
                  commands_exchange: str = "commands.exchange",
-                 events_exchange: str = "events.exchange"):
+                 events_exchange: str = "events.exchange",
+                 heartbeat: int = 60,
+                 publish_buffer_size: int = 10000,
+                 publish_spill_dir: Optional[str] = None):
         self.rabbitmq_url = rabbitmq_url
         self.commands_exchange = commands_exchange
         self.events_exchange = events_exchange
@@ -133,12 +200,292 @@ class MessageBusConfig:
         self.ai_agent_commands_queue = "ai_agent.commands.queue"
         self.integrations_commands_queue = "integrations.commands.queue"
         self.ai_agent_events_queue = "ai_agent.events.queue"
+        self.analysis_logs_queue = "analysis_logs.ingest.queue"
         self.dead_letter_queue = "dead-letter.queue"
         
+        # Routing key логів аналізу в events exchange
+        self.analysis_logs_routing_key = "analysis_logs.ingest"
+        
         # Message settings
         self.message_ttl = 300000  # 5 minutes
         self.max_queue_length = 1000
         self.max_retry_attempts = 3
+        
+        # Connection supervision
+        self.heartbeat = heartbeat  # seconds
+        self.blocked_connection_timeout = 30  # seconds
+        self.reconnect_initial_delay = 0.5  # seconds
+        self.reconnect_max_delay = 30.0  # seconds
+        self.supervisor_interval = 1.0  # seconds
+        
+        # Publish buffer (used while the broker is unavailable)
+        self.publish_buffer_size = publish_buffer_size
+        self.publish_spill_dir = publish_spill_dir
+
+
+@dataclass
+class PendingPublish:
+    """Повідомлення, що очікує відправки в брокер"""
+    exchange: str
+    routing_key: str
+    body: str
+    properties: Dict[str, Any]
+
+
+def _try_lock(path: Path):
+    """Неблокуюче ексклюзивне блокування файлу; повертає відкритий файл або None, якщо він зайнятий
+
+    Блокування знімається ОС при завершенні процесу, тому вільний lock-файл означає,
+    що процес-власник більше не працює.
+    """
+    handle = open(path, "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def _unlock(handle):
+    if os.name == "nt":
+        import msvcrt
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    handle.close()
+
+
+class PublishBuffer:
+    """Обмежений FIFO буфер публікацій з опціональним скиданням на диск
+
+    Кожен процес пише у власний spill-файл і тримає блокування його lock-файлу.
+    При старті файли процесів, що завершились аварійно (lock вільний), переносяться
+    в початок власного файлу, тому повідомлення, скинуті до падіння, не губляться.
+    """
+    
+    def __init__(self, max_size: int = 10000, spill_dir: Optional[str] = None):
+        self.max_size = max_size
+        self.spill_path = None
+        self._lock = None
+        self._memory: Deque[PendingPublish] = deque()
+        self._spilled = 0
+        self.dropped = 0
+        self.recovered = 0
+        if spill_dir:
+            self.spill_path = Path(spill_dir) / f"publish-buffer-{os.getpid()}.jsonl"
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            self._lock = _try_lock(self.spill_path.with_suffix(".lock"))
+            self._recover_orphans()
+    
+    def _recover_orphans(self):
+        """Перенесення spill-файлів завершених процесів у власний файл (найстаріші першими)"""
+        orphans = []
+        for path in self.spill_path.parent.glob("publish-buffer-*.jsonl"):
+            if path == self.spill_path:
+                continue
+            lock = _try_lock(path.with_suffix(".lock"))
+            if lock is None:
+                # Процес-власник ще працює
+                continue
+            orphans.append((path, lock))
+        
+        lines = []
+        for path, lock in sorted(orphans, key=lambda item: item[0].stat().st_mtime if item[0].exists() else 0):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    lines.extend(line for line in f if line.strip())
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            _unlock(lock)
+            path.with_suffix(".lock").unlink(missing_ok=True)
+        
+        if self.spill_path.exists():
+            with open(self.spill_path, "r", encoding="utf-8") as f:
+                own = [line for line in f if line.strip()]
+        else:
+            own = []
+        if lines:
+            with open(self.spill_path, "w", encoding="utf-8") as f:
+                f.writelines(lines + own)
+            self.recovered = len(lines)
+            logger.warning(f"Recovered {len(lines)} spilled message(s) from stopped processes")
+        self._spilled = len(lines) + len(own)
+    
+    def close(self):
+        """Збереження невідправлених повідомлень на диск та зняття блокування spill-файлу
+
+        Повідомлення залишаються в spill-файлі, і їх підхопить наступний запущений процес.
+        """
+        if self.spill_path and self._memory:
+            pending = [json.dumps(asdict(item)) + "\n" for item in self._memory]
+            if self.spill_path.exists():
+                with open(self.spill_path, "r", encoding="utf-8") as f:
+                    pending.extend(line for line in f if line.strip())
+            with open(self.spill_path, "w", encoding="utf-8") as f:
+                f.writelines(pending)
+            self._spilled = len(pending)
+            self._memory.clear()
+        if self._lock is not None:
+            _unlock(self._lock)
+            self._lock = None
+            if not self._spilled:
+                self.spill_path.with_suffix(".lock").unlink(missing_ok=True)
+    
+    def __len__(self) -> int:
+        return len(self._memory) + self._spilled
+    
+    @property
+    def spilled(self) -> int:
+        return self._spilled
+    
+    def append(self, item: PendingPublish):
+        """Додати повідомлення в кінець буфера"""
+        # Якщо на диску вже є повідомлення, нові теж йдуть на диск, щоб зберегти порядок
+        if self._spilled or len(self._memory) >= self.max_size:
+            if self.spill_path:
+                self._spill(item)
+                return
+            self._memory.popleft()
+            self.dropped += 1
+            logger.warning(f"Publish buffer is full, dropped oldest message (total dropped: {self.dropped})")
+        self._memory.append(item)
+    
+    def peek(self) -> Optional[PendingPublish]:
+        """Найстаріше повідомлення без видалення"""
+        if not self._memory and self._spilled:
+            self._load_spilled()
+        return self._memory[0] if self._memory else None
+    
+    def pop(self) -> PendingPublish:
+        """Видалити найстаріше повідомлення"""
+        return self._memory.popleft()
+    
+    def _spill(self, item: PendingPublish):
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(asdict(item)) + "\n")
+        self._spilled += 1
+    
+    def _load_spilled(self):
+        """Перенести наступну порцію повідомлень з диска в пам'ять"""
+        with open(self.spill_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        head, rest = lines[:self.max_size], lines[self.max_size:]
+        for line in head:
+            self._memory.append(PendingPublish(**json.loads(line)))
+        if rest:
+            with open(self.spill_path, "w", encoding="utf-8") as f:
+                f.writelines(rest)
+        else:
+            self.spill_path.unlink()
+        self._spilled = len(rest)
+
+
+class ConnectionSupervisor:
+    """Нагляд за з'єднанням з RabbitMQ: heartbeat, перепідключення з jitter backoff та повторне оголошення топології"""
+    
+    def __init__(self, config: MessageBusConfig, declare_topology: Callable[[Any], None], name: str = "MessageBus"):
+        self.config = config
+        self.declare_topology = declare_topology
+        self.name = name
+        self.connection = None
+        self.channel = None
+        self.lock = threading.RLock()
+        self.failed_attempts = 0
+        self.reconnects = 0
+        self._next_attempt_at = 0.0
+    
+    @property
+    def is_connected(self) -> bool:
+        return self.channel is not None
+    
+    def _connection_parameters(self) -> pika.URLParameters:
+        parameters = pika.URLParameters(self.config.rabbitmq_url)
+        parameters.heartbeat = self.config.heartbeat
+        parameters.blocked_connection_timeout = self.config.blocked_connection_timeout
+        return parameters
+    
+    def connect(self) -> bool:
+        """Встановити з'єднання та оголосити топологію"""
+        # З'єднання встановлюється поза lock, щоб не блокувати публікації в буфер
+        connection = None
+        try:
+            connection = pika.BlockingConnection(self._connection_parameters())
+            channel = connection.channel()
+            self.declare_topology(channel)
+        except Exception as e:
+            logger.error(f"{self.name} failed to connect to RabbitMQ: {e}")
+            if connection is not None:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+            self.mark_disconnected()
+            return False
+        
+        with self.lock:
+            self.connection, self.channel = connection, channel
+            if self.failed_attempts:
+                self.reconnects += 1
+                logger.info(f"{self.name} reconnected after {self.failed_attempts} failed attempt(s)")
+            self.failed_attempts = 0
+            return True
+    
+    def try_reconnect(self) -> bool:
+        """Спроба перепідключення, якщо минув час backoff"""
+        if self.is_connected:
+            return True
+        if self.seconds_until_retry() > 0:
+            return False
+        return self.connect()
+    
+    def seconds_until_retry(self) -> float:
+        return max(0.0, self._next_attempt_at - time.monotonic())
+    
+    def backoff_delay(self, attempt: int) -> float:
+        """Експоненційна затримка з jitter (від половини до повного значення)"""
+        delay = min(self.config.reconnect_max_delay, self.config.reconnect_initial_delay * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+    
+    def mark_disconnected(self, error: Optional[Exception] = None):
+        """Позначити з'єднання втраченим і запланувати перепідключення"""
+        with self.lock:
+            if error is not None:
+                logger.warning(f"{self.name} lost connection to RabbitMQ: {error}")
+            connection, self.connection, self.channel = self.connection, None, None
+            if connection is not None:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+            self._next_attempt_at = time.monotonic() + self.backoff_delay(self.failed_attempts)
+            self.failed_attempts += 1
+    
+    def process_heartbeats(self):
+        """Обслуговування heartbeat-ів; виявляє розірване з'єднання"""
+        with self.lock:
+            if not self.is_connected:
+                return
+            try:
+                self.connection.process_data_events(time_limit=0)
+            except pika.exceptions.AMQPError as e:
+                self.mark_disconnected(e)
+    
+    def close(self):
+        """Закриття з'єднання без перепідключення"""
+        with self.lock:
+            connection, self.connection, self.channel = self.connection, None, None
+            if connection is not None and connection.is_open:
+                connection.close()
 
 
 class MessageBusPublisher:
@@ -146,41 +493,50 @@ class MessageBusPublisher:
     
     def __init__(self, config: MessageBusConfig):
         self.config = config
-        self.connection = None
-        self.channel = None
+        self.supervisor = ConnectionSupervisor(config, self._setup_exchanges, name="MessageBus Publisher")
+        self.buffer = PublishBuffer(config.publish_buffer_size, config.publish_spill_dir)
+        self._stop_event = threading.Event()
         self._setup_connection()
+        
+        # Фоновий потік обслуговує heartbeat-и, перепідключення та відправку буфера
+        self._supervisor_thread = threading.Thread(
+            target=self._supervise, name="message-bus-publisher-supervisor", daemon=True
+        )
+        self._supervisor_thread.start()
+    
+    @property
+    def connection(self):
+        return self.supervisor.connection
+    
+    @property
+    def channel(self):
+        return self.supervisor.channel
     
     def _setup_connection(self):
-        """Налаштування з'єднання з RabbitMQ"""
-        try:
-            self.connection = pika.BlockingConnection(
-                pika.URLParameters(self.config.rabbitmq_url)
-            )
-            self.channel = self.connection.channel()
-            self._setup_exchanges()
+        """Налаштування з'єднання з RabbitMQ (без винятку при недоступному брокері)"""
+        if self.supervisor.connect():
             logger.info("MessageBus Publisher connected successfully")
-        except Exception as e:
-            logger.error(f"Failed to connect to RabbitMQ: {e}")
-            raise
+        else:
+            logger.warning("MessageBus Publisher started without broker, messages will be buffered")
     
-    def _setup_exchanges(self):
+    def _setup_exchanges(self, channel):
         """Налаштування exchanges"""
         # Commands exchange
-        self.channel.exchange_declare(
+        channel.exchange_declare(
             exchange=self.config.commands_exchange,
             exchange_type=ExchangeType.topic,
             durable=True
         )
         
         # Events exchange
-        self.channel.exchange_declare(
+        channel.exchange_declare(
             exchange=self.config.events_exchange,
             exchange_type=ExchangeType.topic,
             durable=True
         )
         
         # Dead letter exchange
-        self.channel.exchange_declare(
+        channel.exchange_declare(
             exchange=self.config.dead_letter_exchange,
             exchange_type=ExchangeType.direct,
             durable=True
@@ -191,20 +547,25 @@ class MessageBusPublisher:
         try:
             routing_key = f"{command.tool_name}.{command.message_id}"
             
-            self.channel.basic_publish(
+            sent = self._publish(PendingPublish(
                 exchange=self.config.commands_exchange,
                 routing_key=routing_key,
-                body=json.dumps(asdict(command), default=str),
-                properties=pika.BasicProperties(
-                    delivery_mode=2,  # Make message persistent
-                    correlation_id=command.correlation_id,
-                    reply_to=command.reply_to,
-                    priority=command.priority,
-                    timestamp=int(command.timestamp.timestamp())
-                )
-            )
+                body=encode_message(command),
+                properties={
+                    "delivery_mode": 2,  # Make message persistent
+                    "type": MessageType.COMMAND.value,
+                    "headers": {"schema_version": SCHEMA_VERSION},
+                    "correlation_id": command.correlation_id,
+                    "reply_to": command.reply_to,
+                    "priority": command.priority,
+                    "timestamp": int(command.timestamp.timestamp())
+                }
+            ))
             
-            logger.info(f"Command published: {command.tool_name} - {command.message_id}")
+            if sent:
+                logger.info(f"Command published: {command.tool_name} - {command.message_id}")
+            else:
+                logger.info(f"Command buffered: {command.tool_name} - {command.message_id}")
             
         except Exception as e:
             logger.error(f"Failed to publish command: {e}")
@@ -215,28 +576,125 @@ class MessageBusPublisher:
         try:
             routing_key = f"{event.tool_name}.{event.status.value}"
             
-            self.channel.basic_publish(
+            sent = self._publish(PendingPublish(
                 exchange=self.config.events_exchange,
                 routing_key=routing_key,
-                body=json.dumps(asdict(event), default=str),
-                properties=pika.BasicProperties(
-                    delivery_mode=2,
-                    correlation_id=event.correlation_id,
-                    timestamp=int(event.timestamp.timestamp())
-                )
-            )
+                body=encode_message(event),
+                properties={
+                    "delivery_mode": 2,
+                    "type": MessageType.EVENT.value,
+                    "headers": {"schema_version": SCHEMA_VERSION},
+                    "correlation_id": event.correlation_id,
+                    "timestamp": int(event.timestamp.timestamp())
+                }
+            ))
             
-            logger.info(f"Event published: {event.tool_name} - {event.status.value}")
+            if sent:
+                logger.info(f"Event published: {event.tool_name} - {event.status.value}")
+            else:
+                logger.info(f"Event buffered: {event.tool_name} - {event.status.value}")
             
         except Exception as e:
             logger.error(f"Failed to publish event: {e}")
             raise
     
+    def publish_analysis_logs(self, session_id: int, entries: Sequence[Tuple[str, str]]):
+        """Публікація пакету логів аналізу (log_type, message) для запису consumer-ом"""
+        try:
+            message = AnalysisLogMessage(
+                session_id=session_id,
+                entries=[AnalysisLogEntry(log_type, text) for log_type, text in entries]
+            )
+            self._publish(PendingPublish(
+                exchange=self.config.events_exchange,
+                routing_key=self.config.analysis_logs_routing_key,
+                body=encode_message(message),
+                properties={
+                    "delivery_mode": 2,
+                    "type": MessageType.ANALYSIS_LOG.value,
+                    "headers": {"schema_version": SCHEMA_VERSION}
+                }
+            ))
+        except Exception as e:
+            logger.error(f"Failed to publish analysis logs: {e}")
+            raise
+    
+    def _publish(self, pending: PendingPublish) -> bool:
+        """Відправити повідомлення або поставити його в буфер; True якщо відправлено одразу"""
+        with self.supervisor.lock:
+            # Поки буфер не порожній, нові повідомлення стають у чергу за ним
+            if len(self.buffer) or not self.supervisor.is_connected:
+                self.buffer.append(pending)
+                return False
+            try:
+                self._basic_publish(pending)
+                return True
+            except pika.exceptions.AMQPError as e:
+                self.supervisor.mark_disconnected(e)
+                self.buffer.append(pending)
+                return False
+    
+    def _basic_publish(self, pending: PendingPublish):
+        self.channel.basic_publish(
+            exchange=pending.exchange,
+            routing_key=pending.routing_key,
+            body=pending.body,
+            properties=pika.BasicProperties(**pending.properties)
+        )
+    
+    def flush_buffer(self) -> int:
+        """Відправити буферизовані повідомлення по порядку; повертає кількість відправлених"""
+        sent = 0
+        with self.supervisor.lock:
+            while self.supervisor.is_connected:
+                pending = self.buffer.peek()
+                if pending is None:
+                    break
+                try:
+                    self._basic_publish(pending)
+                except pika.exceptions.AMQPError as e:
+                    self.supervisor.mark_disconnected(e)
+                    break
+                self.buffer.pop()
+                sent += 1
+        if sent:
+            logger.info(f"Flushed {sent} buffered message(s), {len(self.buffer)} remaining")
+        return sent
+    
+    def _supervise(self):
+        """Цикл нагляду за з'єднанням"""
+        while not self._stop_event.wait(self.config.supervisor_interval):
+            try:
+                if self.supervisor.is_connected:
+                    self.supervisor.process_heartbeats()
+                else:
+                    self.supervisor.try_reconnect()
+                if self.supervisor.is_connected and len(self.buffer):
+                    self.flush_buffer()
+            except Exception as e:
+                logger.error(f"MessageBus Publisher supervisor error: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика з'єднання та буфера"""
+        return {
+            "connected": self.supervisor.is_connected,
+            "reconnects": self.supervisor.reconnects,
+            "failed_attempts": self.supervisor.failed_attempts,
+            "buffered": len(self.buffer),
+            "spilled": self.buffer.spilled,
+            "recovered": self.buffer.recovered,
+            "dropped": self.buffer.dropped
+        }
+    
     def close(self):
         """Закриття з'єднання"""
-        if self.connection and not self.connection.is_closed:
-            self.connection.close()
-            logger.info("MessageBus Publisher connection closed")
+        self._stop_event.set()
+        self.flush_buffer()
+        if len(self.buffer):
+            logger.warning(f"MessageBus Publisher closed with {len(self.buffer)} unsent message(s)")
+        self.buffer.close()
+        self.supervisor.close()
+        logger.info("MessageBus Publisher connection closed")
 
 
 class MessageBusConsumer:
@@ -244,28 +702,34 @@ class MessageBusConsumer:
     
     def __init__(self, config: MessageBusConfig):
         self.config = config
-        self.connection = None
-        self.channel = None
+        self.supervisor = ConnectionSupervisor(config, self._setup_queues, name="MessageBus Consumer")
         self.callbacks = {}
+        self.message_types: Dict[str, MessageType] = {}
+        self.decoded = Counter()
+        self.rejected = Counter()
+        self._consuming = False
+        self._batch_consuming = False
         self._setup_connection()
     
+    @property
+    def connection(self):
+        return self.supervisor.connection
+    
+    @property
+    def channel(self):
+        return self.supervisor.channel
+    
     def _setup_connection(self):
-        """Налаштування з'єднання з RabbitMQ"""
-        try:
-            self.connection = pika.BlockingConnection(
-                pika.URLParameters(self.config.rabbitmq_url)
-            )
-            self.channel = self.connection.channel()
-            self._setup_queues()
+        """Налаштування з'єднання з RabbitMQ (перепідключення виконує start_consuming)"""
+        if self.supervisor.connect():
             logger.info("MessageBus Consumer connected successfully")
-        except Exception as e:
-            logger.error(f"Failed to connect to RabbitMQ: {e}")
-            raise
+        else:
+            logger.warning("MessageBus Consumer started without broker, will reconnect on consume")
     
-    def _setup_queues(self):
+    def _setup_queues(self, channel):
         """Налаштування черг"""
         # AI Agent commands queue
-        self.channel.queue_declare(
+        channel.queue_declare(
             queue=self.config.ai_agent_commands_queue,
             durable=True,
             arguments={
@@ -276,7 +740,7 @@ class MessageBusConsumer:
         )
         
         # Integrations commands queue
-        self.channel.queue_declare(
+        channel.queue_declare(
             queue=self.config.integrations_commands_queue,
             durable=True,
             arguments={
@@ -287,7 +751,7 @@ class MessageBusConsumer:
         )
         
         # AI Agent events queue
-        self.channel.queue_declare(
+        channel.queue_declare(
             queue=self.config.ai_agent_events_queue,
             durable=True,
             arguments={
@@ -296,55 +760,99 @@ class MessageBusConsumer:
             }
         )
         
+        # Analysis logs ingestion queue (без x-max-length, щоб пікові потоки логів не відкидались)
+        channel.queue_declare(
+            queue=self.config.analysis_logs_queue,
+            durable=True,
+            arguments={
+                "x-dead-letter-exchange": self.config.dead_letter_exchange
+            }
+        )
+        
         # Dead letter queue
-        self.channel.queue_declare(
+        channel.queue_declare(
             queue=self.config.dead_letter_queue,
             durable=True
         )
         
         # Bind queues to exchanges
-        self._bind_queues()
+        self._bind_queues(channel)
     
-    def _bind_queues(self):
+    def _bind_queues(self, channel):
         """Прив'язка черг до exchanges"""
         # Bind AI Agent commands queue
-        self.channel.queue_bind(
+        channel.queue_bind(
             exchange=self.config.commands_exchange,
             queue=self.config.ai_agent_commands_queue,
             routing_key="ai_agent.*"
         )
         
         # Bind Integrations commands queue
-        self.channel.queue_bind(
+        channel.queue_bind(
             exchange=self.config.commands_exchange,
             queue=self.config.integrations_commands_queue,
             routing_key="integrations.*"
         )
         
         # Bind AI Agent events queue
-        self.channel.queue_bind(
+        channel.queue_bind(
             exchange=self.config.events_exchange,
             queue=self.config.ai_agent_events_queue,
             routing_key="*.completed"
         )
-        self.channel.queue_bind(
+        channel.queue_bind(
             exchange=self.config.events_exchange,
             queue=self.config.ai_agent_events_queue,
             routing_key="*.failed"
         )
         
+        # Bind analysis logs ingestion queue
+        channel.queue_bind(
+            exchange=self.config.events_exchange,
+            queue=self.config.analysis_logs_queue,
+            routing_key=self.config.analysis_logs_routing_key
+        )
+        
         # Bind dead letter queue
-        self.channel.queue_bind(
+        channel.queue_bind(
             exchange=self.config.dead_letter_exchange,
             queue=self.config.dead_letter_queue,
             routing_key=""
         )
     
-    def register_callback(self, queue_name: str, callback: Callable):
-        """Реєстрація callback функції для черги"""
+    def register_callback(self, queue_name: str, callback: Callable,
+                          message_type: Optional[MessageType] = None):
+        """Реєстрація callback функції для черги
+        
+        Якщо вказано message_type, callback отримує провалідований CommandMessage/EventMessage
+        замість сирого dict, а некоректні повідомлення відхиляються до виклику callback.
+        """
         self.callbacks[queue_name] = callback
+        if message_type is not None:
+            self.message_types[queue_name] = message_type
+            # Компілюємо валідатор заздалегідь, а не на першому повідомленні
+            get_message_validator(message_type)
         logger.info(f"Callback registered for queue: {queue_name}")
     
+    def decode(self, queue_name: str, properties, body: bytes) -> Any:
+        """Декодування тіла повідомлення для callback черги"""
+        message_type = self.message_types.get(queue_name)
+        if message_type is None:
+            return json.loads(body)
+        
+        headers = getattr(properties, "headers", None) or {}
+        schema_version = headers.get("schema_version", SCHEMA_VERSION)
+        message = decode_message(body, message_type, schema_version)
+        self.decoded[message_type.value] += 1
+        return message
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика декодування повідомлень"""
+        return {
+            "decoded": dict(self.decoded),
+            "rejected": dict(self.rejected)
+        }
+    
     def start_consuming(self, queue_name: str):
         """Початок споживання повідомлень з черги"""
         if queue_name not in self.callbacks:
@@ -354,31 +862,138 @@ class MessageBusConsumer:
         
         def message_handler(ch, method, properties, body):
             try:
-                message_data = json.loads(body)
+                message_data = self.decode(queue_name, properties, body)
+            except ValueError as e:
+                # Некоректні повідомлення йдуть в dead-letter без виклику callback
+                message_type = self.message_types.get(queue_name)
+                self.rejected[message_type.value if message_type else "raw"] += 1
+                logger.warning(f"Rejected malformed message from {queue_name}: {e}")
+                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                return
+            
+            try:
                 callback(message_data)
                 ch.basic_ack(delivery_tag=method.delivery_tag)
             except Exception as e:
                 logger.error(f"Error processing message: {e}")
                 ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
         
-        self.channel.basic_consume(
-            queue=queue_name,
-            on_message_callback=message_handler,
-            auto_ack=False
-        )
+        self._consuming = True
+        try:
+            while self._consuming:
+                if not self.supervisor.try_reconnect():
+                    time.sleep(self.supervisor.seconds_until_retry())
+                    continue
+                try:
+                    self.channel.basic_consume(
+                        queue=queue_name,
+                        on_message_callback=message_handler,
+                        auto_ack=False
+                    )
+                    
+                    logger.info(f"Started consuming from queue: {queue_name}")
+                    self.channel.start_consuming()
+                    break
+                except pika.exceptions.AMQPConnectionError as e:
+                    # Топологія буде оголошена повторно під час перепідключення
+                    self.supervisor.mark_disconnected(e)
+        except KeyboardInterrupt:
+            if self.channel:
+                self.channel.stop_consuming()
+        finally:
+            self._consuming = False
+    
+    def consume_batches(self, queue_name: str, handle_batch: Callable[[List[Any]], Sequence[bool]],
+                        message_type: Optional[MessageType] = None, batch_size: int = 500,
+                        flush_interval: float = 0.2):
+        """Споживання повідомлень пакетами з підтвердженням після обробки
         
-        logger.info(f"Started consuming from queue: {queue_name}")
+        handle_batch отримує декодовані повідомлення пакету і повертає для кожного True
+        (ack) або False (dead-letter). Якщо handle_batch кидає виняток, весь пакет
+        повертається в чергу. Пакет закривається за розміром або через flush_interval;
+        stop_consuming() з іншого потоку завершує цикл протягом flush_interval.
+        """
+        if message_type is not None:
+            self.message_types[queue_name] = message_type
+            get_message_validator(message_type)
         
+        self._consuming = True
+        self._batch_consuming = True
         try:
-            self.channel.start_consuming()
-        except KeyboardInterrupt:
+            while self._consuming:
+                if not self.supervisor.try_reconnect():
+                    time.sleep(self.supervisor.seconds_until_retry())
+                    continue
+                try:
+                    channel = self.channel
+                    # Брокер не видає більше повідомлень, ніж вміщує один пакет
+                    channel.basic_qos(prefetch_count=batch_size)
+                    logger.info(f"Started batch consuming from queue: {queue_name} (batch {batch_size})")
+                    
+                    batch: List[Tuple[int, Any]] = []
+                    deadline = 0.0
+                    for method, properties, body in channel.consume(queue_name, inactivity_timeout=flush_interval):
+                        if method is not None:
+                            try:
+                                batch.append((method.delivery_tag, self.decode(queue_name, properties, body)))
+                            except ValueError as e:
+                                self.rejected[message_type.value if message_type else "raw"] += 1
+                                logger.warning(f"Rejected malformed message from {queue_name}: {e}")
+                                channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                            if len(batch) == 1:
+                                deadline = time.monotonic() + flush_interval
+                        if batch and (len(batch) >= batch_size or time.monotonic() >= deadline
+                                      or not self._consuming):
+                            self._settle_batch(channel, batch, handle_batch)
+                            batch = []
+                        if not self._consuming:
+                            break
+                    if batch:
+                        self._settle_batch(channel, batch, handle_batch)
+                    
+                    # Неопрацьовані повідомлення з буфера consumer-а повертаються в чергу
+                    channel.cancel()
+                    break
+                except pika.exceptions.AMQPConnectionError as e:
+                    # Непідтверджені повідомлення брокер доставить повторно
+                    self.supervisor.mark_disconnected(e)
+        finally:
+            self._consuming = False
+            self._batch_consuming = False
+    
+    def _settle_batch(self, channel, batch: List[Tuple[int, Any]],
+                      handle_batch: Callable[[List[Any]], Sequence[bool]]):
+        """Обробка пакету та ack/nack його повідомлень"""
+        try:
+            results = list(handle_batch([message for _, message in batch]))
+        except Exception as e:
+            logger.error(f"Failed to process batch of {len(batch)} message(s), requeueing: {e}")
+            channel.basic_nack(delivery_tag=batch[-1][0], multiple=True, requeue=True)
+            # Пауза, щоб не отримувати той самий пакет у циклі, поки сховище недоступне
+            time.sleep(self.config.reconnect_initial_delay)
+            return
+        
+        if all(results):
+            channel.basic_ack(delivery_tag=batch[-1][0], multiple=True)
+            return
+        for (delivery_tag, _), ok in zip(batch, results):
+            if ok:
+                channel.basic_ack(delivery_tag=delivery_tag)
+            else:
+                channel.basic_nack(delivery_tag=delivery_tag, requeue=False)
+    
+    def stop_consuming(self):
+        """Зупинка споживання без перепідключення"""
+        self._consuming = False
+        # Пакетний цикл сам перевіряє прапорець, тому канал з іншого потоку не чіпаємо
+        if self.channel and not self._batch_consuming:
             self.channel.stop_consuming()
     
     def close(self):
         """Закриття з'єднання"""
-        if self.connection and not self.connection.is_closed:
-            self.connection.close()
-            logger.info("MessageBus Consumer connection closed")
+        self._consuming = False
+        self.supervisor.close()
+        logger.info("MessageBus Consumer connection closed")
 
 
 class MessageBus:
@@ -414,11 +1029,7 @@ class MessageBus:
         try:
             publisher = self.get_publisher()
             # Спроба перевірити, чи активне з'єднання
-            if publisher.connection and not publisher.connection.is_closed:
-                # Перевіряємо канал
-                if publisher.channel and not publisher.channel.is_closed:
-                    return True
-            return False
+            return publisher.supervisor.is_connected
         except Exception as e:
             logger.warning(f"MessageBus ping failed: {e}")
             return False
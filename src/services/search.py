@@ -0,0 +1,279 @@
+"""
+AI Cyber Tool - Docs Search
+Повнотекстовий пошук по специфікаціях та технічних картах (інвертований індекс в пам'яті)
+"""
+
+import asyncio
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .documents import Document, DocumentCache, spec_title
+from .markdown_renderer import plain_text, split_sections
+
+
+_TOKEN = re.compile(r"[^\W_]+(?:['’ʼ][^\W_]+)*", re.UNICODE)
+_CYRILLIC = re.compile(r"[а-яіїєґ]")
+_CODE_FENCE = re.compile(r"^\s*(`{3,}|~{3,}).*$", re.MULTILINE)
+_LIST_MARKER = re.compile(r"^\s*(?:[-*+>]|\d{1,9}[.)])\s+", re.MULTILINE)
+
+# Закінчення від найдовшого до найкоротшого; основа має лишатися не коротшою за 3 символи
+_UK_ENDINGS = (
+    "ання", "ення", "ість", "ень", "ами", "ями", "ого", "ому", "ими", "іми", "ій", "ий", "ої", "ою", "ею",
+    "ів", "ах", "ях", "ом", "ем", "ам", "ям", "их", "ні", "а", "я", "о", "е", "і", "и", "у", "ю", "ь", "й"
+)
+_EN_ENDINGS = ("ations", "ation", "ings", "ing", "ies", "ed", "es", "ly", "s", "e")
+
+# Важливість збігу в заголовку розділу порівняно з текстом
+TITLE_WEIGHT = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNIPPET_CHARS = 160
+
+
+def stem(token: str) -> str:
+    """Спрощений стемінг для українських та англійських слів"""
+    endings = _UK_ENDINGS if _CYRILLIC.search(token) else _EN_ENDINGS
+    for ending in endings:
+        if token.endswith(ending) and len(token) - len(ending) >= 3:
+            return token[:-len(ending)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Нормалізовані терміни тексту (нижній регістр, єдиний апостроф, стемінг)"""
+    return [
+        stem(token.replace("’", "'").replace("ʼ", "'"))
+        for token in _TOKEN.findall(text.lower())
+    ]
+
+
+def section_text(body: str) -> str:
+    """Текст розділу без markdown розмітки (для сніпетів)"""
+    text = _LIST_MARKER.sub("", _CODE_FENCE.sub("", body))
+    return " ".join(plain_text(line) for line in text.split("\n") if line.strip())
+
+
+def snippet(text: str, terms: List[str], length: int = SNIPPET_CHARS) -> str:
+    """Фрагмент тексту навколо першого збігу з терміном (або префіксом) запиту"""
+    start = 0
+    for match in _TOKEN.finditer(text.lower()):
+        if any(stem(match.group(0)).startswith(term) for term in terms):
+            start = max(0, match.start() - length // 3)
+            break
+    if start > 0:
+        # Фрагмент починається з початку слова
+        space = text.find(" ", start)
+        start = space + 1 if 0 <= space < match.start() else start
+    fragment = text[start:start + length].strip()
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + length < len(text) else ""
+    return f"{prefix}{fragment}{suffix}"
+
+
+@dataclass(frozen=True)
+class SearchSource:
+    """Документ, що індексується"""
+    key: str
+    path: Path
+    title: str
+    url: str
+    lang: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class IndexedSection:
+    """Розділ документа в індексі"""
+    source: SearchSource
+    anchor: str
+    title: str
+    text: str
+    length: int
+
+
+def discover_sources(specs_dir: Path, architecture_dir: Path) -> List[SearchSource]:
+    """Специфікації та технічні карти для індексування (виконується в потоці)"""
+    sources = []
+    if specs_dir.exists():
+        for path in sorted(specs_dir.glob("*.md")):
+            sources.append(SearchSource(f"specs/{path.stem}", path, spec_title(path.stem), f"/specs/{path.stem}"))
+    for lang in ("uk", "en"):
+        path = architecture_dir / lang / "technical_map.md"
+        if path.exists():
+            sources.append(SearchSource(f"tech-map/{lang}", path, "Technical Map", f"/tech-map?lang={lang}", lang))
+    return sources
+
+
+class SearchIndex:
+    """Інвертований індекс розділів документів
+
+    Індекс будується при старті та оновлюється фоновою задачею: документи беруться
+    з DocumentCache, і переіндексуються тільки ті файли, версія яких (mtime/розмір)
+    змінилась. Пошук ранжує розділи за BM25 з підсиленням збігів у заголовках.
+    """
+
+    def __init__(self, documents: DocumentCache, specs_dir: str = "specs", architecture_dir: str = "architecture",
+                 refresh_interval: float = 2.0):
+        self.documents = documents
+        self.specs_dir = Path(specs_dir)
+        self.architecture_dir = Path(architecture_dir)
+        self.refresh_interval = refresh_interval
+        self._sections: Dict[int, IndexedSection] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._by_source: Dict[str, Tuple[Tuple[int, int], List[int]]] = {}
+        self._next_id = 0
+        self._total_length = 0
+        self._loaded = False
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Побудова індексу та запуск фонового оновлення"""
+        await self.refresh()
+        if not self.is_running:
+            self._task = asyncio.create_task(self._loop(), name="docs-search-index")
+
+    async def stop(self):
+        """Зупинка фонового оновлення"""
+        if self.is_running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Docs search index refresh failed: {e}")
+
+    async def refresh(self) -> int:
+        """Переіндексування нових та змінених документів; повертає кількість оновлених"""
+        sources = await asyncio.to_thread(discover_sources, self.specs_dir, self.architecture_dir)
+        updated = 0
+        for key in set(self._by_source) - {source.key for source in sources}:
+            self._remove(key)
+            updated += 1
+        for source in sources:
+            document = await self.documents.get(source.path)
+            if document is None:
+                if source.key in self._by_source:
+                    self._remove(source.key)
+                    updated += 1
+                continue
+            known = self._by_source.get(source.key)
+            if known is None or known[0] != (document.size, document.mtime_ns):
+                self._remove(source.key)
+                self._add(source, document)
+                updated += 1
+        if updated:
+            self.refreshes += 1
+            if self._loaded:
+                logger.info(f"Docs search index updated ({updated} documents, {len(self._sections)} sections)")
+        self._loaded = True
+        return updated
+
+    def _add(self, source: SearchSource, document: Document):
+        ids = []
+        for section in split_sections(document.text):
+            text = section_text(section.body)
+            terms = Counter(tokenize(text))
+            for term in tokenize(section.title):
+                terms[term] += TITLE_WEIGHT
+            if not terms:
+                continue
+            section_id = self._next_id
+            self._next_id += 1
+            length = sum(terms.values())
+            self._sections[section_id] = IndexedSection(
+                source, section.anchor, section.title or source.title, text, length
+            )
+            self._total_length += length
+            for term, count in terms.items():
+                self._postings.setdefault(term, {})[section_id] = count
+            ids.append(section_id)
+        self._by_source[source.key] = ((document.size, document.mtime_ns), ids)
+
+    def _remove(self, key: str):
+        _, ids = self._by_source.pop(key, (None, []))
+        for section_id in ids:
+            section = self._sections.pop(section_id)
+            self._total_length -= section.length
+            for term in set(tokenize(section.text)) | set(tokenize(section.title)):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(section_id, None)
+                    if not postings:
+                        del self._postings[term]
+
+    def _expand(self, term: str, is_prefix: bool) -> List[str]:
+        """Терміни індексу для терміна запиту; останнє слово запиту шукається і як префікс"""
+        if not is_prefix or len(term) < 3:
+            return [term] if term in self._postings else []
+        return [known for known in self._postings if known.startswith(term)]
+
+    async def search(self, query: str, limit: int = 10, lang: Optional[str] = None) -> List[Dict]:
+        """Розділи, що найкраще відповідають запиту, зі сніпетами"""
+        if not self._loaded:
+            await self.refresh()
+        terms = tokenize(query)
+        if not terms or not self._sections:
+            return []
+
+        count = len(self._sections)
+        average_length = self._total_length / count
+        scores: Dict[int, float] = {}
+        matched: Dict[int, set] = {}
+        for position, term in enumerate(dict.fromkeys(terms)):
+            for known in self._expand(term, position == len(set(terms)) - 1 and not query[-1:].isspace()):
+                postings = self._postings[known]
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for section_id, frequency in postings.items():
+                    section = self._sections[section_id]
+                    if lang is not None and section.source.lang not in (None, lang):
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * section.length / average_length)
+                    scores[section_id] = scores.get(section_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                    matched.setdefault(section_id, set()).add(term)
+
+        # Розділи зі збігом усіх слів запиту вище за часткові збіги
+        unique_terms = len(set(terms))
+        ranked = sorted(scores, key=lambda i: (len(matched[i]) == unique_terms, scores[i]), reverse=True)
+        hits = []
+        for section_id in ranked[:limit]:
+            section = self._sections[section_id]
+            source = section.source
+            hits.append({
+                "document": source.key,
+                "document_title": source.title,
+                "section": section.title,
+                "anchor": section.anchor,
+                "url": f"{source.url}#{section.anchor}" if section.anchor else source.url,
+                "lang": source.lang,
+                "score": round(scores[section_id], 4),
+                "snippet": snippet(section.text, list(matched[section_id]))
+            })
+        return hits
+
+    def get_stats(self) -> Dict:
+        """Стан індексу"""
+        return {
+            "running": self.is_running,
+            "documents": len(self._by_source),
+            "sections": len(self._sections),
+            "terms": len(self._postings),
+            "refreshes": self.refreshes
+        }
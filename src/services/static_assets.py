@@ -0,0 +1,234 @@
+"""
+AI Cyber Tool - Static Assets
+Статичні файли з content-hash URL, сильними ETag, 304 відповідями та попередньо стисненими варіантами
+"""
+
+import asyncio
+import gzip
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from loguru import logger
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from .diagrams import file_hash, hashed_name
+
+try:
+    import brotli
+except ImportError:  # brotli є в requirements.txt; без нього віддаються тільки gzip варіанти
+    brotli = None
+
+
+# Текстові формати, для яких створюються стиснені варіанти
+COMPRESSIBLE_SUFFIXES = {".svg", ".css", ".js", ".md", ".mmd", ".html", ".json", ".txt"}
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+_HASHED_NAME = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{16})(?P<suffix>\.[^./]+)$")
+
+_ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+@dataclass(frozen=True)
+class Asset:
+    """Статичний файл, його версія та стиснені варіанти"""
+    relative_path: str
+    path: Path
+    size: int
+    mtime_ns: int
+    hash: str
+    media_type: str
+    variants: Dict[str, Path] = field(default_factory=dict)
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        return f'"{self.hash}-{encoding}"' if encoding else f'"{self.hash}"'
+
+
+def _compress_variant(source: Path, target: Path, encoding: str) -> bool:
+    """Створення стисненого варіанту; False, якщо стиснення не зменшує файл"""
+    data = source.read_bytes()
+    if encoding == "br":
+        compressed = brotli.compress(data, quality=11)
+    else:
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) >= len(data) * 0.9:
+        return False
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temp = target.with_name(target.name + ".tmp")
+    temp.write_bytes(compressed)
+    os.replace(temp, target)
+    return True
+
+
+def _build_asset(directory: Path, relative_path: str, cache_dir: Optional[Path],
+                 stat: os.stat_result) -> Asset:
+    """Хеш та стиснені варіанти файлу (виконується в потоці)"""
+    path = directory / relative_path
+    digest = file_hash(path)
+    media_type = mimetypes.guess_type(relative_path)[0] or "application/octet-stream"
+
+    variants = {}
+    if cache_dir is not None and path.suffix.lower() in COMPRESSIBLE_SUFFIXES:
+        encodings = ["gzip"] + (["br"] if brotli is not None else [])
+        for encoding in encodings:
+            # Хеш в імені варіанту: змінений файл отримує новий варіант, старі не використовуються
+            target = cache_dir / f"{hashed_name(relative_path, digest)}{_ENCODING_SUFFIXES[encoding]}"
+            if target.exists() or _compress_variant(path, target, encoding):
+                variants[encoding] = target
+    return Asset(relative_path, path, stat.st_size, stat.st_mtime_ns, digest, media_type, variants)
+
+
+def _stat_file(path: Path) -> Optional[os.stat_result]:
+    try:
+        stat = path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return stat if path.is_file() else None
+
+
+def accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Кодування з заголовка Accept-Encoding та їх q-значення"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+class AssetStore:
+    """Маніфест статичних файлів директорії
+
+    Будується при старті (хеші та стиснені варіанти); при запиті файл перевіряється
+    за mtime/розміром і перебудовується, тільки якщо змінився.
+    """
+
+    def __init__(self, directory: Union[str, Path], url_prefix: str, cache_dir: Optional[Union[str, Path]] = None):
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._assets: Dict[str, Asset] = {}
+
+    async def build(self):
+        """Хешування всіх файлів та створення стиснених варіантів"""
+        if not self.directory.exists():
+            return
+        paths = await asyncio.to_thread(
+            lambda: [p.relative_to(self.directory).as_posix() for p in self.directory.rglob("*") if p.is_file()]
+        )
+        for relative_path in paths:
+            await self.get(relative_path)
+        variants = sum(len(asset.variants) for asset in self._assets.values())
+        logger.info(f"Static assets for {self.url_prefix} ready ({len(self._assets)} files, {variants} compressed variants)")
+
+    async def get(self, relative_path: str) -> Optional[Asset]:
+        """Актуальний опис файлу (або None, якщо файлу немає)"""
+        path = self.directory / relative_path
+        stat = await asyncio.to_thread(_stat_file, path)
+        if stat is None:
+            self._assets.pop(relative_path, None)
+            return None
+        asset = self._assets.get(relative_path)
+        if asset is None or (asset.size, asset.mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            asset = await asyncio.to_thread(_build_asset, self.directory, relative_path, self.cache_dir, stat)
+            self._assets[relative_path] = asset
+        return asset
+
+    async def resolve(self, request_path: str) -> Tuple[Optional[Asset], bool]:
+        """Файл для шляху запиту; True, якщо URL містить актуальний хеш вмісту"""
+        asset = await self.get(request_path)
+        if asset is not None:
+            return asset, False
+        match = _HASHED_NAME.match(request_path)
+        if match is None:
+            return None, False
+        asset = await self.get(f"{match.group('stem')}{match.group('suffix')}")
+        if asset is None:
+            return None, False
+        # Застарілий хеш: віддається поточна версія, але без immutable кешування
+        return asset, asset.hash == match.group("hash")
+
+    def url(self, relative_path: str) -> str:
+        """URL з хешем вмісту для відомого файлу (або звичайний URL)"""
+        asset = self._assets.get(relative_path)
+        if asset is None:
+            return f"{self.url_prefix}/{relative_path}"
+        return f"{self.url_prefix}/{hashed_name(relative_path, asset.hash)}"
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles з content-hash URL, сильними ETag, 304 та gzip/brotli варіантами"""
+
+    def __init__(self, store: AssetStore, **kwargs):
+        super().__init__(directory=store.directory, **kwargs)
+        self.store = store
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+
+        relative_path = path.replace(os.sep, "/").lstrip("/")
+        if ".." in relative_path.split("/"):
+            raise HTTPException(status_code=404)
+        asset, immutable = await self.store.resolve(relative_path)
+        if asset is None:
+            return await super().get_response(path, scope)
+
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        encoding = next(
+            (name for name in ("br", "gzip") if name in asset.variants and accepted.get(name, 0) > 0),
+            None
+        )
+
+        headers = {
+            "etag": asset.etag(encoding),
+            "cache-control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+            "last-modified": formatdate(asset.mtime_ns / 1e9, usegmt=True)
+        }
+        if asset.variants:
+            headers["vary"] = "Accept-Encoding"
+
+        if self._not_modified(asset, request_headers):
+            return Response(status_code=304, headers=headers)
+
+        if encoding is not None:
+            headers["content-encoding"] = encoding
+            return FileResponse(asset.variants[encoding], headers=headers, media_type=asset.media_type)
+        return FileResponse(asset.path, headers=headers, media_type=asset.media_type)
+
+    @staticmethod
+    def _not_modified(asset: Asset, request_headers: Headers) -> bool:
+        """Сильне порівняння ETag (будь-яке кодування поточної версії) або If-Modified-Since"""
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or any(
+                tag == asset.etag() or tag in (asset.etag(encoding) for encoding in _ENCODING_SUFFIXES)
+                for tag in tags
+            )
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= asset.mtime_ns // 10**9
+            except (TypeError, ValueError):
+                return False
+        return False
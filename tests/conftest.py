@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Shared test fixtures
+
+Тести сховища виконуються для SQLite та PostgreSQL. PostgreSQL береться з
+TEST_POSTGRES_URL (таблиці в ній видаляються перед кожним тестом) або
+запускається тимчасовий сервер через initdb/pg_ctl (з PATH, PG_BIN або
+/usr/lib/postgresql/*/bin); без asyncpg чи сервера PostgreSQL тести пропускаються.
+"""
+
+import asyncio
+import glob
+import os
+import shutil
+import socket
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+# Додаємо кореневу директорію проекту до Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.db.postgres_repository import asyncpg
+
+
+BACKENDS = ["sqlite", "postgresql"]
+
+# Схема PostgreSQL, що видаляється перед кожним тестом
+_RESET_POSTGRES = """
+    DROP TABLE IF EXISTS analysis_log_rollups, analysis_logs, sessions,
+        cache_generations, schema_migrations CASCADE;
+    DROP FUNCTION IF EXISTS bump_sessions_generation() CASCADE;
+"""
+
+
+def _postgres_binary(name: str) -> Optional[str]:
+    """Шлях до утиліти PostgreSQL (initdb, pg_ctl)"""
+    if os.environ.get("PG_BIN"):
+        path = Path(os.environ["PG_BIN"]) / name
+        return str(path) if path.exists() else None
+    found = shutil.which(name)
+    if found:
+        return found
+    candidates = sorted(glob.glob(f"/usr/lib/postgresql/*/bin/{name}"))
+    return candidates[-1] if candidates else None
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def postgres_url(tmp_path_factory):
+    """URL тестової бази PostgreSQL (зовнішньої або тимчасового сервера на час сесії тестів)"""
+    if asyncpg is None:
+        pytest.skip("PostgreSQL tests require asyncpg")
+    if os.environ.get("TEST_POSTGRES_URL"):
+        yield os.environ["TEST_POSTGRES_URL"]
+        return
+
+    initdb, pg_ctl = _postgres_binary("initdb"), _postgres_binary("pg_ctl")
+    if not initdb or not pg_ctl:
+        pytest.skip("PostgreSQL tests require TEST_POSTGRES_URL or initdb/pg_ctl")
+    data_dir = tmp_path_factory.mktemp("postgres")
+    port = _free_port()
+    try:
+        subprocess.run([initdb, "-D", str(data_dir), "-U", "postgres", "-A", "trust", "-E", "UTF8", "--no-sync"],
+                       check=True, capture_output=True)
+        subprocess.run([
+            pg_ctl, "-D", str(data_dir), "-l", str(data_dir / "server.log"), "-w", "start",
+            "-o", f"-p {port} -c listen_addresses=127.0.0.1 -c unix_socket_directories='' -c fsync=off"
+        ], check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        # Наприклад, initdb не запускається від root
+        stderr = getattr(e, "stderr", b"") or b""
+        pytest.skip(f"Cannot start temporary PostgreSQL: {stderr.decode(errors='replace').strip() or e}")
+    try:
+        yield f"postgresql://postgres@127.0.0.1:{port}/postgres"
+    finally:
+        subprocess.run([pg_ctl, "-D", str(data_dir), "-m", "immediate", "-w", "stop"], capture_output=True)
+
+
+async def _reset_postgres(url: str):
+    conn = await asyncpg.connect(url)
+    try:
+        await conn.execute(_RESET_POSTGRES)
+    finally:
+        await conn.close()
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "sqlite_only: тест механізмів SQLite, без варіанту для PostgreSQL")
+
+
+@pytest.fixture(params=BACKENDS)
+def database_url(request, tmp_path):
+    """URL порожньої бази даних кожного типу"""
+    if request.param == "sqlite":
+        return str(tmp_path / "test_app.db")
+    if request.node.get_closest_marker("sqlite_only"):
+        pytest.skip("SQLite-specific test")
+    url = request.getfixturevalue("postgres_url")
+    asyncio.run(_reset_postgres(url))
+    return url
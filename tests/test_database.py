@@ -0,0 +1,630 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for Database Layer
+"""
+
+import asyncio
+import concurrent.futures
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import Mock
+
+import aiosqlite
+import pytest
+import pytest_asyncio
+
+# Додаємо кореневу директорію проекту до Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.db import database
+from src.db.backup import DatabaseBackup
+from src.db.database import create_repository
+from src.db.compression import MessageCodec, connect, decompress_database, train_dictionary
+from src.db.log_writer import AnalysisLogWriter
+from src.db.migrations import MIGRATIONS, get_schema_version, run_migrations
+from src.db.partitions import LogArchive, LogRetention, add_months, hot_partitions, hot_table, month_bounds
+from src.db.pool import DatabasePool
+from src.services.log_ingestion import AnalysisLogIngestion, _WriteGuard
+from src.services.message_bus import AnalysisLogEntry, AnalysisLogMessage
+
+
+# Тести механізмів SQLite (пул, міграції, партиції, стиснення, резервні копії)
+sqlite_only = pytest.mark.sqlite_only
+
+
+@pytest_asyncio.fixture
+async def db(database_url, monkeypatch):
+    """Ізольована база даних для тесту (SQLite та PostgreSQL)"""
+    monkeypatch.setattr(database.settings, "database_url", database_url)
+    await database.close_database()
+    await database.init_database()
+    yield database
+    await database.close_database()
+
+
+@sqlite_only
+class TestDatabasePool:
+    """Тести для пулу з'єднань"""
+
+    @pytest.mark.asyncio
+    async def test_pragmas(self, tmp_path):
+        """Тест налаштування WAL та pragma"""
+        pool = DatabasePool(str(tmp_path / "pool.db"), readers=2, cache_size_kib=8192, busy_timeout_ms=1234)
+        await pool.open()
+        try:
+            async with pool.writer() as conn:
+                assert (await (await conn.execute("PRAGMA journal_mode")).fetchone())[0] == "wal"
+                assert (await (await conn.execute("PRAGMA synchronous")).fetchone())[0] == 1
+                assert (await (await conn.execute("PRAGMA cache_size")).fetchone())[0] == -8192
+                assert (await (await conn.execute("PRAGMA busy_timeout")).fetchone())[0] == 1234
+            async with pool.reader() as conn:
+                assert (await (await conn.execute("PRAGMA query_only")).fetchone())[0] == 1
+        finally:
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_reads_do_not_wait_for_writes(self, db):
+        """Тест читання під час незавершеної транзакції запису"""
+        await db.create_session("before")
+        pool = await db.get_pool()
+
+        async with pool.writer() as conn:
+            await conn.execute("INSERT INTO sessions (session_name) VALUES ('uncommitted')")
+            sessions = await asyncio.wait_for(db.get_sessions(), timeout=1)
+            await conn.commit()
+
+        assert [s["session_name"] for s in sessions] == ["before"]
+
+    @pytest.mark.asyncio
+    async def test_writer_rolls_back_on_error(self, db):
+        """Тест відкату транзакції при помилці"""
+        pool = await db.get_pool()
+
+        with pytest.raises(RuntimeError):
+            async with pool.writer() as conn:
+                await conn.execute("INSERT INTO sessions (session_name) VALUES ('broken')")
+                raise RuntimeError("boom")
+
+        assert await db.get_sessions() == []
+
+
+async def query_plan(conn, sql, params=()):
+    """Деталі EXPLAIN QUERY PLAN одним рядком"""
+    cursor = await conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+    return " | ".join(row[3] for row in await cursor.fetchall())
+
+
+@sqlite_only
+class TestMigrations:
+    """Тести для міграцій схеми"""
+
+    @pytest.mark.asyncio
+    async def test_migrations_applied_once(self, tmp_path):
+        """Тест одноразового застосування міграцій кількома воркерами"""
+        path = str(tmp_path / "migrate.db")
+        connections = [await aiosqlite.connect(path) for _ in range(4)]
+        try:
+            for conn in connections:
+                await conn.execute("PRAGMA busy_timeout = 5000")
+            applied = await asyncio.gather(*(run_migrations(conn, path) for conn in connections))
+
+            assert sorted(applied) == [0, 0, 0, len(MIGRATIONS)]
+            assert await get_schema_version(connections[0]) == MIGRATIONS[-1].version
+        finally:
+            for conn in connections:
+                await conn.close()
+
+    @pytest.mark.asyncio
+    async def test_existing_logs_moved_to_monthly_partitions(self, tmp_path):
+        """Тест розподілу логів єдиної таблиці по місячних партиціях"""
+        path = str(tmp_path / "upgrade.db")
+        conn = await aiosqlite.connect(path)
+        try:
+            await run_migrations(conn, path, MIGRATIONS[:7])
+            await conn.execute("INSERT INTO sessions (session_name) VALUES ('scan')")
+            await conn.executemany(
+                "INSERT INTO analysis_logs (session_id, log_type, message, timestamp) VALUES (1, 'info', ?, ?)",
+                [("nginx open", "2025-01-05T10:00:00"), ("ssh open", "2025-02-05T10:00:00")]
+            )
+            await conn.commit()
+
+            assert await run_migrations(conn, path) == len(MIGRATIONS) - 7
+            assert await hot_partitions(conn) == ["2025-01", "2025-02"]
+            cursor = await conn.execute("SELECT id, message FROM analysis_logs ORDER BY id")
+            assert await cursor.fetchall() == [(1, "nginx open"), (2, "ssh open")]
+            cursor = await conn.execute(
+                "SELECT rowid FROM analysis_logs_2025_01_fts WHERE analysis_logs_2025_01_fts MATCH 'nginx'"
+            )
+            assert await cursor.fetchall() == [(1,)]
+            cursor = await conn.execute("SELECT last_id FROM analysis_log_sequence")
+            assert (await cursor.fetchone())[0] == 2
+            # Rollup лічильники не подвоюються при копіюванні в партиції
+            cursor = await conn.execute("SELECT SUM(count) FROM analysis_log_rollups WHERE granularity = 'day'")
+            assert (await cursor.fetchone())[0] == 2
+        finally:
+            await conn.close()
+
+    @pytest.mark.asyncio
+    async def test_hot_queries_use_indexes(self, db):
+        """Тест використання індексів гарячими запитами"""
+        session = await db.create_session("scan")
+        await db.create_analysis_log(session[0], "info", "open")
+        table = hot_table(datetime.utcnow().isoformat()[:7])
+        pool = await db.get_pool()
+        async with pool.reader() as conn:
+            sessions_plan = await query_plan(
+                conn, "SELECT id, session_name, created_at, status FROM sessions ORDER BY created_at DESC LIMIT 50"
+            )
+            logs_plan = await query_plan(
+                conn, "SELECT * FROM analysis_logs WHERE session_id = ? ORDER BY timestamp", (1,)
+            )
+            range_plan = await query_plan(
+                conn, "SELECT COUNT(*) FROM analysis_logs WHERE timestamp >= ?", ("2025-01-01",)
+            )
+
+        assert "idx_sessions_created_at" in sessions_plan
+        assert "TEMP B-TREE" not in sessions_plan
+        assert f"idx_{table}_session_timestamp" in logs_plan
+        assert "TEMP B-TREE" not in logs_plan
+        assert f"idx_{table}_timestamp" in range_plan
+
+    @pytest.mark.asyncio
+    async def test_keyset_pages_use_indexes(self, db):
+        """Тест використання індексів фільтрованими keyset запитами"""
+        repository = await db.get_repository()
+        session = await db.create_session("scan")
+        for timestamp in ("2025-01-05T10:00:00", "2025-02-05T10:00:00"):
+            await repository.insert_analysis_logs([(session[0], "error", "timeout")], timestamp)
+        pool = await db.get_pool()
+        async with pool.reader() as conn:
+            sessions_plan = await query_plan(conn, """
+                SELECT id, session_name, created_at, status FROM sessions
+                WHERE status = ? AND (created_at, id) < (?, ?)
+                ORDER BY created_at DESC, id DESC LIMIT 50
+            """, ("active", "2025-01-01", 10))
+            logs_plan = await query_plan(conn, """
+                SELECT id, session_id, log_type, message, timestamp FROM analysis_logs
+                WHERE session_id = ? AND log_type = ? AND (timestamp, id) > (?, ?)
+                ORDER BY timestamp, id LIMIT 100
+            """, (1, "error", "2025-01-01", 10))
+
+        assert "idx_sessions_status_created_at" in sessions_plan
+        assert "idx_analysis_logs_2025_01_session_type_timestamp" in logs_plan
+        assert "idx_analysis_logs_2025_02_session_type_timestamp" in logs_plan
+        assert "TEMP B-TREE" not in sessions_plan + logs_plan
+
+
+class TestSessions:
+    """Тести для сесій та логів аналізу"""
+
+    @pytest.mark.asyncio
+    async def test_create_and_list_sessions(self, db):
+        """Тест створення та отримання сесій"""
+        session = await db.create_session("scan")
+        sessions = await db.get_sessions()
+
+        assert session[1] == "scan"
+        assert sessions[0]["id"] == session[0]
+
+    @pytest.mark.asyncio
+    async def test_analysis_log_requires_session(self, db):
+        """Тест створення логу для неіснуючої сесії"""
+        with pytest.raises(ValueError):
+            await db.create_analysis_log(999, "info", "message")
+
+        session = await db.create_session("scan")
+        assert await db.create_analysis_log(session[0], "info", "message") > 0
+
+    @pytest.mark.asyncio
+    async def test_create_analysis_logs_batch(self, db):
+        """Тест пакетного створення логів"""
+        first = await db.create_session("first")
+        second = await db.create_session("second")
+        logs = [
+            (first[0], "info", "one"),
+            (999, "info", "missing session"),
+            (second[0], "error", "two"),
+            (first[0], "info", "three"),
+        ]
+
+        ids = await db.create_analysis_logs(logs, chunk_size=2)
+
+        assert ids[1] is None
+        assert len(set(ids) - {None}) == 3
+        rows = {
+            log["id"]: log["message"]
+            for session in (first, second) for log in await db.get_session_logs(session[0])
+        }
+        assert [rows[ids[i]] for i in (0, 2, 3)] == ["one", "two", "three"]
+
+
+class TestSessionCache:
+    """Тести для кешу читань сесій"""
+
+    @pytest.mark.asyncio
+    async def test_repeated_reads_served_from_cache(self, db):
+        """Тест обслуговування повторних читань з пам'яті"""
+        session = await db.create_session("scan")
+        hits = db.session_cache.hits
+
+        first = await db.get_sessions()
+        second = await db.get_sessions()
+        assert await db.get_session(session[0]) == await db.get_session(session[0])
+
+        assert first == second
+        assert db.session_cache.hits - hits == 2
+
+    @pytest.mark.asyncio
+    async def test_local_write_invalidates(self, db):
+        """Тест скидання кешу після створення сесії в цьому воркері"""
+        await db.create_session("first")
+        assert len(await db.get_sessions()) == 1
+
+        await db.create_session("second")
+
+        assert len(await db.get_sessions()) == 2
+
+    @pytest.mark.asyncio
+    async def test_write_from_other_worker_invalidates(self, db, monkeypatch):
+        """Тест скидання кешу після запису іншим воркером (окремим з'єднанням)"""
+        monkeypatch.setattr(db.session_cache, "validate_interval", 0)
+        await db.create_session("first")
+        assert len(await db.get_sessions()) == 1
+
+        other = create_repository(db.settings.database_url)
+        await other.open()
+        try:
+            await other.create_session("other worker", datetime.utcnow().isoformat())
+        finally:
+            await other.close()
+
+        assert len(await db.get_sessions()) == 2
+
+
+@sqlite_only
+class TestLogPartitions:
+    """Тести для архівних місячних партицій логів"""
+
+    async def _insert_logs(self, db, session_id, timestamps):
+        repository = await db.get_repository()
+        for ts in timestamps:
+            await repository.insert_analysis_logs([(session_id, "info", f"log {ts}")], ts)
+
+    def test_month_arithmetic(self):
+        """Тест обчислення меж партицій"""
+        assert add_months("2025-01", -1) == "2024-12"
+        assert add_months("2025-11", 3) == "2026-02"
+        assert month_bounds("2025-12") == ("2025-12-01", "2026-01-01")
+
+    @pytest.mark.asyncio
+    async def test_retention_archives_and_evicts_old_months(self, db, tmp_path):
+        """Тест перенесення старих місяців в архів та читання з нього"""
+        session = await db.create_session("scan")
+        await self._insert_logs(db, session[0], [
+            "2025-01-05T10:00:00", "2025-01-20T10:00:00", "2025-02-10T10:00:00", "2025-03-01T00:00:00"
+        ])
+        archive = LogArchive(str(tmp_path / "archive"))
+        retention = LogRetention(db.get_pool, db.settings.database_url, archive, hot_months=1)
+
+        result = await retention.run_once(now=datetime(2025, 3, 15))
+
+        assert result == {"archived": ["2025-01", "2025-02"], "dropped": []}
+        assert archive.partitions() == ["2025-01", "2025-02"]
+        assert archive.prune(since="2025-02-01", until="2025-03-01") == ["2025-02"]
+        hot = await db.get_session_logs(session[0])
+        assert [log["timestamp"] for log in hot] == ["2025-03-01T00:00:00"]
+        archived = [log async for chunk in archive.iter_session_logs(session[0], chunk_size=1) for log in chunk]
+        assert [log["timestamp"][:7] for log in archived] == ["2025-01", "2025-01", "2025-02"]
+
+        # Старі місяці видалені цілком разом з їх FTS індексами
+        assert await db.search_analysis_logs("2025-01-05T10:00:00") == []
+        pool = await db.get_pool()
+        async with pool.reader() as conn:
+            cursor = await conn.execute("SELECT name FROM sqlite_master WHERE name LIKE 'analysis_logs_2025%'")
+            assert {row[0] for row in await cursor.fetchall()} >= {"analysis_logs_2025_03", "analysis_logs_2025_03_fts"}
+            assert not [name for (name,) in await (await conn.execute(
+                "SELECT name FROM sqlite_master WHERE name LIKE 'analysis_logs_2025_01%'"
+            )).fetchall()]
+        # ID нових логів продовжують глобальну послідовність
+        ids = await db.create_analysis_logs([(session[0], "info", "new")])
+        assert ids[0] > max(log["id"] for log in archived + hot)
+
+    @pytest.mark.asyncio
+    async def test_late_logs_merge_and_archive_retention(self, db, tmp_path):
+        """Тест дописування пізніх логів в існуючий архів та видалення простроченого архіву"""
+        session = await db.create_session("scan")
+        archive = LogArchive(str(tmp_path / "archive"))
+        retention = LogRetention(db.get_pool, db.settings.database_url, archive, hot_months=1,
+                                 archive_retention_months=2)
+
+        await self._insert_logs(db, session[0], ["2025-01-05T10:00:00"])
+        await retention.run_once(now=datetime(2025, 2, 15))
+        await self._insert_logs(db, session[0], ["2025-01-25T10:00:00"])
+        await retention.run_once(now=datetime(2025, 2, 15))
+
+        archived = [log async for chunk in archive.iter_session_logs(session[0]) for log in chunk]
+        assert len(archived) == 2
+
+        # Паралельне відкриття партиції розпаковує в унікальні тимчасові файли
+        archive._invalidate_cache("2025-01")
+        connections = await asyncio.gather(*(archive._open("2025-01") for _ in range(4)))
+        for conn in connections:
+            assert (await (await conn.execute("SELECT COUNT(*) FROM analysis_logs")).fetchone())[0] == 2
+            await conn.close()
+        assert not list(archive.cache_dir.glob("*.tmp"))
+
+        result = await retention.run_once(now=datetime(2025, 4, 1))
+        assert result["dropped"] == ["2025-01"]
+        assert archive.partitions() == []
+
+
+def scanner_line(n: int) -> str:
+    """Типовий рядок сканера для тестів стиснення"""
+    service = ["OpenSSH 8.9p1 Ubuntu", "nginx 1.18.0", "Apache httpd 2.4.52"][n % 3]
+    return f"Port {1000 + n * 7}/tcp open: {service} on host 10.0.{n % 256}.{n * 13 % 256}"
+
+
+@sqlite_only
+class TestLogCompression:
+    """Тести для стиснення тексту логів аналізу"""
+
+    def test_dictionary_improves_ratio(self):
+        """Тест стиснення коротких рядків зі словником та без нього"""
+        lines = [scanner_line(n) for n in range(400)]
+        plain = MessageCodec(":memory:")
+        codec = MessageCodec(":memory:")
+        codec.add_dictionary(1, "info", train_dictionary(lines[:200]))
+
+        packed = [codec.pack("info", line) for line in lines[200:]]
+        raw_size = sum(len(line.encode()) for line in lines[200:])
+        plain_size = sum(len(plain.pack("info", line)) for line in lines[200:])
+
+        assert [codec.unpack(value) for value in packed] == lines[200:]
+        assert all(isinstance(value, bytes) for value in packed)
+        assert sum(len(value) for value in packed) < raw_size * 0.6 and raw_size <= plain_size
+        assert codec.pack("info", "ok") == "ok"
+
+    @pytest.mark.asyncio
+    async def test_trained_dictionary_is_transparent(self, db):
+        """Тест навчання словника, перестиснення та читання, пошуку і архівації стиснених логів"""
+        repository = await db.get_repository()
+        repository.train_samples = 100
+        session = await db.create_session("scan")
+        ids = await db.create_analysis_logs(
+            [(session[0], "info", scanner_line(n)) for n in range(150)], chunk_size=150
+        )
+        await asyncio.gather(*repository._training)
+
+        async with repository.pool.reader() as conn:
+            cursor = await conn.execute("SELECT COUNT(*) FROM log_dictionaries WHERE log_type = 'info'")
+            assert (await cursor.fetchone())[0] == 1
+            cursor = await conn.execute("SELECT COUNT(*) FROM analysis_logs WHERE typeof(message) = 'blob'")
+            assert (await cursor.fetchone())[0] == 150
+
+        logs = await db.get_session_logs(session[0], limit=500)
+        results = await db.search_analysis_logs("nginx", session_id=session[0], limit=100)
+
+        assert [log["message"] for log in logs] == [scanner_line(n) for n in range(150)]
+        assert len(results) == 50 and all("<mark>nginx</mark>" in r["highlight"] for r in results)
+
+        # Нове з'єднання без кешу словників (інший воркер) читає стиснені логи
+        other = MessageCodec(repository.database_path)
+        async with repository.pool.reader() as conn:
+            cursor = await conn.execute("SELECT message FROM analysis_logs WHERE id = ?", (ids[0],))
+            assert other.unpack((await cursor.fetchone())[0]) == scanner_line(0)
+
+    @pytest.mark.asyncio
+    async def test_backup_readable_without_app(self, db, tmp_path):
+        """Тест читання стиснених логів резервної копії без SQL функцій додатку"""
+        repository = await db.get_repository()
+        repository.train_samples = 100
+        session = await db.create_session("scan")
+        await db.create_analysis_logs([(session[0], "info", scanner_line(n)) for n in range(150)], chunk_size=150)
+        await asyncio.gather(*repository._training)
+        result = await DatabaseBackup(db.settings.database_url, str(tmp_path / "backups"), compress=False).run_once()
+        path = str(tmp_path / "backups" / result["file"])
+
+        conn = connect(path, read_only=True)
+        try:
+            table = hot_table(conn.execute("SELECT month FROM log_partitions").fetchone()[0])
+            matches = conn.execute(
+                f"SELECT highlight({table}_fts, 0, '[', ']') FROM {table}_fts WHERE {table}_fts MATCH 'nginx'"
+            ).fetchall()
+        finally:
+            conn.close()
+        assert len(matches) == 50
+
+        assert decompress_database(path) == 150
+        plain = sqlite3.connect(path)
+        try:
+            rows = plain.execute("SELECT typeof(message), message FROM analysis_logs ORDER BY id").fetchall()
+        finally:
+            plain.close()
+        assert rows == [("text", scanner_line(n)) for n in range(150)]
+
+
+@sqlite_only
+class TestDatabaseBackup:
+    """Тести для онлайн резервного копіювання"""
+
+    @pytest.mark.asyncio
+    async def test_backup_during_writes(self, db, tmp_path):
+        """Тест копіювання малими кроками паралельно із записом"""
+        session = await db.create_session("scan")
+        await db.create_analysis_logs([(session[0], "info", "x" * 500)] * 2000)
+        backup = DatabaseBackup(db.settings.database_url, str(tmp_path / "backups"),
+                                compress=False, pages_per_step=8, step_sleep=0)
+
+        async def write():
+            for n in range(20):
+                await db.create_analysis_logs([(session[0], "info", f"during {n}")])
+
+        result, _ = await asyncio.gather(backup.run_once(), write())
+
+        assert result["steps"] > 1 and result["verified"]
+        conn = sqlite3.connect(tmp_path / "backups" / result["file"])
+        try:
+            count = conn.execute("SELECT COUNT(*) FROM analysis_logs").fetchone()[0]
+            assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        finally:
+            conn.close()
+        assert 2000 <= count <= 2020
+
+    @pytest.mark.asyncio
+    async def test_compression_and_rotation(self, db, tmp_path):
+        """Тест стиснення копій та видалення найстаріших"""
+        await db.create_session("scan")
+        backup = DatabaseBackup(db.settings.database_url, str(tmp_path / "backups"), keep=2)
+
+        results = [await backup.run_once() for _ in range(3)]
+
+        assert [b["file"] for b in backup.backups()] == [r["file"] for r in results[1:]]
+        assert results[2]["removed"] == [results[0]["file"]]
+        assert all(b["compressed"] for b in backup.backups())
+        assert backup.get_stats()["runs"] == 3
+
+
+class TestAnalysisLogWriter:
+    """Тести для write-behind запису логів"""
+
+    @pytest.mark.asyncio
+    async def test_groups_concurrent_logs_into_one_batch(self):
+        """Тест об'єднання логів з різних запитів в один пакет"""
+        batches = []
+
+        async def flush(logs):
+            batches.append(list(logs))
+            return [None if session_id == 0 else n + 1 for n, (session_id, _, _) in enumerate(logs)]
+
+        writer = AnalysisLogWriter(flush, batch_size=100, flush_interval=0.05)
+        await writer.start()
+        try:
+            results = await asyncio.gather(
+                *(writer.submit(1, "info", f"log {n}") for n in range(10)),
+                writer.submit(0, "info", "orphan"),
+                return_exceptions=True
+            )
+        finally:
+            await writer.stop()
+
+        assert len(batches) == 1
+        assert results[:10] == list(range(1, 11))
+        assert isinstance(results[10], ValueError)
+
+    @pytest.mark.asyncio
+    async def test_flushes_on_size_and_on_stop(self):
+        """Тест запису за розміром пакету та при зупинці"""
+        batches = []
+
+        async def flush(logs):
+            batches.append(len(logs))
+            return list(range(len(logs)))
+
+        writer = AnalysisLogWriter(flush, batch_size=3, flush_interval=60, max_pending=2)
+        await writer.start()
+        for n in range(7):
+            assert await writer.submit(1, "info", f"log {n}", wait=False) is None
+        await writer.stop()
+
+        assert sum(batches) == 7
+        assert batches[0] == 3
+
+    @pytest.mark.asyncio
+    async def test_database_uses_writer(self, db):
+        """Тест запису логу через write-behind writer"""
+        session = await db.create_session("scan")
+
+        assert db._log_writer is not None and db._log_writer.is_running
+        log_id = await db.create_analysis_log(session[0], "info", "message")
+        await db.create_analysis_log(session[0], "info", "deferred", wait=False)
+        await db.close_database()
+
+        assert log_id > 0
+        assert [log["message"] for log in await db.get_session_logs(session[0])] == ["message", "deferred"]
+
+
+class TestAnalysisLogIngestion:
+    """Тести для запису логів з Message Bus"""
+
+    @pytest.mark.asyncio
+    async def test_handle_batch(self, db):
+        """Тест запису пакету та відхилення повідомлень без сесії або з некоректними логами"""
+        session = await db.create_session("scan")
+        ingestion = AnalysisLogIngestion(Mock(), asyncio.get_running_loop())
+        messages = [
+            AnalysisLogMessage(session[0], [AnalysisLogEntry("info", "a"), AnalysisLogEntry("error", "b")]),
+            AnalysisLogMessage(999, [AnalysisLogEntry("info", "orphan")]),
+            AnalysisLogMessage(session[0], [AnalysisLogEntry("info", "x" * 1001)]),
+            AnalysisLogMessage(session[0], [AnalysisLogEntry("info", "c")]),
+        ]
+
+        # handle_batch викликається з потоку consumer
+        results = await asyncio.to_thread(ingestion.handle_batch, messages)
+        logs = await db.get_session_logs(session[0])
+
+        assert results == [True, False, False, True]
+        assert [log["message"] for log in logs] == ["a", "b", "c"]
+        assert ingestion.get_stats()["written"] == 3
+        assert ingestion.get_stats()["rejected"] == 2
+
+    @sqlite_only
+    @pytest.mark.asyncio
+    async def test_timeout_returns_batch_only_without_commit(self, db):
+        """Тест скасування запису по таймауту до коміту (повторна доставка без дублікатів)"""
+        session = await db.create_session("scan")
+        ingestion = AnalysisLogIngestion(Mock(), asyncio.get_running_loop(), write_timeout=0.2)
+        messages = [AnalysisLogMessage(session[0], [AnalysisLogEntry("info", "a")])]
+        pool = await db.get_pool()
+
+        # Writer зайнятий довше за write_timeout
+        async with pool.writer():
+            with pytest.raises(concurrent.futures.TimeoutError):
+                await asyncio.to_thread(ingestion.handle_batch, messages)
+        await asyncio.sleep(0.05)
+
+        assert await db.get_session_logs(session[0]) == []
+        assert ingestion.get_stats()["timeouts"] == 1
+        assert await asyncio.to_thread(ingestion.handle_batch, messages) == [True]
+        assert [log["message"] for log in await db.get_session_logs(session[0])] == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_redelivery_without_duplicates(self, db, monkeypatch):
+        """Тест: помилка запису пакету, більшого за batch_size, не залишає закомічених логів"""
+        session = await db.create_session("scan")
+        ingestion = AnalysisLogIngestion(Mock(), asyncio.get_running_loop(), batch_size=2)
+        messages = [
+            AnalysisLogMessage(session[0], [AnalysisLogEntry("info", "a"), AnalysisLogEntry("info", "b")]),
+            AnalysisLogMessage(session[0], [AnalysisLogEntry("info", "c"), AnalysisLogEntry("info", "d")]),
+            AnalysisLogMessage(session[0], [AnalysisLogEntry("info", "e")]),
+        ]
+        repository = await db.get_repository()
+        insert = repository.insert_analysis_logs
+        failures = []
+
+        async def insert_failing_on_last_message(logs, *args, **kwargs):
+            # Запис логу останнього повідомлення падає один раз (наприклад, заповнений диск)
+            if not failures and any(message == "e" for _, _, message in logs):
+                failures.append(len(logs))
+                raise OSError("database or disk is full")
+            return await insert(logs, *args, **kwargs)
+
+        monkeypatch.setattr(repository, "insert_analysis_logs", insert_failing_on_last_message)
+        with pytest.raises(OSError):
+            await asyncio.to_thread(ingestion.handle_batch, messages)
+        assert await db.get_session_logs(session[0]) == []
+
+        # Повторна доставка пакету після nack з requeue
+        assert await asyncio.to_thread(ingestion.handle_batch, messages) == [True, True, True]
+        assert [log["message"] for log in await db.get_session_logs(session[0])] == ["a", "b", "c", "d", "e"]
+        assert failures == [5]
+
+    def test_write_guard(self):
+        """Тест: після початку коміту запис не скасовується, після скасування - не комітиться"""
+        committed = _WriteGuard()
+        assert committed.before_commit() and not committed.abandon()
+
+        abandoned = _WriteGuard()
+        assert abandoned.abandon() and not abandoned.before_commit()
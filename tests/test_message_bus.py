@@ -5,14 +5,20 @@ Tests for Message Bus Service
 
 import pytest
 import json
+import os
+import sys
 import uuid
 from datetime import datetime
 from unittest.mock import Mock, patch
 
+import pika.exceptions
+
 from services.message_bus import (
     MessageBus, MessageBusConfig, MessageBusPublisher, MessageBusConsumer,
-    CommandMessage, EventMessage, MessageType, MessageStatus,
-    create_command_message, create_event_message
+    CommandMessage, EventMessage, MessageType, MessageStatus, AnalysisLogMessage,
+    ConnectionSupervisor, PendingPublish, PublishBuffer, _try_lock, _unlock,
+    create_command_message, create_event_message,
+    decode_message, encode_message, get_message_validator
 )
 
 
@@ -86,6 +92,55 @@ class TestMessageCreation:
         assert event.routing_key == f"jira_project_finder.completed"
 
 
+class TestMessageDecoding:
+    """Тести типізованого декодування повідомлень"""
+    
+    def test_command_roundtrip(self):
+        """Тест декодування команди в CommandMessage"""
+        command = create_command_message(
+            message_id="test-123",
+            task_id="task-123",
+            step_id="step-123",
+            tool_name="test_tool",
+            parameters={"param": "value"}
+        )
+        
+        decoded = decode_message(encode_message(command), MessageType.COMMAND)
+        
+        assert isinstance(decoded, CommandMessage)
+        assert decoded.tool_name == "test_tool"
+        assert decoded.parameters == {"param": "value"}
+        assert decoded.timestamp == command.timestamp
+    
+    def test_event_roundtrip(self):
+        """Тест декодування події в EventMessage"""
+        event = create_event_message(
+            message_id="test-123",
+            task_id="task-123",
+            step_id="step-123",
+            tool_name="test_tool",
+            status=MessageStatus.FAILED,
+            error="boom"
+        )
+        
+        decoded = decode_message(encode_message(event).encode("utf-8"), MessageType.EVENT)
+        
+        assert isinstance(decoded, EventMessage)
+        assert decoded.status == MessageStatus.FAILED
+        assert decoded.error == "boom"
+    
+    def test_validator_is_cached(self):
+        """Тест кешування скомпільованого валідатора"""
+        assert get_message_validator(MessageType.COMMAND) is get_message_validator(MessageType.COMMAND)
+    
+    def test_malformed_payload_rejected(self):
+        """Тест відхилення некоректного повідомлення"""
+        with pytest.raises(ValueError):
+            decode_message('{"message_id": "x", "parameters": "not-a-dict"}', MessageType.COMMAND)
+        with pytest.raises(ValueError):
+            decode_message('{"message_id": "x"}', MessageType.COMMAND, schema_version=99)
+
+
 class TestMessageBusPublisher:
     """Тести для Publisher"""
     
@@ -166,6 +221,158 @@ class TestMessageBusPublisher:
         assert body_data['result'] == event.result
 
 
+class TestPublishBuffer:
+    """Тести для буфера публікацій"""
+    
+    def _pending(self, n):
+        return PendingPublish(exchange="ex", routing_key=f"key.{n}", body=str(n), properties={})
+    
+    def test_drops_oldest_when_full(self):
+        """Тест витіснення найстарішого повідомлення без диска"""
+        buffer = PublishBuffer(max_size=2)
+        for n in range(3):
+            buffer.append(self._pending(n))
+        
+        assert len(buffer) == 2
+        assert buffer.dropped == 1
+        assert buffer.pop().body == "1"
+    
+    def test_spill_preserves_order(self, tmp_path):
+        """Тест скидання на диск зі збереженням порядку"""
+        buffer = PublishBuffer(max_size=2, spill_dir=str(tmp_path))
+        for n in range(5):
+            buffer.append(self._pending(n))
+        
+        assert len(buffer) == 5
+        assert buffer.spilled == 3
+        
+        bodies = []
+        while buffer.peek() is not None:
+            bodies.append(buffer.pop().body)
+        
+        assert bodies == ["0", "1", "2", "3", "4"]
+        assert buffer.dropped == 0
+        assert not buffer.spill_path.exists()
+    
+    def test_recovers_spill_of_stopped_process(self, tmp_path):
+        """Тест відновлення повідомлень, скинутих процесом до перезапуску"""
+        crashed = PublishBuffer(max_size=1, spill_dir=str(tmp_path))
+        for n in range(3):
+            crashed.append(self._pending(n))
+        crashed.close()
+        # Файл процесу з іншим pid, який завершився аварійно
+        orphan = tmp_path / "publish-buffer-999999.jsonl"
+        os.replace(crashed.spill_path, orphan)
+        
+        buffer = PublishBuffer(max_size=10, spill_dir=str(tmp_path))
+        buffer.append(self._pending(3))
+        
+        bodies = []
+        while buffer.peek() is not None:
+            bodies.append(buffer.pop().body)
+        
+        assert bodies == ["0", "1", "2", "3"]
+        assert buffer.recovered == 3
+        assert not orphan.exists()
+        buffer.close()
+    
+    @pytest.mark.skipif(sys.platform == "win32", reason="блокування в межах одного процесу")
+    def test_keeps_spill_of_running_process(self, tmp_path):
+        """Тест, що spill-файл працюючого процесу не забирається"""
+        other = tmp_path / "publish-buffer-999998.jsonl"
+        other.write_text(json.dumps({"exchange": "ex", "routing_key": "k", "body": "x", "properties": {}}) + "\n")
+        lock = _try_lock(other.with_suffix(".lock"))
+        
+        buffer = PublishBuffer(max_size=10, spill_dir=str(tmp_path))
+        
+        assert buffer.recovered == 0 and len(buffer) == 0
+        assert other.exists()
+        _unlock(lock)
+        buffer.close()
+
+
+class TestConnectionSupervisor:
+    """Тести для supervisor-а з'єднання"""
+    
+    def test_backoff_is_bounded(self):
+        """Тест обмеження затримки перепідключення"""
+        config = MessageBusConfig()
+        supervisor = ConnectionSupervisor(config, Mock())
+        
+        for attempt in range(20):
+            delay = supervisor.backoff_delay(attempt)
+            assert 0 < delay <= config.reconnect_max_delay
+    
+    @patch('services.message_bus.pika.BlockingConnection')
+    def test_topology_redeclared_on_reconnect(self, mock_connection):
+        """Тест повторного оголошення топології"""
+        declare_topology = Mock()
+        supervisor = ConnectionSupervisor(MessageBusConfig(), declare_topology)
+        
+        assert supervisor.connect()
+        supervisor.mark_disconnected(pika.exceptions.StreamLostError("lost"))
+        assert not supervisor.is_connected
+        
+        supervisor._next_attempt_at = 0
+        assert supervisor.try_reconnect()
+        assert declare_topology.call_count == 2
+        assert supervisor.reconnects == 1
+
+
+class TestMessageBusPublisherBuffering:
+    """Тести буферизації публікацій під час недоступності брокера"""
+    
+    def _config(self):
+        # Фоновий supervisor не повинен втручатися в тест
+        config = MessageBusConfig()
+        config.supervisor_interval = 60
+        return config
+    
+    @patch('services.message_bus.pika.BlockingConnection')
+    def test_startup_without_broker(self, mock_connection):
+        """Тест запуску publisher без брокера"""
+        mock_connection.side_effect = pika.exceptions.AMQPConnectionError("refused")
+        
+        publisher = MessageBusPublisher(self._config())
+        try:
+            publisher.publish_command(create_command_message(
+                message_id="test-1", task_id="t", step_id="s",
+                tool_name="test_tool", parameters={}
+            ))
+            
+            assert publisher.channel is None
+            assert len(publisher.buffer) == 1
+        finally:
+            publisher.close()
+    
+    @patch('services.message_bus.pika.BlockingConnection')
+    def test_buffer_flushed_in_order_on_reconnect(self, mock_connection):
+        """Тест відправки буфера по порядку після перепідключення"""
+        mock_channel = Mock()
+        mock_channel.basic_publish.side_effect = [pika.exceptions.StreamLostError("lost"), None, None, None]
+        mock_connection.return_value.channel.return_value = mock_channel
+        
+        publisher = MessageBusPublisher(self._config())
+        try:
+            for n in range(3):
+                publisher.publish_command(create_command_message(
+                    message_id=f"msg-{n}", task_id="t", step_id="s",
+                    tool_name="test_tool", parameters={}
+                ))
+            
+            assert not publisher.supervisor.is_connected
+            assert len(publisher.buffer) == 3
+            
+            publisher.supervisor._next_attempt_at = 0
+            assert publisher.supervisor.try_reconnect()
+            assert publisher.flush_buffer() == 3
+            
+            routing_keys = [c[1]['routing_key'] for c in mock_channel.basic_publish.call_args_list[1:]]
+            assert routing_keys == ["test_tool.msg-0", "test_tool.msg-1", "test_tool.msg-2"]
+        finally:
+            publisher.close()
+
+
 class TestMessageBusConsumer:
     """Тести для Consumer"""
     
@@ -198,6 +405,74 @@ class TestMessageBusConsumer:
         
         assert "test_queue" in consumer.callbacks
         assert consumer.callbacks["test_queue"] == test_callback
+    
+    @patch('services.message_bus.pika.BlockingConnection')
+    def test_typed_callback_rejects_malformed(self, mock_connection):
+        """Тест відхилення некоректних повідомлень до виклику callback"""
+        mock_channel = Mock()
+        mock_connection.return_value.channel.return_value = mock_channel
+        
+        consumer = MessageBusConsumer(MessageBusConfig())
+        received = []
+        consumer.register_callback("test_queue", received.append, MessageType.COMMAND)
+        consumer.start_consuming("test_queue")
+        handler = mock_channel.basic_consume.call_args[1]['on_message_callback']
+        
+        command = create_command_message(
+            message_id="test-123", task_id="t", step_id="s",
+            tool_name="test_tool", parameters={}
+        )
+        handler(mock_channel, Mock(delivery_tag=1), Mock(headers={"schema_version": 1}), encode_message(command))
+        handler(mock_channel, Mock(delivery_tag=2), Mock(headers=None), b'{"parameters": []}')
+        
+        assert len(received) == 1
+        assert isinstance(received[0], CommandMessage)
+        mock_channel.basic_ack.assert_called_once_with(delivery_tag=1)
+        mock_channel.basic_nack.assert_called_once_with(delivery_tag=2, requeue=False)
+        assert consumer.get_stats() == {"decoded": {"command": 1}, "rejected": {"command": 1}}
+    
+    @patch('services.message_bus.pika.BlockingConnection')
+    def test_batch_consumer_settles_after_handler(self, mock_connection):
+        """Тест пакетного споживання: ack після обробки, dead-letter для відхилених"""
+        mock_channel = Mock()
+        mock_connection.return_value.channel.return_value = mock_channel
+        
+        def log_message(session_id):
+            return json.dumps({"session_id": session_id, "entries": [{"log_type": "info", "message": "line"}]})
+        
+        properties = Mock(headers={"schema_version": 1})
+        mock_channel.consume.return_value = iter([
+            (Mock(delivery_tag=1), properties, log_message(1)),
+            (Mock(delivery_tag=2), properties, b'{"entries": "broken"}'),
+            (Mock(delivery_tag=3), properties, log_message(999)),
+            (None, None, None),
+        ])
+        batches = []
+        
+        def handle_batch(messages):
+            batches.append(messages)
+            return [message.session_id != 999 for message in messages]
+        
+        consumer = MessageBusConsumer(MessageBusConfig())
+        consumer.consume_batches("logs_queue", handle_batch, MessageType.ANALYSIS_LOG,
+                                 batch_size=10, flush_interval=60)
+        
+        assert len(batches) == 1
+        assert all(isinstance(message, AnalysisLogMessage) for message in batches[0])
+        mock_channel.basic_qos.assert_called_once_with(prefetch_count=10)
+        mock_channel.basic_ack.assert_called_once_with(delivery_tag=1)
+        assert mock_channel.basic_nack.call_args_list == [
+            ((), {"delivery_tag": 2, "requeue": False}),
+            ((), {"delivery_tag": 3, "requeue": False}),
+        ]
+        
+        # Помилка обробки повертає весь пакет у чергу
+        mock_channel.reset_mock()
+        mock_channel.consume.return_value = iter([(Mock(delivery_tag=4), properties, log_message(1))])
+        consumer.config.reconnect_initial_delay = 0
+        consumer.consume_batches("logs_queue", Mock(side_effect=RuntimeError("db down")),
+                                 MessageType.ANALYSIS_LOG, batch_size=10, flush_interval=60)
+        mock_channel.basic_nack.assert_called_once_with(delivery_tag=4, multiple=True, requeue=True)
 
 
 class TestMessageBus:
@@ -277,5 +552,49 @@ class TestIntegration:
             message_bus.close()
 
 
+class TestMessageBusApi:
+    """Тести для HTTP API Message Bus"""
+    
+    @pytest.mark.asyncio
+    async def test_returns_503_without_configured_bus(self):
+        """Тест 503 без спільного екземпляра замість створення MessageBus на кожен запит"""
+        import httpx
+        from src.main import app
+        
+        app.state.message_bus = None
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            with patch("src.services.message_bus.MessageBus") as message_bus_class:
+                status = await client.get("/api/message-bus/status")
+                test = await client.post("/api/message-bus/test")
+        
+        assert status.status_code == 503 and test.status_code == 503
+        message_bus_class.assert_not_called()
+    
+    @pytest.mark.asyncio
+    @patch('services.message_bus.pika.BlockingConnection')
+    async def test_status_includes_consumer_stats(self, mock_connection):
+        """Тест статистики декодування споживача у статусі"""
+        import httpx
+        from src.main import app
+        
+        message_bus = MessageBus(MessageBusConfig())
+        message_bus.publisher = Mock()
+        message_bus.publisher.get_stats.return_value = {"connected": True}
+        message_bus.consumer = MessageBusConsumer(message_bus.config)
+        message_bus.consumer.decoded["analysis_log"] = 3
+        message_bus.consumer.rejected["raw"] = 1
+        app.state.message_bus = message_bus
+        app.state.log_ingestion = None
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.get("/api/message-bus/status")
+        finally:
+            app.state.message_bus = None
+        
+        assert response.json()["consumer"] == {"decoded": {"analysis_log": 3}, "rejected": {"raw": 1}}
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
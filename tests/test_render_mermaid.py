@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for Mermaid batch renderer
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Додаємо кореневу директорію проекту до Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from scripts.utils.render_mermaid import (
+    MANIFEST_NAME, RenderOptions, is_optimized, minify_svg, png_width, render_all
+)
+
+FAKE_MMDC = """#!{python}
+import struct
+import sys
+args = sys.argv
+option = lambda name: args[args.index(name) + 1]
+try:
+    # Ширини сторінки, на яких рендеринг падає
+    failing = open(args[0] + ".fail").read().split()
+except FileNotFoundError:
+    failing = []
+if option("-w") in failing:
+    sys.exit("render failed at width " + option("-w"))
+if option("-e") == "png":
+    # Заголовок PNG з шириною сторінки, помноженою на масштаб
+    width = int(option("-w")) * int(option("--scale"))
+    with open(option("-o"), "wb") as output:
+        output.write(b"\\x89PNG\\r\\n\\x1a\\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, 100))
+else:
+    with open(option("-i")) as source, open(option("-o"), "w") as output:
+        output.write(option("-e") + ":" + source.read())
+with open(args[0] + ".calls", "a") as calls:
+    calls.write(option("-i") + "\\n")
+"""
+
+
+@pytest.fixture
+def mmdc(tmp_path):
+    """Замінник Mermaid CLI, що копіює джерело у вихідний файл"""
+    path = tmp_path / "mmdc"
+    path.write_text(FAKE_MMDC.format(python=sys.executable), encoding="utf-8")
+    path.chmod(0o755)
+    return path
+
+
+def calls(mmdc) -> int:
+    calls_path = Path(f"{mmdc}.calls")
+    return len(calls_path.read_text().splitlines()) if calls_path.exists() else 0
+
+
+@pytest.mark.skipif(os.name == "nt", reason="shebang-скрипт як замінник mmdc")
+class TestRenderMermaid:
+    """Тести для пакетного рендерингу діаграм"""
+
+    def test_renders_changed_diagrams_only(self, tmp_path, mmdc):
+        """Тест пропуску незмінених діаграм за маніфестом"""
+        root = tmp_path / "architecture"
+        (root / "nested").mkdir(parents=True)
+        (root / "flow.mmd").write_text("graph TD; A-->B", encoding="utf-8")
+        (root / "nested" / "bus.mmd").write_text("graph LR; C-->D", encoding="utf-8")
+
+        first = render_all(root, [str(mmdc)], jobs=2)
+        second = render_all(root, [str(mmdc)], jobs=2)
+        assert [d["name"] for d in sorted(first["rendered"], key=lambda d: d["name"])] == ["flow.mmd", "nested/bus.mmd"]
+        assert set(first["rendered"][0]["timings"]) == {"png", "svg", "optimize"}
+        assert second["rendered"] == [] and sorted(second["skipped"]) == ["flow.mmd", "nested/bus.mmd"]
+        assert (root / "flow.svg").read_text(encoding="utf-8") == "svg:graph TD; A-->B"
+        # PNG, SVG та три зменшені копії на кожну діаграму
+        assert calls(mmdc) == 10
+
+        (root / "flow.mmd").write_text("graph TD; A-->C", encoding="utf-8")
+        (root / "nested" / "bus.png").unlink()
+        (root / "nested" / "bus.mmd").rename(root / "nested" / "renamed.mmd")
+        third = render_all(root, [str(mmdc)], jobs=2)
+
+        assert sorted(d["name"] for d in third["rendered"]) == ["flow.mmd", "nested/renamed.mmd"]
+        manifest = json.loads((root / MANIFEST_NAME).read_text(encoding="utf-8"))
+        assert sorted(manifest) == ["flow.mmd", "nested/renamed.mmd"]
+        assert not list((root / "nested" / "sizes").glob("bus-*"))
+        assert (root / "nested" / "sizes" / "renamed-960w.png").exists()
+
+    def test_responsive_sizes_rendered_by_mmdc(self, tmp_path, mmdc):
+        """Тест зменшених PNG, відрендерених mmdc з меншою шириною сторінки"""
+        root = tmp_path / "architecture"
+        root.mkdir()
+        (root / "flow.mmd").write_text("graph TD; A-->B", encoding="utf-8")
+
+        summary = render_all(root, [str(mmdc)], options=RenderOptions(width=1200, scale=1), jobs=1)
+        widened = render_all(root, [str(mmdc)], options=RenderOptions(width=1200, scale=1), jobs=1,
+                             widths=[480, 960, 1600, 640])
+
+        assert summary["rendered"][0]["optimized"]["sizes"] == {
+            width: str(root / "sizes" / f"flow-{width}w.png") for width in (480, 960)
+        }
+        assert [png_width(root / "sizes" / f"flow-{width}w.png") for width in (480, 960)] == [480, 960]
+        assert not (root / "sizes" / "flow-1600w.png").exists()
+        assert sorted(widened["rendered"][0]["optimized"]["sizes"]) == [480, 640, 960]
+        manifest = json.loads((root / MANIFEST_NAME).read_text(encoding="utf-8"))
+        assert manifest["flow.mmd"]["widths"] == [480, 960, 1600, 640]
+        assert manifest["flow.mmd"]["skipped"] == [1600]
+
+    def test_failed_size_leaves_diagram_unoptimized(self, tmp_path, mmdc):
+        """Тест помилки на другій ширині: старі копії видалені, діаграма не вважається оптимізованою"""
+        root = tmp_path / "architecture"
+        root.mkdir()
+        (root / "flow.mmd").write_text("graph TD; A-->B", encoding="utf-8")
+        options = RenderOptions(width=1200, scale=1)
+        render_all(root, [str(mmdc)], options=options, jobs=1)
+
+        Path(f"{mmdc}.fail").write_text("640", encoding="utf-8")
+        failed = render_all(root, [str(mmdc)], options=options, jobs=1, widths=[480, 640, 960])
+        entry = json.loads((root / MANIFEST_NAME).read_text(encoding="utf-8"))["flow.mmd"]
+
+        assert failed["failed"][0]["name"] == "flow.mmd" and "640w" in failed["failed"][0]["error"]
+        # remove_sizes виконався до рендерингу: копії попереднього набору ширин видалені
+        assert sorted(path.name for path in (root / "sizes").iterdir()) == ["flow-480w.png"]
+        assert "widths" not in entry and "sizes" not in entry and "skipped" not in entry
+        assert not is_optimized(entry, [480, 640, 960], root / "flow.png")
+
+        Path(f"{mmdc}.fail").unlink()
+        failed_calls = calls(mmdc)
+        retried = render_all(root, [str(mmdc)], options=options, jobs=1, widths=[480, 640, 960])
+
+        # Повтор створює тільки зменшені копії, без перерендерингу PNG та SVG
+        assert set(retried["rendered"][0]["timings"]) == {"optimize"}
+        assert calls(mmdc) == failed_calls + 3
+        assert sorted(path.name for path in (root / "sizes").iterdir()) == [
+            "flow-480w.png", "flow-640w.png", "flow-960w.png"
+        ]
+
+    def test_options_change_and_failures(self, tmp_path, mmdc):
+        """Тест перерендерингу при зміні параметрів та звіту про помилки"""
+        root = tmp_path / "architecture"
+        root.mkdir()
+        (root / "flow.mmd").write_text("graph TD; A-->B", encoding="utf-8")
+
+        render_all(root, [str(mmdc)], jobs=1)
+        rescaled = render_all(root, [str(mmdc)], options=RenderOptions(scale=1), jobs=1)
+        failed = render_all(root, [str(tmp_path / "missing-mmdc")], force=True, jobs=1)
+
+        assert [d["name"] for d in rescaled["rendered"]] == ["flow.mmd"]
+        assert failed["failed"][0]["name"] == "flow.mmd"
+        assert "flow.mmd" not in json.loads((root / MANIFEST_NAME).read_text(encoding="utf-8"))
+
+
+class TestDiagramOptimization:
+    """Тести для оптимізації SVG"""
+
+    def test_minify_svg(self):
+        """Тест мінімізації без зміни тексту, CSS та використаних data-атрибутів"""
+        svg = (
+            '<svg viewBox="0 0 1454.6015625 2242.75"><!-- mmdc -->\n'
+            '<style>#a [data-look="x"] { stroke-width: 1.2345px; }</style>\n'
+            '<path d="M560.4375,435.5L-0.0001,451.0421" style="undefined;;;undefined" data-points="W3sieCI6"'
+            ' data-look="x" data-id="edge-1"/><text x="10.125">Width 1.23456 px</text></svg>'
+        )
+
+        minified = minify_svg(svg)
+
+        assert minified == (
+            '<svg viewBox="0 0 1454.6 2242.75"><style>#a [data-look="x"] { stroke-width: 1.2345px; }</style>'
+            '<path d="M560.44,435.5L0,451.04" data-look="x"/><text x="10.12">Width 1.23456 px</text></svg>'
+        )
+        assert minify_svg(minified) == minified
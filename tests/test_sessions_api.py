@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for Sessions API
+"""
+
+import csv
+import gzip
+import io
+import json
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+import pytest_asyncio
+
+# Додаємо кореневу директорію проекту до Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.db import database
+from src.main import app
+
+
+@pytest_asyncio.fixture
+async def client(database_url, monkeypatch):
+    """HTTP клієнт з ізольованою базою даних (SQLite та PostgreSQL)"""
+    monkeypatch.setattr(database.settings, "database_url", database_url)
+    await database.close_database()
+    await database.init_database()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http_client:
+        yield http_client
+    await database.close_database()
+
+
+class TestAnalysisLogsBatch:
+    """Тести для пакетного створення логів аналізу"""
+
+    @pytest.mark.asyncio
+    async def test_json_array(self, client):
+        """Тест пакету у вигляді JSON масиву"""
+        session = (await client.post("/api/sessions", json={"session_name": "scan"})).json()
+        response = await client.post("/api/analysis-logs/batch", json=[
+            {"session_id": session["id"], "log_type": "info", "message": "ok"},
+            {"session_id": session["id"], "log_type": "info"},
+            {"session_id": 999, "log_type": "info", "message": "orphan"},
+        ])
+
+        data = response.json()
+        assert response.status_code == 200
+        assert data["created"] == 1
+        assert [r["status"] for r in data["results"]] == ["created", "error", "error"]
+        assert data["results"][2]["error"] == "Session not found"
+
+    @pytest.mark.asyncio
+    async def test_ndjson_stream(self, client):
+        """Тест пакету у вигляді NDJSON потоку"""
+        session = (await client.post("/api/sessions", json={"session_name": "scan"})).json()
+        lines = [json.dumps({"session_id": session["id"], "log_type": "info", "message": f"line {n}"})
+                 for n in range(3)]
+        body = "\n".join(lines[:2] + ["{not json"] + lines[2:]) + "\n"
+
+        response = await client.post(
+            "/api/analysis-logs/batch",
+            content=body.encode("utf-8"),
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+
+        data = response.json()
+        assert data["count"] == 4
+        assert data["created"] == 3
+        assert data["results"][2]["status"] == "error"
+
+    @pytest.mark.asyncio
+    async def test_rejects_non_array(self, client):
+        """Тест відхилення тіла, що не є масивом"""
+        response = await client.post("/api/analysis-logs/batch", json={"session_id": 1})
+
+        assert response.status_code == 400
+
+
+class TestPagination:
+    """Тести для keyset пагінації сесій та логів"""
+
+    @pytest.mark.asyncio
+    async def test_sessions_pages(self, client):
+        """Тест проходу по всіх сторінках сесій"""
+        for n in range(5):
+            await client.post("/api/sessions", json={"session_name": f"scan {n}"})
+
+        names, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            data = (await client.get("/api/sessions", params=params)).json()
+            names += [s["session_name"] for s in data["payload"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+
+        assert names == [f"scan {n}" for n in reversed(range(5))]
+
+    @pytest.mark.asyncio
+    async def test_session_logs_filters(self, client):
+        """Тест фільтрації та пагінації логів сесії"""
+        session = (await client.post("/api/sessions", json={"session_name": "scan"})).json()
+        await client.post("/api/analysis-logs/batch", json=[
+            {"session_id": session["id"], "log_type": "error" if n % 2 else "info", "message": f"line {n}"}
+            for n in range(6)
+        ])
+
+        first = (await client.get(f"/api/sessions/{session['id']}/logs",
+                                  params={"log_type": "error", "limit": 2})).json()
+        second = (await client.get(f"/api/sessions/{session['id']}/logs",
+                                   params={"log_type": "error", "limit": 2, "cursor": first["next_cursor"]})).json()
+
+        assert [log["message"] for log in first["payload"] + second["payload"]] == ["line 1", "line 3", "line 5"]
+        assert (await client.get("/api/sessions/999/logs")).status_code == 404
+        assert (await client.get(f"/api/sessions/{session['id']}/logs",
+                                 params={"cursor": "garbage"})).status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_time_filters_with_offset(self, client):
+        """Тест фільтрів since/until з часовим поясом (мітки часу зберігаються в UTC)"""
+        session = (await client.post("/api/sessions", json={"session_name": "scan"})).json()
+        repository = await database.get_repository()
+        for message, timestamp in [("before", "2025-01-05T09:59:00"), ("inside", "2025-01-05T10:30:00"),
+                                   ("after", "2025-01-05T11:01:00")]:
+            await repository.insert_analysis_logs([(session["id"], "info", message)], timestamp)
+        # 12:00-13:00 за Києвом (UTC+2) - це 10:00-11:00 UTC
+        params = {"since": "2025-01-05T12:00:00+02:00", "until": "2025-01-05T13:00:00+02:00"}
+
+        logs = (await client.get(f"/api/sessions/{session['id']}/logs", params=params)).json()
+        export = await client.get(f"/api/sessions/{session['id']}/logs/export", params=params)
+        stats = (await client.get("/api/analysis-logs/stats", params={**params, "session_id": session["id"]})).json()
+
+        assert [log["message"] for log in logs["payload"]] == ["inside"]
+        assert [json.loads(line)["message"] for line in export.text.splitlines()] == ["inside"]
+        assert stats["since"] == "2025-01-05T10:00:00"
+        assert sum(bucket["total"] for bucket in stats["buckets"]) == 1
+
+
+class TestAnalysisLogsSearch:
+    """Тести для повнотекстового пошуку по логах"""
+
+    @pytest.mark.asyncio
+    async def test_search(self, client):
+        """Тест фразового, префіксного та обмеженого сесією пошуку"""
+        first = (await client.post("/api/sessions", json={"session_name": "first"})).json()
+        second = (await client.post("/api/sessions", json={"session_name": "second"})).json()
+        await client.post("/api/analysis-logs/batch", json=[
+            {"session_id": first["id"], "log_type": "info", "message": "Port 22 open: OpenSSH 8.9 on 10.0.0.1"},
+            {"session_id": first["id"], "log_type": "info", "message": "Port 80 open: nginx"},
+            {"session_id": second["id"], "log_type": "warning", "message": "sshd banner leaks version"},
+        ])
+
+        async def search(**params):
+            response = await client.get("/api/analysis-logs/search", params=params)
+            assert response.status_code == 200
+            return response.json()["payload"]
+
+        assert [r["log_type"] for r in await search(q="ssh*")] == ["warning"]
+        assert len(await search(q="open*")) == 2
+        assert len(await search(q='"port 80 open"')) == 1
+        assert len(await search(q="10.0.0.1")) == 1
+        assert len(await search(q="version", session_id=second["id"])) == 1
+        assert await search(q="version", session_id=first["id"]) == []
+        assert "<mark>nginx</mark>" in (await search(q="nginx"))[0]["highlight"]
+
+    @pytest.mark.sqlite_only
+    @pytest.mark.asyncio
+    async def test_invalid_fts_syntax(self, client):
+        """Тест некоректного FTS5 виразу"""
+        response = await client.get("/api/analysis-logs/search", params={"q": "AND OR (", "syntax": "fts"})
+
+        assert response.status_code == 400
+
+
+class TestAnalysisLogsExport:
+    """Тести для потокового експорту логів сесії"""
+
+    async def _session_with_logs(self, client, count):
+        session = (await client.post("/api/sessions", json={"session_name": "scan"})).json()
+        await client.post("/api/analysis-logs/batch", json=[
+            {"session_id": session["id"], "log_type": "info", "message": f"line {n}, \"quoted\""}
+            for n in range(count)
+        ])
+        return session
+
+    @pytest.mark.asyncio
+    async def test_ndjson_export(self, client, monkeypatch):
+        """Тест експорту в NDJSON кількома порціями"""
+        monkeypatch.setattr(database.settings, "analysis_logs_export_chunk_size", 3)
+        session = await self._session_with_logs(client, 7)
+
+        response = await client.get(f"/api/sessions/{session['id']}/logs/export")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert [line["message"] for line in lines] == [f'line {n}, "quoted"' for n in range(7)]
+
+    @pytest.mark.asyncio
+    async def test_gzip_csv_export(self, client):
+        """Тест експорту в CSV зі стисненням gzip"""
+        session = await self._session_with_logs(client, 5)
+
+        response = await client.get(f"/api/sessions/{session['id']}/logs/export",
+                                    params={"format": "csv", "gzip": "true"})
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.content).decode("utf-8"))))
+
+        assert response.headers["content-disposition"].endswith('.csv.gz"')
+        assert len(rows) == 5
+        assert rows[0]["message"] == 'line 0, "quoted"'
+        assert (await client.get("/api/sessions/999/logs/export")).status_code == 404
+
+
+class TestAnalysisLogsStats:
+    """Тести для статистики логів з rollup таблиць"""
+
+    async def _insert_logs(self, session_id, rows):
+        repository = await database.get_repository()
+        for log_type, timestamp in rows:
+            await repository.insert_analysis_logs([(session_id, log_type, "x")], timestamp)
+
+    @pytest.mark.asyncio
+    async def test_minute_and_downsampled_buckets(self, client):
+        """Тест статистики по хвилинах та автоматичного укрупнення інтервалів"""
+        first = (await client.post("/api/sessions", json={"session_name": "first"})).json()
+        second = (await client.post("/api/sessions", json={"session_name": "second"})).json()
+        await self._insert_logs(first["id"], [
+            ("error", "2025-01-05T10:00:10"), ("error", "2025-01-05T10:00:50"),
+            ("info", "2025-01-05T10:01:00"), ("error", "2025-01-06T08:00:00"),
+        ])
+        await self._insert_logs(second["id"], [("error", "2025-01-05T10:00:30")])
+
+        minutes = (await client.get("/api/analysis-logs/stats", params={
+            "since": "2025-01-05T10:00:00", "until": "2025-01-05T11:00:00", "session_id": first["id"]
+        })).json()
+        assert minutes["granularity"] == "minute"
+        assert minutes["buckets"] == [
+            {"bucket": "2025-01-05T10:00", "total": 2, "by_type": {"error": 2}},
+            {"bucket": "2025-01-05T10:01", "total": 1, "by_type": {"info": 1}},
+        ]
+
+        days = (await client.get("/api/analysis-logs/stats", params={
+            "since": "2025-01-01T00:00:00", "until": "2025-01-31T00:00:00", "log_type": "error", "max_points": 100
+        })).json()
+        assert days["granularity"] == "day"
+        assert [(b["bucket"], b["total"]) for b in days["buckets"]] == [("2025-01-05", 3), ("2025-01-06", 1)]
+
+    @pytest.mark.asyncio
+    async def test_invalid_range(self, client):
+        """Тест некоректного діапазону"""
+        response = await client.get("/api/analysis-logs/stats", params={
+            "since": "2025-01-02T00:00:00", "until": "2025-01-01T00:00:00"
+        })
+
+        assert response.status_code == 400
@@ -0,0 +1,450 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for Tech Map and Specs
+"""
+
+import os
+import struct
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+import pytest_asyncio
+
+# Додаємо кореневу директорію проекту до Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.templates import create_templates, precompile_templates
+from src.main import app
+from src.routers import tech_map
+from src.services.diagrams import DiagramManifest
+from src.services.documents import DocumentCache, SpecsIndex
+from src.services.markdown_renderer import MarkdownCache, parse_outline, render_markdown, split_sections
+from src.services.search import SearchIndex, tokenize
+from src.services import static_assets
+from src.services.static_assets import AssetStore, PrecompressedStaticFiles, IMMUTABLE_CACHE_CONTROL
+
+
+@pytest_asyncio.fixture
+async def client():
+    """HTTP клієнт додатку"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http_client:
+        yield http_client
+
+
+class TestDocumentCache:
+    """Тести для кешу markdown документів"""
+
+    @pytest.mark.asyncio
+    async def test_revalidates_by_mtime_and_size(self, tmp_path):
+        """Тест повторного читання тільки після зміни файлу"""
+        path = tmp_path / "doc.md"
+        path.write_text("# First", encoding="utf-8")
+        cache = DocumentCache(revalidate_interval=0)
+
+        first = await cache.get(path)
+        again = await cache.get(path)
+        path.write_text("# Second version", encoding="utf-8")
+        os.utime(path, ns=(first.mtime_ns + 10**9, first.mtime_ns + 10**9))
+        changed = await cache.get(path)
+        path.unlink()
+
+        assert again is first
+        assert changed.text == "# Second version"
+        assert cache.get_stats()["reads"] == 2
+        assert await cache.get(path) is None
+
+    @pytest.mark.asyncio
+    async def test_served_from_memory_within_interval(self, tmp_path):
+        """Тест відповіді з пам'яті без перевірки файлу в межах інтервалу"""
+        path = tmp_path / "doc.md"
+        path.write_text("# Cached", encoding="utf-8")
+        cache = DocumentCache(revalidate_interval=60)
+
+        await cache.get(path)
+        path.write_text("# Changed on disk", encoding="utf-8")
+
+        assert (await cache.get(path)).text == "# Cached"
+        cache.invalidate(path)
+        assert (await cache.get(path)).text == "# Changed on disk"
+
+    @pytest.mark.asyncio
+    async def test_specs_navigation(self, tmp_path):
+        """Тест списку специфікацій для навігації"""
+        for name in ("README", "api_gateway", "ai_agent"):
+            (tmp_path / f"{name}.md").write_text(f"# {name}", encoding="utf-8")
+        index = SpecsIndex(tmp_path, revalidate_interval=60)
+
+        navigation = await index.navigation(active="api_gateway")
+
+        assert [spec["name"] for spec in navigation] == ["ai_agent", "api_gateway"]
+        assert [spec["active"] for spec in navigation] == [False, True]
+        assert navigation[1]["title"] == "Api Gateway"
+        assert len(await index.specs()) == 3
+
+
+class TestSpecsPages:
+    """Тести для сторінок специфікацій"""
+
+    @pytest.mark.asyncio
+    async def test_spec_pages(self, client):
+        """Тест сторінки специфікації, 404 та API списку"""
+        specs = (await client.get("/api/specs")).json()
+        name = next(spec["name"] for spec in specs["specs"] if spec["name"] != "README")
+
+        response = await client.get(f"/specs/{name}")
+
+        assert response.status_code == 200
+        assert '<h1 id="' in response.text and 'class="toc"' in response.text
+        assert (await client.get(f"/specs/{name}.md")).status_code == 200
+        assert (await client.get("/specs/missing_spec")).status_code == 404
+        assert specs["count"] == len(list(Path("specs").glob("*.md")))
+
+
+def png_header(width: int) -> bytes:
+    """Мінімальний PNG заголовок з IHDR заданої ширини"""
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, width // 2) + b"\x08\x06\x00\x00\x00"
+
+
+class TestDiagramManifest:
+    """Тести для маніфесту діаграм"""
+
+    @pytest.mark.asyncio
+    async def test_incremental_refresh(self, tmp_path):
+        """Тест побудови маніфесту та переобчислення хешу лише зміненого файлу"""
+        (tmp_path / "flow.png").write_bytes(b"png-1")
+        (tmp_path / "flow.mmd").write_text("graph TD; A-->B", encoding="utf-8")
+        (tmp_path / "notes.txt").write_text("ignored", encoding="utf-8")
+        manifest = DiagramManifest(tmp_path, refresh_interval=60)
+
+        first = await manifest.diagrams()
+        assert [d["name"] for d in first] == ["flow"]
+        assert set(first[0]["formats"]) == {"png", "mmd"} and first[0]["svg_path"] is None
+
+        assert await manifest.refresh() is False
+        (tmp_path / "flow.svg").write_text("<svg/>", encoding="utf-8")
+        (tmp_path / "flow.png").write_bytes(b"png-2 changed")
+        assert await manifest.refresh() is True
+
+        updated = (await manifest.diagrams())[0]
+        assert updated["svg_path"] == "/architecture/flow.svg"
+        assert updated["size"] == len(b"png-2 changed")
+        assert updated["formats"]["png"]["hash"] != first[0]["formats"]["png"]["hash"]
+        assert updated["formats"]["mmd"]["hash"] == first[0]["formats"]["mmd"]["hash"]
+
+    @pytest.mark.asyncio
+    async def test_responsive_sizes(self, tmp_path):
+        """Тест зменшених копій PNG та srcset у маніфесті"""
+        (tmp_path / "flow.png").write_bytes(png_header(2400))
+        (tmp_path / "sizes").mkdir()
+        for width in (960, 480):
+            (tmp_path / "sizes" / f"flow-{width}w.png").write_bytes(png_header(width))
+        (tmp_path / "sizes" / "orphan-480w.png").write_bytes(png_header(480))
+        manifest = DiagramManifest(tmp_path, refresh_interval=60)
+
+        diagrams = await manifest.diagrams()
+        flow = diagrams[0]
+
+        assert [d["name"] for d in diagrams] == ["flow"]
+        assert flow["width"] == 2400
+        assert [size["width"] for size in flow["sizes"]] == [480, 960]
+        assert flow["thumbnail"] == flow["sizes"][0]["url"]
+        assert flow["sizes"][0]["path"] == "/architecture/sizes/flow-480w.png"
+        assert flow["srcset"].endswith(f'{flow["formats"]["png"]["url"]} 2400w')
+        assert flow["srcset"].startswith(f'{flow["sizes"][0]["url"]} 480w, ')
+
+    @pytest.mark.asyncio
+    async def test_tech_map_api(self, client):
+        """Тест /tech-map/api та сторінки технічної карти з маніфесту"""
+        data = (await client.get("/tech-map/api")).json()
+        page = await client.get("/tech-map")
+
+        assert data["count"] == len(list(Path("architecture").glob("*.png")))
+        assert page.status_code == 200
+        assert data["diagrams"][0]["thumbnail"] in page.text
+
+        image = await client.get(data["diagrams"][0]["formats"]["png"]["url"])
+        assert image.status_code == 200 and image.headers["content-type"] == "image/png"
+        assert image.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert (await client.get("/architecture/missing.png")).status_code == 404
+
+
+class TestMarkdownRenderer:
+    """Тести для серверного рендерингу markdown"""
+
+    def test_blocks_and_anchors(self):
+        """Тест заголовків з якорями, змісту, списків та блоків коду"""
+        rendered = render_markdown(
+            "# Огляд сервісу\n\n## Overview\nText with **bold** and `<code>`.\n\n"
+            "## Overview\n- one\n  - nested *item*\n- two\n\n1. first\n2. second\n\n"
+            "```python\nprint('<b>')\n```\n"
+        )
+
+        assert [(h.level, h.anchor) for h in rendered.toc] == [
+            (1, "огляд-сервісу"), (2, "overview"), (2, "overview-1")
+        ]
+        assert '<h2 id="overview-1">Overview' in rendered.html
+        assert "<strong>bold</strong> and <code>&lt;code&gt;</code>" in rendered.html
+        assert "<li>one\n<ul>\n<li>nested <em>item</em></li>\n</ul>\n</li>" in rendered.html
+        assert "<ol>\n<li>first</li>\n<li>second</li>\n</ol>" in rendered.html
+        assert "<pre><code class=\"language-python\">print('&lt;b&gt;')\n</code></pre>" in rendered.html
+
+    def test_escaping_and_links(self):
+        """Тест екранування HTML, відносних зображень та небезпечних посилань"""
+        rendered = render_markdown(
+            "<script>alert(1)</script>\n\n![Diagram](flow.png) [docs](/docs) [x](javascript:alert)",
+            base_url="/architecture/"
+        )
+
+        assert "<script>" not in rendered.html
+        assert '<img src="/architecture/flow.png" alt="Diagram"' in rendered.html
+        assert '<a href="/docs">docs</a>' in rendered.html
+        assert 'href="javascript' not in rendered.html
+
+    @pytest.mark.asyncio
+    async def test_cache_by_content_hash(self):
+        """Тест кешу за хешем вмісту та базовим URL"""
+        cache = MarkdownCache()
+
+        first = await cache.render("# Title")
+        again = await cache.render("# Title")
+        based = await cache.render("# Title", "/architecture/")
+        changed = await cache.render("# Changed")
+
+        assert again is first and based is not first
+        assert changed.content_hash != first.content_hash
+        assert cache.get_stats() == {"entries": 3, "hits": 1, "renders": 3}
+
+
+class TestStaticAssets:
+    """Тести для статичних файлів з ETag, 304 та стисненими варіантами"""
+
+    @pytest_asyncio.fixture
+    async def assets(self, tmp_path):
+        """Директорія зі стилями та маніфест статичних файлів"""
+        directory = tmp_path / "static"
+        directory.mkdir()
+        (directory / "style.css").write_text("body { color: #333; }\n" * 200, encoding="utf-8")
+        (directory / "logo.png").write_bytes(b"\x89PNG" + bytes(range(256)))
+        store = AssetStore(directory, "/static", cache_dir=tmp_path / "cache")
+        await store.build()
+        app = PrecompressedStaticFiles(store)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http_client:
+            yield store, http_client
+
+    @pytest.mark.asyncio
+    async def test_hashed_url_is_immutable(self, assets):
+        """Тест URL з хешем вмісту та immutable заголовків"""
+        store, client = assets
+        url = store.url("style.css")
+
+        hashed = await client.get(url[len("/static"):], headers={"accept-encoding": "identity"})
+        plain = await client.get("/style.css", headers={"accept-encoding": "identity"})
+
+        assert url != "/static/style.css" and url.endswith(".css")
+        assert hashed.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert plain.headers["cache-control"] == "no-cache"
+        assert hashed.headers["content-type"].startswith("text/css")
+        assert hashed.content == plain.content
+
+    @pytest.mark.asyncio
+    async def test_precompressed_variant_and_304(self, assets):
+        """Тест віддачі gzip варіанту та 304 на повторний запит"""
+        store, client = assets
+
+        response = await client.get("/style.css", headers={"accept-encoding": "gzip"})
+        etag = response.headers["etag"]
+        repeat = await client.get(
+            "/style.css", headers={"accept-encoding": "gzip", "if-none-match": etag}
+        )
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < (store.directory / "style.css").stat().st_size
+        assert response.text == (store.directory / "style.css").read_text(encoding="utf-8")
+        assert repeat.status_code == 304 and repeat.content == b""
+        assert repeat.headers["etag"] == etag
+
+    @pytest.mark.skipif(static_assets.brotli is None, reason="brotli не встановлено")
+    @pytest.mark.asyncio
+    async def test_brotli_preferred(self, assets):
+        """Тест віддачі brotli варіанту, коли клієнт приймає обидва кодування"""
+        store, client = assets
+
+        response = await client.get("/style.css", headers={"accept-encoding": "gzip, br"})
+        gzipped = await client.get("/style.css", headers={"accept-encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "br"
+        assert int(response.headers["content-length"]) < int(gzipped.headers["content-length"])
+        assert response.text == (store.directory / "style.css").read_text(encoding="utf-8")
+        assert response.headers["etag"] != gzipped.headers["etag"]
+
+    @pytest.mark.asyncio
+    async def test_changed_file_gets_new_hash(self, assets):
+        """Тест нового ETag після зміни файлу та відсутності варіантів для PNG"""
+        store, client = assets
+        old_url = store.url("style.css")
+        etag = (await client.get("/style.css")).headers["etag"]
+
+        path = store.directory / "style.css"
+        path.write_text("body { color: red; }\n" * 200, encoding="utf-8")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_mtime_ns + 10**9, stat.st_mtime_ns + 10**9))
+        changed = await client.get("/style.css", headers={"if-none-match": etag})
+        stale = await client.get(old_url[len("/static"):])
+        png = await client.get("/logo.png", headers={"accept-encoding": "gzip"})
+
+        assert changed.status_code == 200 and "red" in changed.text
+        assert stale.headers["cache-control"] == "no-cache"
+        assert store.url("style.css") != old_url
+        assert "content-encoding" not in png.headers and "vary" not in png.headers
+
+    @pytest.mark.asyncio
+    async def test_gzip_only_without_brotli(self, tmp_path, monkeypatch):
+        """Тест: без пакета brotli створюються тільки gzip варіанти"""
+        monkeypatch.setattr(static_assets, "brotli", None)
+        (tmp_path / "style.css").write_text("body { color: #333; }\n" * 200, encoding="utf-8")
+        store = AssetStore(tmp_path, "/static", cache_dir=tmp_path / "cache")
+        await store.build()
+
+        asset, _ = await store.resolve("style.css")
+        assert set(asset.variants) == {"gzip"}
+
+
+class TestSpecSections:
+    """Тести для дерева заголовків та API розділів специфікацій"""
+
+    def test_outline_byte_offsets(self):
+        """Тест дерева заголовків та байтових меж розділів у UTF-8"""
+        text = "# Сервіс\nВступ\n## Огляд\nТекст\n### Деталі\nЩе\n## Integration\nBus\n"
+        outline = parse_outline(text)
+        data = text.encode("utf-8")
+
+        root = outline.nodes[0]
+        assert [child.anchor for child in root.children] == ["огляд", "integration"]
+        assert root.children[0].children[0].anchor == "деталі"
+        overview = outline.anchors["огляд"]
+        assert data[overview.start:overview.end].decode("utf-8") == "## Огляд\nТекст\n### Деталі\nЩе\n"
+        assert outline.section("огляд", subsections=False) == "## Огляд\nТекст\n"
+        assert outline.section("integration") == "## Integration\nBus\n"
+        assert root.end == len(data) and outline.section("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_toc_and_section_api(self, client):
+        """Тест TOC, розділу за якорем та 304 за ETag"""
+        toc = await client.get("/api/specs/ai_agent_service/toc")
+        anchor = toc.json()["sections"][0]["children"][0]["anchor"]
+
+        section = await client.get(f"/api/specs/ai_agent_service/sections/{anchor}")
+        repeat = await client.get(
+            f"/api/specs/ai_agent_service/sections/{anchor}", headers={"if-none-match": section.headers["etag"]}
+        )
+        markdown = await client.get(f"/api/specs/ai_agent_service/sections/{anchor}", params={"format": "markdown"})
+        cached_toc = await client.get("/api/specs/ai_agent_service/toc", headers={"if-none-match": toc.headers["etag"]})
+
+        assert toc.status_code == 200 and toc.json()["sections"][0]["level"] == 1
+        assert section.json()["markdown"].startswith("## ")
+        assert repeat.status_code == 304 and repeat.content == b""
+        assert cached_toc.status_code == 304
+        assert markdown.headers["content-type"].startswith("text/markdown")
+        assert markdown.text == section.json()["markdown"]
+        assert markdown.headers["etag"] != section.headers["etag"]
+        assert (await client.get("/api/specs/ai_agent_service/sections/missing")).status_code == 404
+        assert (await client.get("/api/specs/missing_spec/toc")).status_code == 404
+
+
+class TestDocsSearch:
+    """Тести для повнотекстового пошуку по документації"""
+
+    def test_sections_match_rendered_anchors(self):
+        """Тест розбиття на розділи з якорями як у HTML та ігноруванням коду"""
+        text = "Intro\n\n# Title\n## Setup\nText\n```\n# not a heading\n```\n## Setup\nMore\n\nUsage\n-----\nRun"
+        sections = split_sections(text)
+
+        assert [(s.level, s.anchor) for s in sections] == [
+            (0, ""), (1, "title"), (2, "setup"), (2, "setup-1"), (2, "usage")
+        ]
+        assert [h.anchor for h in render_markdown(text).toc] == ["title", "setup", "setup-1", "usage"]
+        assert sections[4].body == "Run"
+        assert "# not a heading" in sections[2].body
+
+    def test_tokenize_ukrainian_and_english(self):
+        """Тест нормалізації словоформ обох мов"""
+        assert tokenize("Повідомлення повідомлень") == ["повідомл", "повідомл"]
+        assert tokenize("Messages message") == ["messag", "messag"]
+        assert tokenize("користувач’ів") == tokenize("користувач'ів")
+
+    @pytest.mark.asyncio
+    async def test_incremental_index(self, tmp_path):
+        """Тест ранжування розділів та переіндексування лише зміненого файлу"""
+        specs = tmp_path / "specs"
+        specs.mkdir()
+        (specs / "bus.md").write_text(
+            "# Bus\n## Message Bus Integration\nЧерги повідомлень RabbitMQ\n## Storage\nPostgreSQL tables",
+            encoding="utf-8"
+        )
+        (specs / "agent.md").write_text("# Agent\n## Planner\nПланування задач, message bus", encoding="utf-8")
+        (tmp_path / "architecture" / "en").mkdir(parents=True)
+        (tmp_path / "architecture" / "en" / "technical_map.md").write_text("# Map\n## Queues\nRabbitMQ", encoding="utf-8")
+        index = SearchIndex(DocumentCache(revalidate_interval=0), specs, tmp_path / "architecture")
+
+        assert await index.refresh() == 3
+        hits = await index.search("message bus")
+        assert hits[0]["url"] == "/specs/bus#message-bus-integration"
+        assert hits[1]["document"] == "specs/agent"
+        assert (await index.search("черга"))[0]["snippet"].startswith("Черги повідомлень")
+        assert {hit["lang"] for hit in await index.search("rabbitmq", lang="uk")} == {None}
+        assert (await index.search("rabbit"))[0]["section"] in ("Message Bus Integration", "Queues")
+
+        path = specs / "agent.md"
+        path.write_text("# Agent\n## Planner\nKafka streams", encoding="utf-8")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_mtime_ns + 10**9, stat.st_mtime_ns + 10**9))
+        (specs / "bus.md").unlink()
+
+        assert await index.refresh() == 2
+        assert await index.search("message bus") == []
+        assert (await index.search("kafka"))[0]["url"] == "/specs/agent#planner"
+        assert index.get_stats()["documents"] == 2
+
+    @pytest.mark.asyncio
+    async def test_search_api(self, client):
+        """Тест /api/specs/search"""
+        response = await client.get("/api/specs/search", params={"q": "RabbitMQ", "limit": 3})
+        data = response.json()
+
+        assert response.status_code == 200
+        assert 0 < data["count"] <= 3
+        assert data["hits"][0]["url"].startswith(("/specs/", "/tech-map"))
+        assert (await client.get("/api/specs/search", params={"q": ""})).status_code == 422
+
+
+class TestTemplates:
+    """Тести для спільного Jinja2 середовища"""
+
+    @pytest.mark.asyncio
+    async def test_precompile_with_bytecode_cache(self, tmp_path):
+        """Тест попередньої компіляції в кеш байткоду та повторного використання кешу"""
+        (tmp_path / "templates").mkdir()
+        (tmp_path / "templates" / "page.html").write_text("<p>{{ value }}</p>", encoding="utf-8")
+        cache_dir = tmp_path / "cache"
+
+        await precompile_templates(create_templates(tmp_path / "templates", cache_dir=cache_dir))
+        cached = list(cache_dir.iterdir())
+        restarted = create_templates(tmp_path / "templates", cache_dir=cache_dir)
+        await precompile_templates(restarted)
+
+        assert len(cached) == 1 and list(cache_dir.iterdir()) == cached
+        assert restarted.env.get_template("page.html").render(value="<b>") == "<p>&lt;b&gt;</p>"
+        assert restarted.env.auto_reload is False
+
+    def test_single_shared_environment(self):
+        """Тест одного середовища шаблонів для додатку та роутерів"""
+        from src.main import templates
+
+        assert tech_map.templates is templates
+        assert templates.env.bytecode_cache is not None